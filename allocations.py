@@ -0,0 +1,94 @@
+"""
+Pass allocations for many employees at once, from a CSV file.
+
+The file needs an employee_id column and one column per pass type, headed
+either with the pass type ("Regular Pass") or the employees column
+(regular_pass); other columns such as name are ignored. An empty cell leaves
+that allocation as it is. Everything is applied by services.allocate_many in
+one transaction, so a file with a bad row changes nothing.
+
+write_template() saves the current allocations in the same layout, ready to
+be edited and loaded back.
+
+Usage: python allocations.py load allocations.csv [--db funpass.db]
+       python allocations.py template allocations.csv [--db funpass.db]
+"""
+import argparse
+import csv
+import sqlite3
+
+import services
+from services import PASS_COLUMNS, ServiceError
+
+TEMPLATE_HEADER = ['employee_id', 'name'] + list(PASS_COLUMNS)
+
+# Lowercased header -> pass type, for both spellings of each pass type
+_PASS_HEADERS = {name.lower(): pass_type for pass_type, column in PASS_COLUMNS.items() for name in (pass_type, column)}
+
+
+def read_allocations(path):
+    """Read path into {employee id: {pass type: tickets as text}}.
+
+    Raises ServiceError naming the line of the first bad row.
+    """
+    allocations = {}
+    with open(path, newline='', encoding='utf-8-sig') as handle:  # -sig: files saved by Excel start with a BOM
+        reader = csv.DictReader(handle)
+        headers = reader.fieldnames or []
+        id_header = next((header for header in headers if header.strip().lower() == 'employee_id'), None)
+        if id_header is None:
+            raise ServiceError("The file needs an employee_id column")
+        pass_headers = {header: _PASS_HEADERS[header.strip().lower()] for header in headers
+                        if header.strip().lower() in _PASS_HEADERS}
+        if not pass_headers:
+            raise ServiceError(f"The file has no pass type columns ({', '.join(PASS_COLUMNS)})")
+        for line, row in enumerate(reader, start=2):
+            employee_id = (row.get(id_header) or '').strip()
+            if not employee_id:
+                continue
+            if employee_id in allocations:
+                raise ServiceError(f"Line {line}: employee {employee_id} is listed twice")
+            quantities = {}
+            for header, pass_type in pass_headers.items():
+                value = (row.get(header) or '').strip()
+                if not value:
+                    continue
+                if not value.isdigit():
+                    raise ServiceError(f"Line {line}: invalid {pass_type} allocation '{value}'")
+                quantities[pass_type] = value
+            allocations[employee_id] = quantities
+    return allocations
+
+
+def write_template(conn, path):
+    # Current allocations of every employee, in the layout read_allocations() expects; returns the row count
+    rows = conn.execute(f"SELECT employee_id, name, {', '.join(PASS_COLUMNS.values())} FROM employees ORDER BY name").fetchall()
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(TEMPLATE_HEADER)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load or save FunPass pass allocations as CSV")
+    parser.add_argument('command', choices=['load', 'template'])
+    parser.add_argument('path')
+    parser.add_argument('--db', default='funpass.db')
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == 'template':
+            print(f"Wrote the allocations of {write_template(conn, args.path)} employees to {args.path}")
+            return
+        try:
+            updated = services.allocate_many(conn, read_allocations(args.path))
+        except ServiceError as e:
+            parser.exit(1, f"Nothing was changed: {e}\n")
+        print(f"Updated the allocations of {updated} employees")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""
+Archiving of old sales and refund requests.
+
+run() moves sales bought before a cutoff month, and their settled refund
+requests, out of customers and cancellations into a separate archive
+database (FUNPASS_ARCHIVE, default funpass_archive.db). The default screens
+and searches only read the hot tables, so they stay small.
+
+Before rows leave, their totals are added to archived_totals in the hot
+database, one row per month, employee and pass type. The all-time figures
+(admin stat cards, employee dashboard, remaining allocations, the 12-month
+chart) add these totals, so they do not change when a season is archived.
+Sales with a pending refund request stay hot until it is settled.
+
+Old rows are still available on request:
+
+    open_history(conn)   attaches the archive and creates the temporary views
+                         all_customers and all_cancellations (hot + archive)
+    lookup(conn, id)     finds a ticket in the hot tables, the archive or the
+                         compressed files
+    history_tables(...)  picks the views when a date range reaches back into
+                         the archive; reports.py and exporter.py read through it
+    services.search_sales(..., include_archive=True) searches the views
+
+compress() optionally moves archived months out of the archive database into
+gzip-compressed CSV files in FUNPASS_ARCHIVE_DIR (default archive_csv), one
+per month and table. Their totals stay in archived_totals, and the months are
+listed in the archive's compressed_months table: history_tables() refuses a
+range that includes one (ValueError), rather than reports and exports quietly
+missing those sales. Single tickets are still found by lookup().
+
+The current and the previous month are never archived, so "this month"
+figures and the 30-day chart only ever read hot rows.
+
+Usage: python archive.py run 2025-01 [--db funpass.db] [--archive funpass_archive.db] [--vacuum]
+       python archive.py compress 2024-01 [--archive funpass_archive.db]
+       python archive.py lookup F1A2B3 [--db funpass.db]
+       python archive.py status [--db funpass.db]
+"""
+import argparse
+import csv
+import glob
+import gzip
+import os
+import sqlite3
+import time
+from datetime import date
+
+import change_log
+
+ARCHIVE_PATH = os.environ.get('FUNPASS_ARCHIVE', 'funpass_archive.db')
+ARCHIVE_DIR = os.environ.get('FUNPASS_ARCHIVE_DIR', 'archive_csv')
+
+CUSTOMER_COLUMNS = ['ticket_id', 'name', 'email', 'quantity', 'amount', 'booked_date', 'purchased_date',
+                    'pass_type', 'employee_id']
+CANCELLATION_COLUMNS = ['id', 'ticket_id', 'name', 'email', 'reasons', 'quantity', 'amount', 'booked_date',
+                        'purchased_date', 'status', 'pass_type']
+
+# Hot database: totals of everything archived, and the archive boundary
+HOT_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS archived_totals (
+        month TEXT NOT NULL,
+        employee_id TEXT NOT NULL DEFAULT '',
+        pass_type TEXT NOT NULL,
+        sales INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        refunded_tickets INTEGER NOT NULL DEFAULT 0,         -- approved refunds
+        refunded_amount REAL NOT NULL DEFAULT 0,
+        matched_refunded_amount REAL NOT NULL DEFAULT 0,     -- of which the sale was on file
+        PRIMARY KEY (month, employee_id, pass_type)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS archive_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        archived_before TEXT
+    )''',
+    'INSERT OR IGNORE INTO archive_state (id, archived_before) VALUES (1, NULL)',
+]
+
+# Archive database. A ticket id may come back in a later sale, so it is indexed, not unique.
+# Months ('YYYY-MM') whose archived rows compress() moved to .csv.gz files
+COMPRESSED_MONTHS_SQL = 'CREATE TABLE IF NOT EXISTS {schema}.compressed_months (month TEXT PRIMARY KEY)'
+
+ARCHIVE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS archive.customers (
+        ticket_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        booked_date TEXT NOT NULL,
+        purchased_date TEXT NOT NULL,
+        pass_type TEXT NOT NULL,
+        employee_id TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS archive.cancellations (
+        id INTEGER PRIMARY KEY,
+        ticket_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        reasons TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        booked_date TEXT NOT NULL,
+        purchased_date TEXT NOT NULL,
+        status TEXT,
+        pass_type TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_customers_ticket ON customers (ticket_id)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_customers_purchased ON customers (purchased_date)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_cancellations_ticket ON cancellations (ticket_id)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_cancellations_purchased ON cancellations (purchased_date)',
+    COMPRESSED_MONTHS_SQL.format(schema='archive'),
+]
+
+# Sales to move: bought before the cutoff and without a pending refund request
+SELECT_SALES_SQL = '''
+    INSERT INTO temp.archive_sales (ticket_id)
+    SELECT c.ticket_id FROM main.customers c
+    WHERE c.purchased_date < ?
+      AND NOT EXISTS (SELECT 1 FROM main.cancellations ca
+                      WHERE ca.ticket_id = c.ticket_id AND IFNULL(ca.status, 'Pending') = 'Pending')
+'''
+
+# Settled refund requests of those sales, and settled ones whose sale is gone, from before the cutoff
+SELECT_CANCELLATIONS_SQL = '''
+    INSERT INTO temp.archive_cancellations (id)
+    SELECT ca.id FROM main.cancellations ca
+    WHERE IFNULL(ca.status, 'Pending') != 'Pending'
+      AND (ca.ticket_id IN (SELECT ticket_id FROM temp.archive_sales)
+           OR (ca.purchased_date < ? AND NOT EXISTS (SELECT 1 FROM main.customers c WHERE c.ticket_id = ca.ticket_id)))
+'''
+
+ADD_SALES_TOTALS_SQL = '''
+    INSERT INTO main.archived_totals (month, employee_id, pass_type, sales, tickets, amount)
+    SELECT substr(purchased_date, 1, 7), IFNULL(employee_id, ''), pass_type, COUNT(*), SUM(quantity), SUM(amount)
+    FROM main.customers
+    WHERE ticket_id IN (SELECT ticket_id FROM temp.archive_sales)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (month, employee_id, pass_type) DO UPDATE SET
+        sales = sales + excluded.sales,
+        tickets = tickets + excluded.tickets,
+        amount = amount + excluded.amount
+'''
+
+# Refunds count against the month and employee of the sale, like the dashboard queries do
+ADD_REFUND_TOTALS_SQL = '''
+    INSERT INTO main.archived_totals (month, employee_id, pass_type, refunded_tickets, refunded_amount,
+                                      matched_refunded_amount)
+    SELECT substr(ca.purchased_date, 1, 7), IFNULL(c.employee_id, ''), COALESCE(ca.pass_type, c.pass_type, ''),
+           SUM(ca.quantity), SUM(ca.amount), TOTAL(CASE WHEN c.ticket_id IS NOT NULL THEN ca.amount END)
+    FROM main.cancellations ca
+    LEFT JOIN main.customers c ON c.ticket_id = ca.ticket_id
+    WHERE ca.id IN (SELECT id FROM temp.archive_cancellations) AND ca.status = 'Approved'
+    GROUP BY 1, 2, 3
+    ON CONFLICT (month, employee_id, pass_type) DO UPDATE SET
+        refunded_tickets = refunded_tickets + excluded.refunded_tickets,
+        refunded_amount = refunded_amount + excluded.refunded_amount,
+        matched_refunded_amount = matched_refunded_amount + excluded.matched_refunded_amount
+'''
+
+
+def install(conn):
+    # Create archived_totals and archive_state if they are missing (does not commit)
+    for sql in HOT_SCHEMA:
+        conn.execute(sql)
+
+
+def archived_before(conn):
+    # First day of the oldest hot month ('YYYY-MM-DD'), None if nothing was archived
+    # (also for databases created before archiving existed, which reports and exports still read)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='archive_state'").fetchone() is None:
+        return None
+    row = conn.execute('SELECT archived_before FROM archive_state WHERE id = 1').fetchone()
+    return row[0] if row else None
+
+
+def latest_cutoff(today=None):
+    # The newest allowed cutoff: the start of last month, so this and last month stay hot
+    today = today or date.today()
+    return (date(today.year - 1, 12, 1) if today.month == 1 else date(today.year, today.month - 1, 1)).isoformat()
+
+
+def _attached(conn):
+    return {row[1] for row in conn.execute('PRAGMA database_list')}
+
+
+def attach(conn, archive_path=ARCHIVE_PATH):
+    # Attach the archive database as schema 'archive', creating its tables if needed
+    if 'archive' not in _attached(conn):
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+    for sql in ARCHIVE_SCHEMA:
+        conn.execute(sql)
+
+
+def open_history(conn, archive_path=ARCHIVE_PATH):
+    """Create the temporary views all_customers and all_cancellations on conn.
+
+    They read the hot tables plus the archive database, if there is one.
+    Returns True if the archive was attached. Call outside a transaction.
+    """
+    has_archive = 'archive' in _attached(conn) or os.path.exists(archive_path)
+    if has_archive:
+        attach(conn, archive_path)
+    customers = ', '.join(CUSTOMER_COLUMNS)
+    cancellations = ', '.join(CANCELLATION_COLUMNS)
+    conn.execute('DROP VIEW IF EXISTS temp.all_customers')
+    conn.execute('DROP VIEW IF EXISTS temp.all_cancellations')
+    archived_customers = f' UNION ALL SELECT {customers} FROM archive.customers' if has_archive else ''
+    archived_cancellations = f' UNION ALL SELECT {cancellations} FROM archive.cancellations' if has_archive else ''
+    conn.execute(f'CREATE TEMP VIEW all_customers AS SELECT {customers} FROM main.customers{archived_customers}')
+    conn.execute(f'CREATE TEMP VIEW all_cancellations AS SELECT {cancellations} FROM main.cancellations{archived_cancellations}')
+    return has_archive
+
+
+def compressed_months(conn, date_from=None, date_to=None):
+    # Compressed months ('YYYY-MM') between the purchased dates date_from and date_to (inclusive, None: open-ended)
+    if 'archive' not in _attached(conn):
+        return []
+    sql, params = 'SELECT month FROM archive.compressed_months WHERE 1=1', []
+    if date_from is not None:
+        sql += ' AND month >= ?'
+        params.append(date_from[:7])
+    if date_to is not None:
+        sql += ' AND month <= ?'
+        params.append(date_to[:7])
+    return [row[0] for row in conn.execute(sql + ' ORDER BY month', params)]
+
+
+def history_tables(conn, date_from=None, date_to=None):
+    """(customers, cancellations) to read for purchases from date_from to date_to.
+
+    The hot tables, or the views if the range reaches into the archive.
+    Raises ValueError if it includes months compress() moved to .csv.gz files.
+    """
+    boundary = archived_before(conn)
+    if boundary is None or (date_from is not None and date_from >= boundary):
+        return 'customers', 'cancellations'
+    if isinstance(conn, sqlite3.Connection):  # a server connection (client.RemoteConnection) reads the views the server keeps open
+        open_history(conn)
+    months = compressed_months(conn, date_from, date_to)
+    if months:
+        span = months[0] if len(months) == 1 else f"{months[0]} to {months[-1]}"
+        raise ValueError(f"Sales bought in {span} were compressed into .csv.gz files ({ARCHIVE_DIR}) and can't be "
+                         f"reported or exported; choose later dates, or find a ticket with: python archive.py lookup TICKET_ID")
+    return 'all_customers', 'all_cancellations'
+
+
+def run(conn, before_month, archive_path=ARCHIVE_PATH, today=None):
+    """Archive sales bought before before_month ('YYYY-MM') and their settled refunds.
+
+    Commits. Returns a dict with the numbers of rows moved and the time taken.
+    """
+    start = time.perf_counter()
+    cutoff = f"{before_month}-01"
+    date.fromisoformat(cutoff)  # ValueError for a malformed month
+    if cutoff > latest_cutoff(today):
+        raise ValueError(f"{before_month} is too recent, the current and previous month stay hot")
+    install(conn)
+    conn.commit()
+    attach(conn, archive_path)
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_sales (ticket_id TEXT PRIMARY KEY)')
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_cancellations (id INTEGER PRIMARY KEY)')
+    customers = ', '.join(CUSTOMER_COLUMNS)
+    cancellations = ', '.join(CANCELLATION_COLUMNS)
+    tables = ('customers', 'cancellations')
+    try:
+        with conn:
+            conn.execute('DELETE FROM temp.archive_sales')
+            conn.execute('DELETE FROM temp.archive_cancellations')
+            conn.execute(SELECT_SALES_SQL, (cutoff,))
+            conn.execute(SELECT_CANCELLATIONS_SQL, (cutoff,))
+            conn.execute(ADD_SALES_TOTALS_SQL)
+            conn.execute(ADD_REFUND_TOTALS_SQL)
+            # Copied first and deleted second, so an interrupted run can only leave a row in both places
+            moved_sales = conn.execute(f'''INSERT INTO archive.customers ({customers})
+                SELECT {customers} FROM main.customers WHERE ticket_id IN (SELECT ticket_id FROM temp.archive_sales)''').rowcount
+            moved_cancellations = conn.execute(f'''INSERT INTO archive.cancellations ({cancellations})
+                SELECT {cancellations} FROM main.cancellations WHERE id IN (SELECT id FROM temp.archive_cancellations)''').rowcount
+            # The move is logged as one reload per table instead of a delete per row
+            change_log.drop_triggers(conn, tables)
+            conn.execute('DELETE FROM main.cancellations WHERE id IN (SELECT id FROM temp.archive_cancellations)')
+            conn.execute('DELETE FROM main.customers WHERE ticket_id IN (SELECT ticket_id FROM temp.archive_sales)')
+            change_log.install(conn)
+            change_log.force_reload(conn, tables)
+            conn.execute('UPDATE main.archive_state SET archived_before = MAX(IFNULL(archived_before, ?), ?) WHERE id = 1',
+                         (cutoff, cutoff))
+    finally:
+        conn.execute('DROP TABLE IF EXISTS temp.archive_sales')
+        conn.execute('DROP TABLE IF EXISTS temp.archive_cancellations')
+    # Consumers reload after the move anyway, so this is a good moment to trim the log too
+    compacted = change_log.compact(conn)
+    return {'sales': moved_sales, 'cancellations': moved_cancellations, 'archived_before': archived_before(conn),
+            'change_log_removed': compacted, 'seconds': time.perf_counter() - start}
+
+
+def compress(archive_path, before_month, out_dir=ARCHIVE_DIR):
+    """Move archived rows bought before before_month into <out_dir>/<month>-<table>.csv.gz.
+
+    Files are appended to (as extra gzip members) if a month is compressed
+    twice. Each month is recorded in compressed_months as its rows are
+    deleted. Returns the number of rows moved per table.
+    """
+    cutoff = f"{before_month}-01"
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(archive_path)
+    conn.execute(COMPRESSED_MONTHS_SQL.format(schema='main'))
+    moved = {}
+    try:
+        for table, columns in (('customers', CUSTOMER_COLUMNS), ('cancellations', CANCELLATION_COLUMNS)):
+            months = [row[0] for row in conn.execute(
+                f'SELECT DISTINCT substr(purchased_date, 1, 7) FROM {table} WHERE purchased_date < ? ORDER BY 1', (cutoff,))]
+            moved[table] = 0
+            for month in months:
+                path = os.path.join(out_dir, f"{month}-{table}.csv.gz")
+                new_file = not os.path.exists(path)
+                with gzip.open(path, 'at', newline='', encoding='utf-8') as handle:
+                    writer = csv.writer(handle)
+                    if new_file:
+                        writer.writerow(columns)
+                    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE substr(purchased_date, 1, 7) = ?",
+                                          (month,))
+                    while True:
+                        rows = cursor.fetchmany(5000)
+                        if not rows:
+                            break
+                        writer.writerows(rows)
+                # Only delete once the month's file is safely closed
+                with conn:
+                    moved[table] += conn.execute(f'DELETE FROM {table} WHERE substr(purchased_date, 1, 7) = ?',
+                                                 (month,)).rowcount
+                    conn.execute('INSERT OR IGNORE INTO compressed_months (month) VALUES (?)', (month,))
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+    return moved
+
+
+def lookup(conn, ticket_id, archive_path=ARCHIVE_PATH, out_dir=ARCHIVE_DIR):
+    # Every sale and refund request with ticket_id, as (where, table, row dict); searches compressed files last
+    found = []
+    open_history(conn, archive_path)
+    for table, columns in (('customers', CUSTOMER_COLUMNS), ('cancellations', CANCELLATION_COLUMNS)):
+        hot = conn.execute(f"SELECT {', '.join(columns)} FROM main.{table} WHERE ticket_id = ?", (ticket_id,)).fetchall()
+        found += [('hot', table, dict(zip(columns, row))) for row in hot]
+        if 'archive' in _attached(conn):
+            archived = conn.execute(f"SELECT {', '.join(columns)} FROM archive.{table} WHERE ticket_id = ?",
+                                    (ticket_id,)).fetchall()
+            found += [('archive', table, dict(zip(columns, row))) for row in archived]
+    for path in sorted(glob.glob(os.path.join(out_dir, '*.csv.gz'))):
+        table = 'cancellations' if path.endswith('-cancellations.csv.gz') else 'customers'
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as handle:
+            for row in csv.DictReader(handle):
+                if row.get('ticket_id') == ticket_id:
+                    found.append((os.path.basename(path), table, row))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old FunPass sales and refund requests")
+    parser.add_argument('command', choices=['run', 'compress', 'lookup', 'status'])
+    parser.add_argument('value', nargs='?', help="cutoff month YYYY-MM (run, compress) or ticket id (lookup)")
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--archive', default=ARCHIVE_PATH)
+    parser.add_argument('--out-dir', default=ARCHIVE_DIR, help="where compress writes its .csv.gz files")
+    parser.add_argument('--vacuum', action='store_true', help="shrink the hot database file after archiving")
+    args = parser.parse_args()
+    if args.command in ('run', 'compress', 'lookup') and not args.value:
+        parser.error(f"{args.command} needs a {'ticket id' if args.command == 'lookup' else 'month'}")
+
+    if args.command == 'compress':
+        moved = compress(args.archive, args.value, args.out_dir)
+        print(f"Compressed {moved['customers']} sales and {moved['cancellations']} refund requests into {args.out_dir}")
+        return
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == 'run':
+            try:
+                result = run(conn, args.value, args.archive)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Archived {result['sales']} sales and {result['cancellations']} refund requests to {args.archive} "
+                  f"in {result['seconds']:.1f}s; sales before {result['archived_before']} are archived; "
+                  f"removed {result['change_log_removed']} old change log entries")
+            if args.vacuum:
+                conn.execute('VACUUM main')
+        elif args.command == 'lookup':
+            rows = lookup(conn, args.value, args.archive, args.out_dir)
+            for where, table, row in rows:
+                print(f"[{where}] {table}: {row}")
+            if not rows:
+                print(f"No sale or refund request with ticket id {args.value}")
+        else:
+            install(conn)
+            conn.commit()
+            hot = conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0]
+            months, sales = conn.execute('SELECT COUNT(DISTINCT month), TOTAL(sales) FROM archived_totals').fetchone()
+            print(f"{hot} hot sales; {int(sales)} archived sales over {months} months; "
+                  f"archived before: {archived_before(conn) or 'nothing archived'}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
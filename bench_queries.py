@@ -0,0 +1,217 @@
+"""
+Latency benchmark for the app's hot SQL, on generated databases of growing size.
+
+For every size a database is generated with datagen.py (same seed, so runs
+are comparable), then each query below runs --repeat times after one warm-up
+run. The statements are the ones the app executes, imported from queries.py,
+services.py and row_store.py. Percentiles are printed and written to a JSON file; with
+--compare, the p50 of every query is checked against an earlier results
+file and the exit status is 1 if anything got slower than --threshold.
+
+Usage: python bench_queries.py [--sizes 10000,100000,500000] [--repeat 20] [--out results.json]
+                               [--compare baseline.json] [--threshold 1.25] [--cache-dir DIR]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import row_store
+import services
+from datagen import generate
+from queries import load_admin_stats, load_top_employees, load_employee_rows, matches
+
+SEED = 42
+EMPLOYEES = 25
+MAX_SECONDS_PER_QUERY = 10  # stop repeating a slow query early, but always keep 3 runs
+
+
+def _load_store(conn, source, params=()):
+    # What the first visit of a customers or cancellations page does
+    store = row_store.RowStore(source, params)
+    store.load(conn)
+    return store.select()
+
+
+def _customers_store(conn, ctx):
+    # The admin customers page's store, loaded once per database as the app loads it once per session
+    if 'customers_store' not in ctx:
+        ctx['customers_store'] = row_store.RowStore(row_store.ADMIN_CUSTOMERS)
+        ctx['customers_store'].load(conn)
+    return ctx['customers_store']
+
+
+def _search_customers(conn, ctx):
+    # AdminDashboard.search_customers: filter the row store (no query)
+    return _customers_store(conn, ctx).select(ctx['search'])
+
+
+def _sort_customers(conn, ctx):
+    # AdminDashboard.sort_customers: "Amount (Highest)" on the row store
+    return _customers_store(conn, ctx).select('', 'amount', True)
+
+
+def _refresh_customers(conn, ctx):
+    # What a revisit of the customers page reads when nothing changed: the change log only
+    return _customers_store(conn, ctx).read_changes(conn) or []
+
+
+def _search_employees(conn, ctx):
+    return [row for row in conn.execute('SELECT * FROM employees').fetchall() if matches(row, ctx['search'])]
+
+
+def _sale_checks(conn, ctx):
+    # What sell_tickets reads before inserting: remaining allocation and the price
+    return (services.employee_availability(conn, ctx['employee_id'], ctx['pass_type']),
+            services.get_price(conn, ctx['pass_type']))
+
+
+# name -> function(conn, ctx), in the order they are reported
+QUERIES = {
+    'admin_stat_cards': lambda conn, ctx: load_admin_stats(conn),
+    'top_employees': lambda conn, ctx: load_top_employees(conn),
+    'load_employees': lambda conn, ctx: load_employee_rows(conn),
+    'admin_customers': lambda conn, ctx: _load_store(conn, row_store.ADMIN_CUSTOMERS),
+    'employee_customers': lambda conn, ctx: _load_store(conn, row_store.EMPLOYEE_CUSTOMERS, (ctx['employee_id'],)),
+    'admin_cancellations': lambda conn, ctx: _load_store(conn, row_store.ADMIN_CANCELLATIONS),
+    'search_customers': _search_customers,
+    'sort_customers': _sort_customers,
+    'refresh_customers': _refresh_customers,
+    'search_employees': _search_employees,
+    'search_sales': lambda conn, ctx: services.search_sales(conn, ctx['search'], ctx['employee_id']),
+    'pass_availability': lambda conn, ctx: services.employee_availability(conn, ctx['employee_id'], ctx['pass_type']),
+    'employee_availability': lambda conn, ctx: services.availability(conn, ctx['employee_id']),
+    'sale_checks': _sale_checks,
+}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def time_query(func, conn, ctx, repeat):
+    result = func(conn, ctx)  # warm-up, also fills the page cache
+    timings = []
+    started = time.perf_counter()
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(conn, ctx)
+        timings.append((time.perf_counter() - start) * 1000)
+        if i >= 2 and time.perf_counter() - started > MAX_SECONDS_PER_QUERY:
+            break
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'rows': len(result) if isinstance(result, (list, dict, tuple)) else 1,
+        'min_ms': round(timings[0], 3),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'max_ms': round(timings[-1], 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+
+
+def database_for(size, cache_dir, end):
+    # Generated once per size, seed and end date, reused from cache_dir on later runs.
+    # Sales end today so the "this month" queries have data to work on.
+    path = os.path.join(cache_dir, f"bench_{size}_{SEED}_{end.isoformat()}.db")
+    if not os.path.exists(path):
+        print(f"generating {size} sales...", flush=True)
+        generate(path, employees=EMPLOYEES, sales=size, seed=SEED, end=end)
+    return path
+
+
+def context(conn):
+    # Parameters the queries are run with: the busiest employee and a common search
+    employee_id = conn.execute('''SELECT employee_id FROM customers GROUP BY employee_id
+                                  ORDER BY COUNT(*) DESC LIMIT 1''').fetchone()[0]
+    return {'employee_id': employee_id, 'pass_type': 'Regular Pass', 'search': 'santos'}
+
+
+def run(sizes, repeat, cache_dir, only=None):
+    results = []
+    end = date.today()
+    for size in sizes:
+        conn = sqlite3.connect(database_for(size, cache_dir, end))
+        try:
+            ctx = context(conn)
+            for name, func in QUERIES.items():
+                if only and name not in only:
+                    continue
+                stats = time_query(func, conn, ctx, repeat)
+                results.append({'query': name, 'sales': size, **stats})
+                print(f"{size:>9} {name:<22} p50 {stats['p50_ms']:9.2f} ms   p95 {stats['p95_ms']:9.2f} ms   "
+                      f"max {stats['max_ms']:9.2f} ms   ({stats['runs']} runs, {stats['rows']} rows)", flush=True)
+        finally:
+            conn.close()
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    # Print p50 ratios against a previous results file, return the regressions
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = {(row['query'], row['sales']): row for row in json.load(handle)['results']}
+    regressions = []
+    print(f"\ncompared with {baseline_path} (regression if p50 is more than {threshold:.2f}x)")
+    for row in results:
+        before = baseline.get((row['query'], row['sales']))
+        if before is None or not before['p50_ms']:
+            continue
+        ratio = row['p50_ms'] / before['p50_ms']
+        flag = 'REGRESSION' if ratio > threshold else ''
+        print(f"{row['sales']:>9} {row['query']:<22} {before['p50_ms']:9.2f} -> {row['p50_ms']:9.2f} ms  {ratio:5.2f}x {flag}")
+        if flag:
+            regressions.append(row)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot queries on generated databases")
+    parser.add_argument('--sizes', default='10000,100000,500000', help="comma-separated sales counts")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', help="comma-separated query names, default all: " + ', '.join(QUERIES))
+    parser.add_argument('--out', help="results file (default bench_results/queries-<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25, help="p50 slow-down that counts as a regression")
+    parser.add_argument('--cache-dir', help="keep generated databases here between runs (default: temporary)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='funpass_bench_')
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        results = run(sizes, args.repeat, cache_dir, only)
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    out = args.out or os.path.join('bench_results', f"queries-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as handle:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': SEED,
+            'employees': EMPLOYEES,
+            'repeat': args.repeat,
+            'results': results,
+        }, handle, indent=2)
+    print(f"\nresults written to {out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark for the admin stat cards: the original sequence of nine queries
+against the combined conditional-aggregation query in queries.py.
+
+Usage: python bench_stats.py [--db funpass.db] [--rows 200000] [--repeat 20]
+
+The database is copied to a temporary file first and, if --rows is given,
+padded with synthetic sales and cancellations, so funpass.db is never modified.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import string
+import tempfile
+import time
+from datetime import date, timedelta
+
+import archive
+from queries import load_admin_stats
+
+PASS_TYPES = ['Express Pass', 'Junior Pass', 'Regular Pass', 'Student Pass', 'Senior Citizen Pass', 'PWD Pass']
+
+
+def load_admin_stats_legacy(conn):
+    # The statements AdminDashboard.show_dashboard used to run one after the other
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(SUM(amount), 0) FROM customers')
+    total_sales = cursor.fetchone()[0] or 0
+    cursor.execute('''
+        SELECT COALESCE(SUM(ca.amount), 0)
+        FROM cancellations ca
+        WHERE ca.status="Approved"
+        AND ca.ticket_id IN (SELECT ticket_id FROM customers)
+        ''')
+    total_refunds = cursor.fetchone()[0] or 0
+    cursor.execute('''SELECT COALESCE(SUM(amount), 0) FROM customers WHERE strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''')
+    total_month_sales = cursor.fetchone()[0] or 0
+    cursor.execute('''SELECT COALESCE(SUM(amount), 0) FROM cancellations WHERE status="Approved" AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''')
+    month_refunds = cursor.fetchone()[0] or 0
+    cursor.execute('SELECT COUNT(*) FROM employees')
+    active_employees = cursor.fetchone()[0] or 0
+    cursor.execute('SELECT COALESCE(SUM(quantity), 0) FROM customers')
+    total_tickets = cursor.fetchone()[0] or 0
+    cursor.execute('SELECT COALESCE(SUM(quantity), 0) FROM cancellations WHERE status="Approved"')
+    total_refunded_tickets = cursor.fetchone()[0] or 0
+    cursor.execute('SELECT COUNT(*) FROM cancellations WHERE status="Pending"')
+    pending_refunds = cursor.fetchone()[0] or 0
+    cursor.execute('''SELECT pass_type, SUM(quantity) as total_qty FROM customers WHERE strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now') GROUP BY pass_type ORDER BY total_qty DESC LIMIT 1''')
+    popular_pass = cursor.fetchone()
+    if popular_pass:
+        popular_pass_text = f"{popular_pass[0]} ({popular_pass[1]} sold)"
+    else:
+        popular_pass_text = "No passes sold yet"
+    return {
+        'net_total_sales': total_sales - total_refunds,
+        'net_total_month_sales': total_month_sales - month_refunds,
+        'active_employees': active_employees,
+        'net_total_tickets': total_tickets - total_refunded_tickets,
+        'pending_refunds': pending_refunds,
+        'popular_pass_text': popular_pass_text,
+    }
+
+
+def pad_database(conn, rows, seed=42):
+    # Append synthetic sales (and a cancellation for roughly every 20th sale)
+    rng = random.Random(seed)
+    employee_ids = [row[0] for row in conn.execute('SELECT employee_id FROM employees')] or [None]
+    today = date.today()
+    sales, cancellations = [], []
+    for i in range(rows):
+        ticket_id = 'B' + ''.join(rng.choices(string.ascii_uppercase + string.digits, k=9))
+        quantity = rng.randint(1, 5)
+        amount = quantity * rng.choice([900.0, 1300.0, 2300.0])
+        purchased = (today - timedelta(days=rng.randint(0, 730))).isoformat()
+        sales.append((ticket_id, f'Guest {i}', '', quantity, amount, purchased, purchased,
+                      rng.choice(PASS_TYPES), rng.choice(employee_ids)))
+        if i % 20 == 0:
+            cancellations.append((ticket_id, f'Guest {i}', '', 'Benchmark', quantity, amount, purchased, purchased,
+                                  rng.choice(['Pending', 'Approved', 'Rejected'])))
+    with conn:
+        conn.executemany('INSERT OR IGNORE INTO customers (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', sales)
+        conn.executemany('INSERT OR IGNORE INTO cancellations (ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', cancellations)
+
+
+def time_it(func, conn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(conn)
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<10} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms   min {timings[0]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy and combined admin stat card queries")
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--rows', type=int, default=0, help="synthetic sales to add to the copy")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='funpass_bench_')
+    db_path = os.path.join(workdir, 'bench.db')
+    shutil.copy(args.db, db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        # The combined query adds archived totals; databases older than archive.py lack the table
+        archive.install(conn)
+        conn.commit()
+        if args.rows:
+            pad_database(conn, args.rows)
+        count = conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0]
+        print(f"customers: {count} rows, {args.repeat} runs each")
+        legacy, legacy_timings = time_it(load_admin_stats_legacy, conn, args.repeat)
+        combined, combined_timings = time_it(load_admin_stats, conn, args.repeat)
+        report('legacy', legacy_timings)
+        report('combined', combined_timings)
+        if legacy != combined:
+            print(f"MISMATCH\n  legacy:   {legacy}\n  combined: {combined}")
+        else:
+            print(f"results match, speed-up {statistics.median(legacy_timings) / statistics.median(combined_timings):.2f}x")
+    finally:
+        conn.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Append-only log of row changes, filled by triggers.
+
+Every insert, update and delete on customers, cancellations, pricing and
+employees adds a (seq, table_name, row_key, op, changed_at) row, so caches,
+reports and sync jobs can ask "what changed since seq N" instead of
+rescanning the tables. install() is called from create_database() and is
+safe to run against an existing database.
+
+The log gains a row on every write, so compact() deletes entries older than
+FUNPASS_CHANGE_LOG_DAYS (default 30) days: at every app start
+(login.ensure_schema), after every archive run, and on demand. Consumers
+that were further behind get None from changes_since() and reload.
+
+Usage: python change_log.py compact [--keep-days 30] [--db funpass.db]
+       python change_log.py status [--db funpass.db]
+"""
+import argparse
+import os
+import sqlite3
+
+# Days of history compact() keeps
+KEEP_DAYS = int(os.environ.get('FUNPASS_CHANGE_LOG_DAYS', 30))
+
+# Table -> column that identifies a row in the log
+TRACKED_TABLES = {
+    'customers': 'ticket_id',
+    'cancellations': 'id',
+    'pricing': 'pass_type',
+    'employees': 'employee_id',
+}
+
+
+def install(conn):
+    # Create the log table and its triggers if they are missing (does not commit)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log (table_name, seq)')
+    # Highest seq removed by compact(), consumers behind it have to reload
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            compacted_through INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO change_log_state (id, compacted_through) VALUES (1, 0)')
+    for table, key in TRACKED_TABLES.items():
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op) VALUES ('{table}', NEW.{key}, 'INSERT');
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op) VALUES ('{table}', NEW.{key}, 'UPDATE');
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op) VALUES ('{table}', OLD.{key}, 'DELETE');
+            END
+        ''')
+
+
+def is_installed(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='change_log'").fetchone() is not None
+
+
+def latest_seq(conn):
+    # Sequence number of the newest change, start consuming from here to skip history
+    return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+
+
+def compacted_through(conn):
+    return conn.execute('SELECT compacted_through FROM change_log_state WHERE id = 1').fetchone()[0]
+
+
+def changes_since(conn, seq, tables=None, limit=None):
+    """Return the changes after seq, oldest first, as
+    (seq, table_name, row_key, op, changed_at) tuples.
+
+    Returns None when entries after seq were already compacted away; the
+    caller then has to reload from the tables and continue from latest_seq().
+    """
+    if seq < compacted_through(conn):
+        return None
+    sql = 'SELECT seq, table_name, row_key, op, changed_at FROM change_log WHERE seq > ?'
+    params = [seq]
+    if tables:
+        sql += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+        params.extend(tables)
+    sql += ' ORDER BY seq'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def compact(conn, keep_days=KEEP_DAYS):
+    # Delete entries older than keep_days, returns how many were removed (commits)
+    with conn:
+        last = conn.execute(
+            "SELECT MAX(seq) FROM change_log WHERE changed_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)",
+            (f'-{keep_days} days',)).fetchone()[0]
+        if last is None:
+            return 0
+        removed = conn.execute('DELETE FROM change_log WHERE seq <= ?', (last,)).rowcount
+        conn.execute('UPDATE change_log_state SET compacted_through = MAX(compacted_through, ?) WHERE id = 1', (last,))
+    return removed
+
+
+def drop_triggers(conn, tables=None):
+    # For bulk loads and moves that must not be logged row by row; install() puts them back
+    for table in tables or TRACKED_TABLES:
+        for op in ('insert', 'update', 'delete'):
+            conn.execute(f'DROP TRIGGER IF EXISTS change_log_{table}_{op}')
+
+
+def force_reload(conn, tables):
+    """Make every consumer reload tables after a change that was not logged row by row.
+
+    One RELOAD entry is logged per table and the log is marked compacted up
+    to it, so changes_since() returns None for anyone who had not seen it.
+    Does not commit.
+    """
+    for table in tables:
+        conn.execute("INSERT INTO change_log (table_name, row_key, op) VALUES (?, '*', 'RELOAD')", (table,))
+    conn.execute('UPDATE change_log_state SET compacted_through = MAX(compacted_through, ?) WHERE id = 1',
+                 (latest_seq(conn),))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact or inspect the FunPass change log")
+    parser.add_argument('command', choices=['compact', 'status'])
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help="days of changes compact keeps")
+    parser.add_argument('--db', default='funpass.db')
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        install(conn)
+        conn.commit()
+        if args.command == 'compact':
+            print(f"Removed {compact(conn, args.keep_days)} change log entries older than {args.keep_days} days")
+        count, oldest = conn.execute('SELECT COUNT(*), MIN(changed_at) FROM change_log').fetchone()
+        print(f"{count} entries since {oldest or '-'}; latest seq {latest_seq(conn)}, "
+              f"compacted through {compacted_through(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Sales-trend and pass-mix charts for the dashboards.
+
+Charts are drawn with matplotlib's Agg backend (a Figure with its own
+FigureCanvasAgg, never pyplot, so it is safe off the Tk thread) and handed
+back as PNG bytes for the Tk thread to show. Rendered images are cached by
+chart, employee, pixel size and a digest of the rollup they were drawn from:
+the rollups themselves are small GROUP BY queries kept in stats_cache, and a
+chart is only redrawn when its numbers actually changed.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from invalidation import SALES, CANCELLATIONS
+from stats_cache import stats_cache
+
+CHARTS = ('daily', 'monthly', 'pass_mix')
+TITLES = {'daily': "Net Sales, Last 30 Days", 'monthly': "Net Sales, Last 12 Months", 'pass_mix': "Pass Mix This Month"}
+DEFAULT_SIZE = (460, 260)
+COLORS = ['#9A4E62', '#2196F3', '#009688', '#FF9800', '#673AB7', '#4CAF50']
+
+# Net sales per day or month (first 7 or 10 characters of the date): sales less approved refunds
+NET_SALES_SQL = '''
+    SELECT period, SUM(amount) FROM (
+        SELECT substr(purchased_date, 1, {width}) AS period, amount
+        FROM customers
+        WHERE purchased_date >= ? {employee_filter}
+        UNION ALL
+        SELECT substr(ca.purchased_date, 1, {width}), -ca.amount
+        FROM cancellations ca
+        WHERE ca.status = 'Approved' AND ca.purchased_date >= ?
+              {refund_employee_filter}
+    )
+    GROUP BY period
+'''
+
+# Archived months (see archive.py), net of approved refunds; refunds of unknown sales only count park-wide
+ARCHIVED_NET_SALES_SQL = '''
+    SELECT month, SUM(amount) - SUM({refunds})
+    FROM archived_totals
+    WHERE month >= ? {employee_filter}
+    GROUP BY month
+'''
+
+PASS_MIX_SQL = '''
+    SELECT pass_type, SUM(quantity)
+    FROM customers
+    WHERE purchased_date >= ? {employee_filter}
+    GROUP BY pass_type
+    ORDER BY SUM(quantity) DESC
+'''
+
+
+def _net_sales(conn, width, since, employee_id):
+    employee_filter = refund_employee_filter = ''
+    params = [since]
+    if employee_id is not None:
+        employee_filter = 'AND employee_id = ?'
+        refund_employee_filter = 'AND ca.ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id = ?)'
+        params.append(employee_id)
+    params.append(since)
+    if employee_id is not None:
+        params.append(employee_id)
+    sql = NET_SALES_SQL.format(width=width, employee_filter=employee_filter, refund_employee_filter=refund_employee_filter)
+    return dict(conn.execute(sql, params).fetchall())
+
+
+def load_rollups(conn, employee_id=None, today=None):
+    # Data behind the three charts, with empty days/months filled in as zero
+    today = today or date.today()
+    days = [(today - timedelta(days=offset)).isoformat() for offset in range(29, -1, -1)]
+    daily = _net_sales(conn, 10, days[0], employee_id)
+    months = []
+    year, month = today.year, today.month
+    for _ in range(12):
+        months.insert(0, f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    monthly = _net_sales(conn, 7, months[0] + '-01', employee_id)
+    sql = ARCHIVED_NET_SALES_SQL.format(
+        refunds='refunded_amount' if employee_id is None else 'matched_refunded_amount',
+        employee_filter='AND employee_id = ?' if employee_id is not None else '')
+    for month, amount in conn.execute(sql, [months[0]] + ([employee_id] if employee_id is not None else [])):
+        monthly[month] = monthly.get(month, 0) + amount
+    sql = PASS_MIX_SQL.format(employee_filter='AND employee_id = ?' if employee_id is not None else '')
+    params = [today.replace(day=1).isoformat()] + ([employee_id] if employee_id is not None else [])
+    return {
+        'daily': [(day, daily.get(day, 0)) for day in days],
+        'monthly': [(month, monthly.get(month, 0)) for month in months],
+        'pass_mix': [tuple(row) for row in conn.execute(sql, params).fetchall()],
+    }
+
+
+def render_chart(name, rows, width, height, dpi=100):
+    # One chart as PNG bytes; safe to call on any thread
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor='white')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.set_title(TITLES[name], fontsize=10, color='#22223B', loc='left')
+    for side in ('top', 'right'):
+        ax.spines[side].set_visible(False)
+    ax.tick_params(labelsize=7, colors='#6b7280')
+    if name == 'pass_mix':
+        if rows:
+            labels = [pass_type for pass_type, _ in rows]
+            ax.barh(labels[::-1], [quantity for _, quantity in rows][::-1], color=COLORS[:len(rows)][::-1])
+            ax.set_xlabel("Tickets", fontsize=7, color='#6b7280')
+        else:
+            ax.text(0.5, 0.5, "No passes sold yet", ha='center', va='center', fontsize=9, color='#6b7280', transform=ax.transAxes)
+            ax.set_axis_off()
+    else:
+        labels = [period[5:] for period, _ in rows]  # MM-DD or MM
+        values = [amount for _, amount in rows]
+        if name == 'daily':
+            ax.plot(range(len(values)), values, color=COLORS[0], linewidth=1.6)
+            ax.fill_between(range(len(values)), values, color=COLORS[0], alpha=0.12)
+            step = 5
+        else:
+            ax.bar(range(len(values)), values, color=COLORS[1])
+            step = 1
+        ax.set_xticks(range(0, len(labels), step))
+        ax.set_xticklabels(labels[::step])
+        ax.yaxis.set_major_formatter(lambda value, _: f"₱{value / 1000:,.0f}k" if abs(value) >= 1000 else f"₱{value:,.0f}")
+        ax.grid(axis='y', color='#E0E0E0', linewidth=0.6)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi)
+    return buffer.getvalue()
+
+
+class ChartCache:
+    # Rendered PNGs, least recently used dropped first
+    def __init__(self, max_entries=48):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.renders = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return self._images[key]
+        png = render()
+        with self._lock:
+            self.renders += 1
+            self._images[key] = png
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return png
+
+
+chart_cache = ChartCache()
+
+
+def dashboard_charts(conn, employee_id=None, size=DEFAULT_SIZE):
+    """PNG bytes for every chart, keyed by chart name; runs on a worker thread.
+
+    Pass employee_id for one employee's sales, None for the whole park.
+    """
+    today = date.today()
+    rollups = stats_cache.get(('chart_rollups', employee_id, today), lambda: load_rollups(conn, employee_id, today),
+                              (SALES, CANCELLATIONS))
+    images = {}
+    for name in CHARTS:
+        digest = hashlib.sha1(repr(rollups[name]).encode('utf-8')).hexdigest()
+        key = (name, employee_id, size, digest)
+        images[name] = chart_cache.get(key, lambda name=name: render_chart(name, rollups[name], *size))
+    return images
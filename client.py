@@ -0,0 +1,277 @@
+"""
+Backends the dashboards call for sales, refunds, pricing and allocations.
+
+LocalBackend runs services.py directly against funpass.db, as a single
+terminal always has. ApiClient sends the same calls to server.py, so several
+POS terminals can share one ticketing server. get_backend() picks ApiClient
+when FUNPASS_API_URL is set, and sends the server's shared token from
+FUNPASS_API_TOKEN.
+
+Reads go the same way: connect() opens funpass.db, or with FUNPASS_API_URL a
+RemoteConnection that runs each SELECT on the server, so a terminal sees the
+sales every other terminal made. It has the parts of sqlite3.Connection the
+dashboards use; each statement is its own read transaction on the server.
+"""
+import http.client
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+from urllib.parse import urlencode, urlparse
+
+import query_trace
+import services
+from services import ServiceError
+
+
+class LocalBackend:
+    def __init__(self, db_path='funpass.db'):
+        self.db_path = db_path
+
+    def _call(self, func, *args, **kwargs):
+        conn = query_trace.connect(self.db_path)
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            conn.close()
+
+    def get_prices(self):
+        return self._call(services.get_prices)
+
+    def set_prices(self, prices):
+        return self._call(services.set_prices, prices)
+
+    def reset_prices(self):
+        return self._call(services.reset_prices)
+
+    def availability(self, employee_id):
+        return self._call(services.availability, employee_id)
+
+    def authenticate(self, username, password):
+        return self._call(services.authenticate, username, password)
+
+    def search_sales(self, text='', employee_id=None, limit=50):
+        return self._call(services.search_sales, text, employee_id, limit)
+
+    def sell_tickets(self, **sale):
+        return self._call(services.sell_tickets, **sale)
+
+    def sell_group(self, **group):
+        return self._call(services.sell_group, **group)
+
+    def update_sale(self, **sale):
+        return self._call(services.update_sale, **sale)
+
+    def delete_sale(self, ticket_id, employee_id=None):
+        return self._call(services.delete_sale, ticket_id, employee_id)
+
+    def request_cancellation(self, **request):
+        return self._call(services.request_cancellation, **request)
+
+    def decide_cancellation(self, ticket_id, status):
+        return self._call(services.decide_cancellation, ticket_id, status)
+
+    def delete_cancellation(self, ticket_id):
+        return self._call(services.delete_cancellation, ticket_id)
+
+    def save_employee(self, **employee):
+        return self._call(services.save_employee, **employee)
+
+    def allocate(self, employee_id, allocations):
+        return self._call(services.allocate, employee_id, allocations)
+
+    def allocate_many(self, allocations):
+        return self._call(services.allocate_many, allocations)
+
+    def delete_employee(self, employee_id):
+        return self._call(services.delete_employee, employee_id)
+
+
+class ApiClient:
+    # Same methods as LocalBackend, served by server.py; rejected requests and an unreachable server raise ServiceError
+    def __init__(self, base_url, token=None, timeout=10):
+        url = urlparse(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.token = token or os.environ.get('FUNPASS_API_TOKEN', '')
+        self.timeout = timeout
+        self._local = threading.local()  # one keep-alive connection per thread
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _request(self, method, path, query=None, body=None):
+        if query:
+            path += '?' + urlencode({key: value for key, value in query.items() if value is not None})
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Authorization': f"Bearer {self.token}"}
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                payload = json.loads(response.read() or b'{}')
+                break
+            except (OSError, http.client.HTTPException) as e:
+                # The server closed an idle keep-alive connection, reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise ServiceError(f"Can't reach the FunPass server at {self.host}:{self.port}: {e}") from e
+        if response.status != 200:
+            raise ServiceError(payload.get('error', f"Server error {response.status}"))
+        return payload['result']
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def query(self, sql, params=()):
+        return self._request('POST', '/query', body={'sql': sql, 'params': params})
+
+    def get_prices(self):
+        return self._request('GET', '/pricing')
+
+    def set_prices(self, prices):
+        return self._request('POST', '/pricing', body={'prices': prices})
+
+    def reset_prices(self):
+        return self._request('POST', '/pricing', body={'reset': True})
+
+    def availability(self, employee_id):
+        return self._request('GET', '/availability', {'employee_id': employee_id})
+
+    def authenticate(self, username, password):
+        return self._request('POST', '/login', body={'username': username, 'password': password})
+
+    def search_sales(self, text='', employee_id=None, limit=50):
+        return self._request('GET', '/sales', {'q': text, 'employee_id': employee_id, 'limit': limit})
+
+    def sell_tickets(self, **sale):
+        return self._request('POST', '/sales', body=sale)
+
+    def sell_group(self, **group):
+        return self._request('POST', '/sales/group', body=group)
+
+    def update_sale(self, **sale):
+        return self._request('POST', '/sales/update', body=sale)
+
+    def delete_sale(self, ticket_id, employee_id=None):
+        return self._request('POST', '/sales/delete', body={'ticket_id': ticket_id, 'employee_id': employee_id})
+
+    def request_cancellation(self, **request):
+        return self._request('POST', '/cancellations', body=request)
+
+    def decide_cancellation(self, ticket_id, status):
+        return self._request('POST', '/cancellations/decision', body={'ticket_id': ticket_id, 'status': status})
+
+    def delete_cancellation(self, ticket_id):
+        return self._request('POST', '/cancellations/delete', body={'ticket_id': ticket_id})
+
+    def save_employee(self, **employee):
+        return self._request('POST', '/employees', body=employee)
+
+    def allocate(self, employee_id, allocations):
+        return self._request('POST', '/employees/allocations', body={'employee_id': employee_id, 'allocations': allocations})
+
+    def allocate_many(self, allocations):
+        return self._request('POST', '/employees/allocations/bulk', body={'allocations': allocations})
+
+    def delete_employee(self, employee_id):
+        return self._request('POST', '/employees/delete', body={'employee_id': employee_id})
+
+
+# Transactions can't span requests, every statement already runs in its own
+TRANSACTION_SQL = re.compile(r'\s*(BEGIN|COMMIT|END|ROLLBACK)\b', re.IGNORECASE)
+
+
+class RemoteCursor:
+    # The parts of sqlite3.Cursor the dashboards use; the whole result arrives with execute()
+    arraysize = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._rows = iter(())
+
+    def execute(self, sql, parameters=()):
+        self.description = None
+        self._rows = iter(())
+        if TRANSACTION_SQL.match(sql):
+            return self
+        try:
+            result = self.connection.client.query(sql, parameters)
+        except ServiceError as e:
+            raise sqlite3.OperationalError(str(e)) from e  # callers catch sqlite3 errors, as for a local database
+        if result['columns']:
+            self.description = tuple((name, None, None, None, None, None, None) for name in result['columns'])
+        self._rows = iter([tuple(row) for row in result['rows']])
+        return self
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        return list(itertools.islice(self._rows, size or self.arraysize))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        self._rows = iter(())
+
+
+class RemoteConnection:
+    # Read-only stand-in for a sqlite3 connection to the server's database (POST /query)
+    def __init__(self, url, token=None):
+        self.url = url
+        self.client = ApiClient(url, token)
+
+    def cursor(self):
+        return RemoteCursor(self)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.client.close()
+
+
+def remote():
+    # True when the dashboards talk to a FunPass server rather than funpass.db
+    return bool(os.environ.get('FUNPASS_API_URL'))
+
+
+def connect(db_path='funpass.db'):
+    # Connection for reads: the server's database with FUNPASS_API_URL set, otherwise db_path
+    if remote():
+        return RemoteConnection(os.environ['FUNPASS_API_URL'])
+    return query_trace.connect(db_path)
+
+
+def get_backend():
+    # Talk to a FunPass server if FUNPASS_API_URL is set, otherwise use the local database
+    if remote():
+        return ApiClient(os.environ['FUNPASS_API_URL'])
+    return LocalBackend()
@@ -0,0 +1,183 @@
+"""
+Seeded generator for large, realistic FunPass databases.
+
+Builds a new database with shared.create_database, then bulk-inserts
+employees, sales spread over the last N years and refund requests in every
+status. The same seed always gives the same database, so benchmarks can
+compare runs. Sales follow a park-like pattern: busier weekends, peaks in
+the April-May summer break and in December, and a pass mix dominated by
+Regular and Student passes. Allocations are set to what each employee sold
+plus some headroom, so every employee still has tickets left to sell.
+
+The change_log triggers are dropped while loading and reinstalled at the
+end, so the generated history is not replayed as millions of changes.
+
+Usage: python datagen.py big.db [--employees 25] [--sales 200000] [--years 2] [--seed 42] [--force]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import string
+import time
+from datetime import date, timedelta
+
+import change_log
+from services import PASS_COLUMNS
+from shared import create_database
+
+BATCH_SIZE = 50000
+
+PASS_MIX = {
+    'Regular Pass': 40,
+    'Student Pass': 18,
+    'Junior Pass': 15,
+    'Express Pass': 12,
+    'Senior Citizen Pass': 9,
+    'PWD Pass': 6,
+}
+QUANTITY_MIX = {1: 34, 2: 30, 3: 14, 4: 12, 5: 5, 6: 2, 8: 2, 10: 1}
+# Relative visitors per month (school breaks and holidays) and per weekday (Monday first)
+MONTH_WEIGHTS = [0.8, 0.7, 0.9, 1.5, 1.6, 1.1, 0.9, 0.8, 0.7, 0.8, 1.0, 1.6]
+WEEKDAY_WEIGHTS = [0.6, 0.6, 0.7, 0.8, 1.0, 1.9, 1.8]
+# Cancellation status mix; requests for recent sales are mostly still pending
+STATUS_MIX = {'Approved': 60, 'Rejected': 15, 'Pending': 25}
+RECENT_STATUS_MIX = {'Approved': 20, 'Rejected': 5, 'Pending': 75}
+REASONS = ['Change of plans', 'Bad weather forecast', 'Medical reasons', 'Booked the wrong date',
+           'Booked the wrong pass type', 'Family emergency', 'Duplicate purchase', 'Travel cancelled']
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Angel', 'John', 'Grace', 'Paolo', 'Kristine', 'Miguel',
+               'Andrea', 'Carlo', 'Nicole', 'Rafael', 'Patricia', 'Gabriel', 'Camille', 'Daniel', 'Bea', 'Luis',
+               'Sofia', 'Marco', 'Isabel', 'Ramon', 'Liza', 'Noel', 'Joy', 'Enzo', 'Trisha']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres', 'Tomas', 'Andrada',
+              'Castillo', 'Flores', 'Villanueva', 'Ramos', 'Castro', 'Rivera', 'Aquino', 'Navarro', 'Salazar',
+              'Mercado', 'Domingo', 'Gonzales', 'Lopez', 'Dela Cruz', 'Del Rosario', 'Soriano', 'Lim', 'Tan']
+
+
+def _weighted(mapping):
+    return list(mapping), list(mapping.values())
+
+
+def _days(rng, start, end, count):
+    # count purchase dates between start and end (inclusive), following the seasonal weights, sorted
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    weights = [MONTH_WEIGHTS[day.month - 1] * WEEKDAY_WEIGHTS[day.weekday()] for day in days]
+    return sorted(rng.choices(days, weights=weights, k=count))
+
+
+def generate(db_path, employees=25, sales=200000, years=2, seed=42, end=None, cancel_rate=0.04, force=False):
+    """Create db_path filled with synthetic data and return row counts and timing.
+
+    end is the last purchase date (today by default), so a fixed end plus a
+    fixed seed gives an identical database on every run.
+    """
+    start_time = time.perf_counter()
+    if os.path.exists(db_path):
+        if not force:
+            raise FileExistsError(f"{db_path} already exists")
+        os.remove(db_path)
+    create_database(db_path)
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years - 1)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')  # a half-written generated database is simply regenerated
+    try:
+        with conn:
+            change_log.drop_triggers(conn)
+            conn.execute('DELETE FROM employees')
+            prices = dict(conn.execute('SELECT pass_type, price FROM pricing'))
+
+            # Employees; a few are much busier than the rest
+            employee_ids = rng.sample(range(10000, 100000), employees)
+            employee_ids = [f"E{number}" for number in employee_ids]
+            employee_names = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in employee_ids]
+            employee_weights = [rng.paretovariate(2.5) for _ in employee_ids]
+            conn.executemany('INSERT INTO employees (employee_id, name, username, password) VALUES (?, ?, ?, ?)',
+                             [(employee_id, name, f"{name.split()[0].lower()}{i + 1}", 'password')
+                              for i, (employee_id, name) in enumerate(zip(employee_ids, employee_names))])
+
+            pass_types, pass_weights = _weighted(PASS_MIX)
+            quantities, quantity_weights = _weighted(QUANTITY_MIX)
+            alphabet = string.ascii_uppercase + string.digits
+            id_length = 5 if sales <= 5000000 else 7
+            used_ids = set()
+            sold = {}  # (employee_id, pass type) -> tickets
+            recent = end - timedelta(days=30)
+            statuses, status_weights = _weighted(STATUS_MIX)
+            recent_statuses, recent_status_weights = _weighted(RECENT_STATUS_MIX)
+            sales_rows, cancellation_rows = [], []
+            cancellations = 0
+            # Weighted picks are drawn in bulk, one choices() call each instead of one per sale
+            days = _days(rng, start, end, sales)
+            sale_passes = rng.choices(pass_types, pass_weights, k=sales)
+            sale_quantities = rng.choices(quantities, quantity_weights, k=sales)
+            sale_employees = rng.choices(employee_ids, employee_weights, k=sales)
+            for i, (day, pass_type, quantity, employee_id) in enumerate(zip(days, sale_passes, sale_quantities, sale_employees)):
+                ticket_id = 'F' + ''.join(rng.choices(alphabet, k=id_length))
+                while ticket_id in used_ids:
+                    ticket_id = 'F' + ''.join(rng.choices(alphabet, k=id_length))
+                used_ids.add(ticket_id)
+                sold[(employee_id, pass_type)] = sold.get((employee_id, pass_type), 0) + quantity
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                name = f"{first} {last}"
+                email = f"{first.lower()}.{last.lower().replace(' ', '')}{rng.randint(1, 999)}@example.com" if rng.random() < 0.9 else ''
+                purchased = day.isoformat()
+                booked = (day + timedelta(days=min(int(rng.expovariate(1 / 7)), 90))).isoformat()
+                amount = prices[pass_type] * quantity
+                sales_rows.append((ticket_id, name, email, quantity, amount, booked, purchased, pass_type, employee_id))
+                if rng.random() < cancel_rate:
+                    if day >= recent:
+                        status = rng.choices(recent_statuses, recent_status_weights)[0]
+                    else:
+                        status = rng.choices(statuses, status_weights)[0]
+                    cancellation_rows.append((ticket_id, name, email, rng.choice(REASONS), quantity, amount,
+                                              booked, purchased, pass_type, status))
+                if len(sales_rows) >= BATCH_SIZE or i == sales - 1:
+                    conn.executemany('''INSERT INTO customers
+                        (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', sales_rows)
+                    conn.executemany('''INSERT INTO cancellations
+                        (ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, pass_type, status)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', cancellation_rows)
+                    cancellations += len(cancellation_rows)
+                    sales_rows, cancellation_rows = [], []
+
+            # Allocations cover what was sold plus headroom for new sales
+            columns = ', '.join(f'{column} = ?' for column in PASS_COLUMNS.values())
+            conn.executemany(f'UPDATE employees SET {columns} WHERE employee_id = ?',
+                             [[sold.get((employee_id, pass_type), 0) + rng.randint(20, 200) for pass_type in PASS_COLUMNS]
+                              + [employee_id] for employee_id in employee_ids])
+            change_log.install(conn)
+    finally:
+        conn.close()
+    return {
+        'path': db_path,
+        'employees': employees,
+        'sales': sales,
+        'cancellations': cancellations,
+        'first_date': start.isoformat(),
+        'last_date': end.isoformat(),
+        'seconds': time.perf_counter() - start_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic FunPass database")
+    parser.add_argument('path')
+    parser.add_argument('--employees', type=int, default=25)
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=date.fromisoformat, help="last purchase date, YYYY-MM-DD (default today)")
+    parser.add_argument('--cancel-rate', type=float, default=0.04, help="share of sales with a refund request")
+    parser.add_argument('--force', action='store_true', help="overwrite an existing file")
+    args = parser.parse_args()
+    result = generate(args.path, args.employees, args.sales, args.years, args.seed, args.end, args.cancel_rate, args.force)
+    print(f"{result['path']}: {result['employees']} employees, {result['sales']} sales and "
+          f"{result['cancellations']} cancellations from {result['first_date']} to {result['last_date']} "
+          f"in {result['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Background executor for database work.
+
+Queries run on worker threads that each own their own SQLite connection (or
+a client.RemoteConnection to a FunPass server), so a slow statement never
+freezes the Tk window. Finished jobs are handed back
+to the Tk thread by a root.after() polling loop, which is the only place
+callbacks run, so callbacks may touch widgets freely.
+"""
+import itertools
+import queue
+import threading
+
+import client
+from query_trace import tracer
+
+# Job priorities, lower runs first
+HIGH = 0      # the page the user just opened
+NORMAL = 5
+LOW = 10      # background refreshes nobody is waiting for
+
+
+class Job:
+    def __init__(self, func, args, callback, errback, priority, key):
+        self.func = func
+        self.args = args
+        self.callback = callback
+        self.errback = errback
+        self.priority = priority
+        self.key = key
+        self.screen = tracer.screen  # screen the job was submitted from, for query tracing
+        self.cancelled = False
+
+    def cancel(self):
+        # A cancelled job is skipped if it has not started, and its result is dropped if it has
+        self.cancelled = True
+
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+
+def _report_error(error):
+    print(f"Background query failed: {error}")
+
+
+class DBExecutor:
+    def __init__(self, root, db_path='funpass.db', workers=1, poll_ms=20):
+        self.root = root
+        self.db_path = db_path
+        self.poll_ms = poll_ms
+        self._jobs = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._order = itertools.count()  # keeps FIFO order within a priority
+        self._keyed = {}  # key -> latest job submitted with that key
+        self._closed = False
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"funpass-db-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, func, *args, callback=None, errback=None, priority=NORMAL, key=None):
+        """Run func(conn, *args) on a worker and pass its result to callback on the Tk thread.
+
+        Submitting a job with the same key as a pending one cancels the older
+        job, e.g. key='page' makes sure only the last opened page gets filled.
+        """
+        job = Job(func, args, callback, errback, priority, key)
+        if key is not None:
+            previous = self._keyed.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._keyed[key] = job
+        self._jobs.put((priority, next(self._order), job))
+        return job
+
+    def query(self, sql, params=(), **kwargs):
+        # Shortcut for a single SELECT whose rows are passed to the callback
+        return self.submit(_fetchall, sql, params, **kwargs)
+
+    def pending(self, key):
+        # True while a job submitted with key has not been delivered yet
+        return key in self._keyed
+
+    def cancel(self, key):
+        job = self._keyed.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def _worker(self):
+        conn = client.connect(self.db_path)  # owned by this thread only; the server's database with FUNPASS_API_URL
+        try:
+            while True:
+                _, _, job = self._jobs.get()
+                if job is None:  # shutdown
+                    break
+                if job.cancelled:
+                    continue
+                try:
+                    with tracer.screen_context(job.screen):
+                        result = job.func(conn, *job.args)
+                    self._results.put((job, result, None))
+                except Exception as e:
+                    conn.rollback()
+                    self._results.put((job, None, e))
+        finally:
+            conn.close()
+
+    def _poll(self):
+        # Runs on the Tk thread: deliver every finished job, then reschedule
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job.key is not None and self._keyed.get(job.key) is job:
+                del self._keyed[job.key]
+            if job.cancelled:
+                continue
+            try:
+                if error is not None:
+                    (job.errback or _report_error)(error)
+                elif job.callback is not None:
+                    job.callback(result)
+            except Exception as e:
+                print(f"Error delivering background query result: {e}")
+        if not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        # Drop pending jobs and stop the workers (their connections are closed on exit)
+        self._closed = True
+        try:
+            self.root.after_cancel(self._poll_id)
+        except Exception:
+            pass
+        for job in self._keyed.values():
+            job.cancel()
+        for _ in self._threads:
+            self._jobs.put((-1, next(self._order), None))
@@ -0,0 +1,155 @@
+"""
+Streaming CSV export of customers, cancellations and the employee sales summary.
+
+Rows are fetched with fetchmany and written straight to the file, so memory
+stays flat however large the table is. A path ending in .gz is written as
+gzip-compressed CSV. The file is written under a .part name and renamed when
+complete, so finance never picks up a half-written export.
+
+Filters: a purchased_date range (inclusive, YYYY-MM-DD) and one or more pass types.
+A range reaching back before the archive boundary also reads the archived
+sales and refunds (see archive.py).
+
+Usage: python exporter.py customers sales.csv.gz [--db funpass.db] [--from 2025-01-01] [--to 2025-01-31]
+                          [--pass-type "Regular Pass" ...]
+"""
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import time
+
+import archive
+
+CHUNK_SIZE = 5000
+
+# name -> (header, SELECT, table alias the filters apply to, GROUP BY/ORDER BY tail)
+EXPORTS = {
+    'customers': (
+        ['ticket_id', 'name', 'email', 'pass_type', 'quantity', 'amount', 'booked_date', 'purchased_date',
+         'employee_id', 'employee_name'],
+        '''SELECT c.ticket_id, c.name, c.email, c.pass_type, c.quantity, c.amount, c.booked_date, c.purchased_date,
+                  c.employee_id, IFNULL(e.name, '')
+           FROM {customers} c LEFT JOIN employees e ON c.employee_id = e.employee_id''',
+        'c',
+        'ORDER BY c.purchased_date, c.ticket_id',
+    ),
+    'cancellations': (
+        ['ticket_id', 'name', 'email', 'pass_type', 'reasons', 'quantity', 'amount', 'booked_date',
+         'purchased_date', 'status'],
+        '''SELECT ca.ticket_id, ca.name, ca.email, ca.pass_type, ca.reasons, ca.quantity, ca.amount, ca.booked_date,
+                  ca.purchased_date, ca.status
+           FROM {cancellations} ca''',
+        'ca',
+        'ORDER BY ca.id',
+    ),
+    # One row per employee and pass type: sales in the range less approved refunds of those sales
+    'employee_sales': (
+        ['employee_id', 'employee_name', 'pass_type', 'tickets_sold', 'gross_sales', 'refunded_tickets', 'refunds',
+         'net_tickets', 'net_sales'],
+        '''SELECT c.employee_id, IFNULL(e.name, ''), c.pass_type,
+                  SUM(c.quantity), SUM(c.amount),
+                  COALESCE(SUM(ca.quantity), 0), COALESCE(SUM(ca.amount), 0),
+                  SUM(c.quantity) - COALESCE(SUM(ca.quantity), 0), SUM(c.amount) - COALESCE(SUM(ca.amount), 0)
+           FROM {customers} c
+           LEFT JOIN employees e ON c.employee_id = e.employee_id
+           LEFT JOIN {cancellations} ca ON ca.ticket_id = c.ticket_id AND ca.status = "Approved"''',
+        'c',
+        'GROUP BY c.employee_id, c.pass_type ORDER BY e.name, c.pass_type',
+    ),
+}
+
+
+def _where(alias, date_from, date_to, pass_types):
+    clauses, params = [], []
+    if date_from:
+        clauses.append(f'{alias}.purchased_date >= ?')
+        params.append(date_from)
+    if date_to:
+        clauses.append(f'{alias}.purchased_date <= ?')
+        params.append(date_to)
+    if pass_types:
+        clauses.append(f"{alias}.pass_type IN ({', '.join('?' for _ in pass_types)})")
+        params.extend(pass_types)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def _open(path, compressed):
+    if compressed:
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def export(conn, name, path, date_from=None, date_to=None, pass_types=None, progress=None, chunk_size=CHUNK_SIZE):
+    """Write one export to path and return a summary dict.
+
+    progress(rows_written, fraction) is called after every chunk.
+    """
+    start = time.perf_counter()
+    header, select, alias, tail = EXPORTS[name]
+    customers, cancellations = archive.history_tables(conn, date_from, date_to)
+    select = select.format(customers=customers, cancellations=cancellations)
+    where, params = _where(alias, date_from, date_to, pass_types)
+    total = None
+    if progress is not None:
+        # One extra pass over the index/table so the progress bar has an end
+        total = conn.execute(f'SELECT COUNT(*) FROM ({select}{where} {tail})', params).fetchone()[0]
+    cursor = conn.execute(f'{select}{where} {tail}', params)
+    part_path = path + '.part'
+    rows = 0
+    try:
+        with _open(part_path, path.endswith('.gz')) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                rows += len(chunk)
+                if progress is not None:
+                    progress(rows, rows / total if total else 1.0)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        cursor.close()
+    if progress is not None:
+        progress(rows, 1.0)
+    return {'name': name, 'path': path, 'rows': rows, 'seconds': time.perf_counter() - start}
+
+
+def export_table(db_path, name, path, date_from=None, date_to=None, pass_types=None, progress=None):
+    # Convenience wrapper that owns its connection, safe to call from a worker thread
+    conn = sqlite3.connect(db_path)
+    try:
+        return export(conn, name, path, date_from, date_to, pass_types, progress)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export FunPass data to CSV (gzip if the file name ends in .gz)")
+    parser.add_argument('name', choices=sorted(EXPORTS))
+    parser.add_argument('path')
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--from', dest='date_from', help="first purchased date, YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="last purchased date, YYYY-MM-DD")
+    parser.add_argument('--pass-type', dest='pass_types', action='append', help="repeat for several pass types")
+    args = parser.parse_args()
+
+    def progress(rows, fraction):
+        print(f"\r{rows} rows written ({fraction:.0%})", end='', flush=True)
+
+    try:
+        result = export_table(args.db, args.name, args.path, args.date_from, args.date_to, args.pass_types, progress)
+    except ValueError as e:  # the range includes compressed months
+        parser.error(str(e))
+    print(f"\nExported {result['rows']} rows to {result['path']} in {result['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
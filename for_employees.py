@@ -2,21 +2,37 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import sqlite3
+from query_trace import tracer
+from profiler import profile, profiled
+from ui_latency import LatencyMonitor
+from stall_watchdog import StallWatchdog
+from leak_monitor import leak_monitor
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkcalendar import DateEntry
 import pandas as pd
-from shared import create_database, BaseWindow
+from shared import create_database, BaseWindow, load_photo, close_session
+from invalidation import ViewRegistry, PRICING, SALES, CANCELLATIONS, ALLOCATIONS
+from stats_cache import stats_cache
+from db_executor import DBExecutor, HIGH, LOW
+import charts
+import io
+import change_log
+import archive
+import ticket_lookup
+import row_store
+import services
+from services import ServiceError
+from client import get_backend, connect
+from mailer import mailer
 import customtkinter as ctk
 import tkinter.ttk as ttk
 import time
-import smtplib
-from email.message import EmailMessage
 
 # database setup
-def create_database():
-    conn = sqlite3.connect('funpass.db')
+def create_database(db_path='funpass.db'):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # To create admin table
@@ -35,7 +51,7 @@ def create_database():
     # Ceate employees table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS employees (
-            employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id TEXT PRIMARY KEY,
             name TEXT NOT NULL,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL,
@@ -77,9 +93,14 @@ def create_database():
             booked_date TEXT NOT NULL,
             purchased_date TEXT NOT NULL,
             status TEXT DEFAULT 'Pending',
+            pass_type TEXT,
             FOREIGN KEY (ticket_id) REFERENCES customers (ticket_id)
         )
     ''')
+    # Databases created before refunds recorded the pass type
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(cancellations)')]
+    if 'pass_type' not in columns:
+        cursor.execute('ALTER TABLE cancellations ADD COLUMN pass_type TEXT')
 
     # Create pricing table
     cursor.execute('''
@@ -104,6 +125,13 @@ def create_database():
         VALUES (?, ?)
     ''', default_prices)
 
+    # Triggers that record every change for incremental consumers
+    change_log.install(conn)
+    # Totals of archived sales, added to the all-time figures
+    archive.install(conn)
+    # Index for ticket ID autocomplete
+    ticket_lookup.install(conn)
+
     conn.commit()
     conn.close()
 
@@ -111,26 +139,55 @@ class EmployeeDashboard:
     def __init__(self, root, employee_id=1):
         self.root = root
         self.employee_id = employee_id
+        # Everything of this session lives in one frame, so logging out drops it and keeps the window
+        self.frame = tk.Frame(self.root, bg='white')
+        self.frame.place(x=0, y=0, relwidth=1, relheight=1)
         self.search_var = tk.StringVar()
         self.search_var.trace('w', self.search_customers)
-        self.current_price_frame = None
 
         # Initialize price cache
         self._price_cache = {}
+        # Record which data each view reads so changes only re-render what depends on them
+        self.views = ViewRegistry()
+        self.views.register('dashboard', (SALES, CANCELLATIONS, ALLOCATIONS), self.show_dashboard)
+        self.views.register('customers', (SALES,), self.load_customers_data)
+        self.views.register('cancellations', (CANCELLATIONS,), self.load_cancellations_data)
+        self.views.register('pricing', (PRICING,), self.show_pricing)
+        # Writes drop the cached dashboard statistics that were computed from the changed data
+        self.views.add_listener(stats_cache.invalidate)
         # Bind to price update event at root level, everytime na nagchachange si admin nag update ng prices
         print("Binding to price update event")  # Debug print
-        self.root.bind('<<PriceUpdate>>', self.refresh_prices, add="+")
-        
+        self._price_binding = self.root.bind('<<PriceUpdate>>', self.refresh_prices, add="+")
+        # Worker thread with its own connection so queries never block the window
+        self.db = DBExecutor(self.root)
+        # Times each sidebar click until its page is filled in and idle
+        self.latency = LatencyMonitor(self.root, self.db, 'employee',
+                                      on_rendered=lambda screen: leak_monitor.check(self.root, f"employee/{screen}"))
+        # Logs the handler and stack whenever the window freezes; stops with the session frame
+        self.watchdog = StallWatchdog(self.frame)
+        # Charts render on their own worker so drawing never delays a page's queries
+        self.chart_worker = DBExecutor(self.root)
+        self._chart_images = {}
+        # Sales and refund requests go through the backend: services.py locally, or a shared FunPass server
+        self.backend = get_backend()
+        # Typed in-memory copies of the employee's sales and refund requests: loaded on first view,
+        # then brought up to date from the change log; search and sort never query the database
+        self.customers_store = row_store.RowStore(row_store.EMPLOYEE_CUSTOMERS, (self.employee_id,))
+        self.cancellations_store = row_store.RowStore(row_store.EMPLOYEE_CANCELLATIONS, (self.employee_id,))
+        self.views.add_listener(self._refresh_stores)
+        self._time_job = None
+
         self.setup_ui()
 
     def setup_ui(self):
         self.root.title("FunPass - Employee Dashboard")
         self.root.state('zoomed')
-        self.root.grid_rowconfigure(0, weight=1)
-        self.root.grid_columnconfigure(1, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(1, weight=1)
         self.create_sidebar()
-        self.content_frame = tk.Frame(self.root, bg='white')
+        self.content_frame = tk.Frame(self.frame, bg='white')
         self.content_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        tracer.navigate('Dashboard')
         self.show_dashboard()
 
     def create_sidebar(self):
@@ -139,7 +196,7 @@ class EmployeeDashboard:
         sidebar_height = 1000
         corner_radius = 40
 
-        sidebar_container = tk.Frame(self.root, bg='white')
+        sidebar_container = tk.Frame(self.frame, bg='white')
         sidebar_container.grid(row=0, column=0, sticky="n", padx=(20, 0), pady=(22, 0))
         sidebar_container.grid_rowconfigure(0, weight=1)
         sidebar_container.grid_columnconfigure(0, weight=1)
@@ -153,13 +210,8 @@ class EmployeeDashboard:
 
         # Logo 
         try:
-            logo_path = "FunPass__1_-removebg-preview.png"
-            logo_img = Image.open(logo_path)
-            logo_width = 200
-            aspect_ratio = logo_img.height / logo_img.width
-            logo_height = int(logo_width * aspect_ratio)
-            logo_img = logo_img.resize((logo_width, logo_height))
-            self.sidebar_logo = ImageTk.PhotoImage(logo_img)
+            # Loaded and resized once per window, then reused by every later login
+            self.sidebar_logo = load_photo(self.root, "FunPass__1_-removebg-preview.png", 200)
             logo_label = tk.Label(sidebar_frame, image=self.sidebar_logo, bg='#ECCD93')
             logo_label.pack(padx=(0), pady=(30, 10))
         except Exception as e:
@@ -181,8 +233,13 @@ class EmployeeDashboard:
             self.sidebar_buttons[text] = btn_canvas
 
     def _sidebar_button_click(self, name, command):
-        self.set_active_sidebar(name)
-        command()
+        screen = name.split(maxsplit=1)[-1]
+        tracer.navigate(screen)  # counts queries per screen when tracing
+        if screen != 'Logout':
+            self.latency.start(screen)
+        with profile(f"sidebar {screen}"):
+            self.set_active_sidebar(name)
+            command()
 
     def set_active_sidebar(self, page_name):
         active_color = '#FFD966'  # Highlight color for active
@@ -234,8 +291,10 @@ class EmployeeDashboard:
         for widget in self.content_frame.winfo_children():
             widget.destroy()
 
+    @profiled()
     def show_dashboard(self):
         self.clear_content()
+        self.views.show('dashboard')
         # Dashboard Title and Subtitle 
         dashboard_title = tk.Label(
             self.content_frame, text="Dashboard", font=('Segoe UI', 22, 'bold'), bg='white', anchor='w', fg='#22223B')
@@ -277,32 +336,15 @@ class EmployeeDashboard:
         stats_grid.pack(fill='both', expand=True, padx=20, pady=(10, 10))
         for i in range(2):
             stats_grid.grid_columnconfigure(i, weight=1)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT IFNULL(SUM(amount), 0) FROM customers WHERE employee_id=?''', (self.employee_id,))
-        total_sales = cursor.fetchone()[0] or 0
-        cursor.execute('''SELECT IFNULL(SUM(amount), 0) FROM cancellations WHERE status='Approved' AND ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id=?)''', (self.employee_id,))
-        cancelled_sales = cursor.fetchone()[0] or 0
-        net_sales = total_sales - cancelled_sales
-        cursor.execute('''SELECT SUM(amount) FROM customers WHERE employee_id=? AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''', (self.employee_id,))
-        monthly_sales = cursor.fetchone()[0] or 0
-        cursor.execute('SELECT SUM(quantity) FROM customers WHERE employee_id=?', (self.employee_id,))
-        total_tickets = cursor.fetchone()[0] or 0
-        cursor.execute('''SELECT pass_type, SUM(quantity) as total_qty FROM customers WHERE employee_id=? GROUP BY pass_type ORDER BY total_qty DESC''', (self.employee_id,))
-        popular_passes = cursor.fetchall()
-        if popular_passes and len(popular_passes) > 0:
-            top_pass = popular_passes[0]
-            popular_ticket_text = f"{top_pass[0]}\n({top_pass[1]} sold)"
-        else:
-            popular_ticket_text = "No passes\nsold yet"
-        conn.close()
+        # Stat cards are created empty and filled in once the background query returns
         stats_data = [
-            ("💰 Total Sales", f"₱{total_sales:,.2f}", "#2196F3"),
-            ("📅 This Month's Sales", f"₱{monthly_sales:,.2f}", "#009688"),
-            ("🎟️ Total Tickets Sold", f"{int(total_tickets) if total_tickets else 0}", "#FF9800"),
-            ("🏆 Most Popular Pass", popular_ticket_text, "#673AB7")
+            ("💰 Total Sales", 'total_sales', "#2196F3"),
+            ("📅 This Month's Sales", 'monthly_sales', "#009688"),
+            ("🎟️ Total Tickets Sold", 'total_tickets', "#FF9800"),
+            ("🏆 Most Popular Pass", 'popular_ticket_text', "#673AB7")
         ]
-        for idx, (label, value, color) in enumerate(stats_data):
+        self.stat_value_labels = {}
+        for idx, (label, key, color) in enumerate(stats_data):
             stat_card_w, stat_card_h, stat_card_r = 500, 70, 18
             stat_card_canvas = tk.Canvas(stats_grid, width=stat_card_w, height=stat_card_h, bg='#FFFFFF', highlightthickness=0)
             stat_card_canvas.grid(row=idx//2, column=idx%2, padx=16, pady=8)
@@ -310,12 +352,17 @@ class EmployeeDashboard:
             stat_inner = tk.Frame(stat_card_canvas, bg='white')
             stat_card_canvas.create_window((stat_card_w//2, stat_card_h//2), window=stat_inner, anchor='center', width=stat_card_w-8, height=stat_card_h-8)
             tk.Label(stat_inner, text=label, font=('Segoe UI', 10, 'bold'), bg='white', fg=color).pack(anchor='w', pady=(6, 0), padx=12)
-            if '\n' in str(value):
-                value1, value2 = value.split('\n')
-                tk.Label(stat_inner, text=value1, font=('Segoe UI', 15, 'bold'), fg=color, bg='white').pack(anchor='w', padx=12)
-                tk.Label(stat_inner, text=value2, font=('Segoe UI', 11), fg=color, bg='white').pack(anchor='w', padx=12)
+            if key == 'popular_ticket_text':
+                # Two lines: pass type and how many were sold
+                value1 = tk.Label(stat_inner, text="…", font=('Segoe UI', 15, 'bold'), fg=color, bg='white')
+                value1.pack(anchor='w', padx=12)
+                value2 = tk.Label(stat_inner, text="", font=('Segoe UI', 11), fg=color, bg='white')
+                value2.pack(anchor='w', padx=12)
+                self.stat_value_labels[key] = (value1, value2)
             else:
-                tk.Label(stat_inner, text=value, font=('Segoe UI', 18, 'bold'), fg=color, bg='white').pack(anchor='w', padx=12)
+                value_label = tk.Label(stat_inner, text="…", font=('Segoe UI', 18, 'bold'), fg=color, bg='white')
+                value_label.pack(anchor='w', padx=12)
+                self.stat_value_labels[key] = (value_label,)
 
         # Availability Card
         avail_card_w, avail_card_h, avail_card_r = 1500, 170, 22
@@ -336,31 +383,14 @@ class EmployeeDashboard:
         def _on_avail_frame_configure(event):
             avail_scroll_canvas.configure(scrollregion=avail_scroll_canvas.bbox('all'))
         avail_frame.bind('<Configure>', _on_avail_frame_configure)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT express_pass, junior_pass, regular_pass, student_pass, senior_citizen_pass, pwd_pass FROM employees WHERE employee_id = ?''', (self.employee_id,))
-        allocated = cursor.fetchone()
-        pass_types = ['Express Pass', 'Junior Pass', 'Regular Pass', 'Student Pass', 'Senior Citizen Pass', 'PWD Pass']
-        sold_tickets = {}
-        for pass_type in pass_types:
-            cursor.execute('SELECT SUM(quantity) FROM customers WHERE pass_type=? AND employee_id=?', (pass_type, self.employee_id))
-            sold = cursor.fetchone()[0] or 0
-            sold_tickets[pass_type] = int(sold)
-        pass_data = [
-            ('A', 'Express Pass', int(allocated[0] if allocated and len(allocated) > 0 else 0), sold_tickets['Express Pass']),
-            ('B', 'Junior Pass', int(allocated[1] if allocated and len(allocated) > 1 else 0), sold_tickets['Junior Pass']),
-            ('C', 'Regular Pass', int(allocated[2] if allocated and len(allocated) > 2 else 0), sold_tickets['Regular Pass']),
-            ('D', 'Student Pass', int(allocated[3] if allocated and len(allocated) > 3 else 0), sold_tickets['Student Pass']),
-            ('E', 'Senior Citizen Pass', int(allocated[4] if allocated and len(allocated) > 4 else 0), sold_tickets['Senior Citizen Pass']),
-            ('F', 'PWD Pass', int(allocated[5] if allocated and len(allocated) > 5 else 0), sold_tickets['PWD Pass'])
-        ]
-        for letter, pass_type, total_allocated, sold in pass_data:
-            available = total_allocated - sold
+        self.avail_labels = {}
+        for letter, pass_type in [('A', 'Express Pass'), ('B', 'Junior Pass'), ('C', 'Regular Pass'), ('D', 'Student Pass'), ('E', 'Senior Citizen Pass'), ('F', 'PWD Pass')]:
             row_frame = tk.Frame(avail_frame, bg='#FFFFFF')
             row_frame.pack(side=tk.LEFT, padx=10, pady=2)
-            label_text = f"{letter}. {pass_type}: {available}"
-            tk.Label(row_frame, text=label_text, font=('Segoe UI', 12, 'bold'), bg='#FFFFFF', anchor='w', fg='#2196F3').pack(side=tk.LEFT, padx=15, pady=2)
-        conn.close()
+            label_text = f"{letter}. {pass_type}: …"
+            avail_label = tk.Label(row_frame, text=label_text, font=('Segoe UI', 12, 'bold'), bg='#FFFFFF', anchor='w', fg='#2196F3')
+            avail_label.pack(side=tk.LEFT, padx=15, pady=2)
+            self.avail_labels[pass_type] = avail_label
 
         # Recent Sales Card
         recent_card_w, recent_card_h, recent_card_r = 1500, 250, 22
@@ -370,11 +400,6 @@ class EmployeeDashboard:
         recent_inner = tk.Frame(recent_card_canvas, bg='#FFFFFF')
         recent_card_canvas.create_window((recent_card_w//2, recent_card_h//2), window=recent_inner, anchor='center', width=recent_card_w-10, height=recent_card_h-10)
         tk.Label(recent_inner, text="Recent Sales", font=('Segoe UI', 14, 'bold'), bg='#FFFFFF', fg='#22223B').pack(anchor='w', pady=(10, 0), padx=20)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT ticket_id, name, pass_type, quantity, amount, purchased_date FROM customers WHERE employee_id=? ORDER BY purchased_date DESC, rowid DESC LIMIT 5''', (self.employee_id,))
-        recents = cursor.fetchall()
-        conn.close()
         header_row = tk.Frame(recent_inner, bg='#F5F6FA')
         header_row.pack(fill=tk.X, pady=(8, 2))
         tk.Label(header_row, text="Customer Name", font=('Segoe UI', 11, 'bold'), bg='#F5F6FA', width=18, anchor='w', fg='#22223B').pack(side=tk.LEFT, padx=5)
@@ -382,6 +407,77 @@ class EmployeeDashboard:
         tk.Label(header_row, text="Qty", font=('Segoe UI', 11, 'bold'), bg='#F5F6FA', width=5, anchor='w', fg='#22223B').pack(side=tk.LEFT, padx=5)
         tk.Label(header_row, text="Amount", font=('Segoe UI', 11, 'bold'), bg='#F5F6FA', width=10, anchor='w', fg='#22223B').pack(side=tk.LEFT, padx=5)
         tk.Label(header_row, text="Date", font=('Segoe UI', 11, 'bold'), bg='#F5F6FA', width=12, anchor='w', fg='#22223B').pack(side=tk.LEFT, padx=5)
+        self.recent_sales_frame = recent_inner
+
+        # Sales Trends Card (this employee's sales; charts arrive after the stats)
+        charts_card_w, charts_card_h, charts_card_r = 1500, 320, 22
+        charts_card_canvas = tk.Canvas(center_frame, width=charts_card_w, height=charts_card_h, bg='white', highlightthickness=0)
+        charts_card_canvas.pack(padx=0, pady=(0, 18))
+        self.draw_rounded_rect(charts_card_canvas, 0, 0, charts_card_w, charts_card_h, charts_card_r, fill='#FFFFFF', outline='#E0E0E0', width=1)
+        charts_inner = tk.Frame(charts_card_canvas, bg='#FFFFFF')
+        charts_card_canvas.create_window((charts_card_w//2, charts_card_h//2), window=charts_inner, anchor='center', width=charts_card_w-10, height=charts_card_h-10)
+        tk.Label(charts_inner, text="Sales Trends", font=('Segoe UI', 14, 'bold'), bg='#FFFFFF', fg='#22223B').pack(anchor='w', pady=(10, 0), padx=20)
+        charts_row = tk.Frame(charts_inner, bg='#FFFFFF')
+        charts_row.pack(padx=20, pady=(5, 10))
+        self.chart_labels = {}
+        for idx, name in enumerate(charts.CHARTS):
+            # Fixed pixel size so the card doesn't jump when the image replaces the placeholder
+            chart_box = tk.Frame(charts_row, width=charts.DEFAULT_SIZE[0], height=charts.DEFAULT_SIZE[1], bg='#FFFFFF')
+            chart_box.grid(row=0, column=idx, padx=8)
+            chart_box.pack_propagate(False)
+            chart_label = tk.Label(chart_box, text="Loading chart…", font=('Segoe UI', 10), fg='#6b7280', bg='#FFFFFF')
+            chart_label.pack(fill=tk.BOTH, expand=True)
+            self.chart_labels[name] = chart_label
+
+        # Statistics are queried off the Tk thread and cached until one of this
+        # dashboard's writes invalidates them
+        self.db.submit(self._load_dashboard_data, datetime.now().strftime('%Y-%m'),
+                       callback=self._render_dashboard_data, priority=HIGH, key='page')
+        self.load_dashboard_charts()
+
+    def load_dashboard_charts(self):
+        # Rendered with Agg on the chart worker, redrawn only when the rollups change (see charts.py)
+        self.chart_worker.submit(charts.dashboard_charts, self.employee_id, charts.DEFAULT_SIZE,
+                                 callback=self._show_dashboard_charts, priority=LOW, key='charts')
+
+    def _show_dashboard_charts(self, images):
+        if not self.recent_sales_frame.winfo_exists():
+            return
+        for name, png in images.items():
+            # PhotoImages are kept per PNG so an unchanged chart is not decoded again
+            photo = self._chart_images.get(name)
+            if photo is None or photo[0] is not png:
+                photo = (png, ImageTk.PhotoImage(Image.open(io.BytesIO(png))))
+                self._chart_images[name] = photo
+            self.chart_labels[name].config(image=photo[1], text='')
+
+    def _load_dashboard_data(self, conn, month):
+        # Runs on a database worker
+        stats = stats_cache.get(('employee_stats', self.employee_id, month), lambda: self._load_dashboard_stats(conn), (SALES, CANCELLATIONS))
+        pass_data = stats_cache.get(('employee_availability', self.employee_id), lambda: self._load_availability(conn), (SALES, ALLOCATIONS))
+        recents = stats_cache.get(('employee_recent_sales', self.employee_id), lambda: self._load_recent_sales(conn), (SALES,))
+        return stats, pass_data, recents
+
+    def _render_dashboard_data(self, result):
+        stats, pass_data, recents = result
+        if not self.recent_sales_frame.winfo_exists():
+            return
+        total_tickets = stats['total_tickets']
+        formatted = {
+            'total_sales': f"₱{stats['total_sales']:,.2f}",
+            'monthly_sales': f"₱{stats['monthly_sales']:,.2f}",
+            'total_tickets': f"{int(total_tickets) if total_tickets else 0}",
+            'popular_ticket_text': stats['popular_ticket_text'],
+        }
+        for key, labels in self.stat_value_labels.items():
+            for value_label, text in zip(labels, formatted[key].split('\n')):
+                value_label.config(text=text)
+
+        for letter, pass_type, total_allocated, sold in pass_data:
+            available = total_allocated - sold
+            self.avail_labels[pass_type].config(text=f"{letter}. {pass_type}: {available}")
+
+        recent_inner = self.recent_sales_frame
         if recents:
             for ticket_id, name, pass_type, quantity, amount, purchased_date in recents:
                 row = tk.Frame(recent_inner, bg='#FFFFFF')
@@ -394,7 +490,64 @@ class EmployeeDashboard:
         else:
             tk.Label(recent_inner, text="No sales yet.", font=('Segoe UI', 11, 'italic'), fg='#6b7280', bg='#FFFFFF', anchor='w').pack(anchor='w', padx=10, pady=2)
 
+    def _load_dashboard_stats(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('''SELECT IFNULL(SUM(amount), 0) FROM customers WHERE employee_id=?''', (self.employee_id,))
+        total_sales = cursor.fetchone()[0] or 0
+        cursor.execute('''SELECT IFNULL(SUM(amount), 0) FROM cancellations WHERE status='Approved' AND ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id=?)''', (self.employee_id,))
+        cancelled_sales = cursor.fetchone()[0] or 0
+        # Totals of this employee's archived sales (see archive.py)
+        cursor.execute('''SELECT COALESCE(SUM(amount), 0), COALESCE(SUM(matched_refunded_amount), 0), COALESCE(SUM(tickets), 0) FROM archived_totals WHERE employee_id=?''', (self.employee_id,))
+        archived_sales, archived_refunds, archived_tickets = cursor.fetchone()
+        total_sales += archived_sales
+        cancelled_sales += archived_refunds
+        net_sales = total_sales - cancelled_sales
+        cursor.execute('''SELECT SUM(amount) FROM customers WHERE employee_id=? AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''', (self.employee_id,))
+        monthly_sales = cursor.fetchone()[0] or 0
+        cursor.execute('SELECT SUM(quantity) FROM customers WHERE employee_id=?', (self.employee_id,))
+        total_tickets = (cursor.fetchone()[0] or 0) + archived_tickets
+        cursor.execute(services.SOLD_BY_PASS_SQL + ' ORDER BY 2 DESC', (self.employee_id,))
+        popular_passes = cursor.fetchall()
+        if popular_passes and len(popular_passes) > 0:
+            top_pass = popular_passes[0]
+            popular_ticket_text = f"{top_pass[0]}\n({top_pass[1]} sold)"
+        else:
+            popular_ticket_text = "No passes\nsold yet"
+        return {
+            'total_sales': total_sales,
+            'monthly_sales': monthly_sales,
+            'total_tickets': total_tickets,
+            'popular_ticket_text': popular_ticket_text,
+        }
+
+    def _load_availability(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('''SELECT express_pass, junior_pass, regular_pass, student_pass, senior_citizen_pass, pwd_pass FROM employees WHERE employee_id = ?''', (self.employee_id,))
+        allocated = cursor.fetchone()
+        pass_types = ['Express Pass', 'Junior Pass', 'Regular Pass', 'Student Pass', 'Senior Citizen Pass', 'PWD Pass']
+        # Sold per pass type in one query, archived sales included
+        sold = dict(cursor.execute(services.SOLD_BY_PASS_SQL, (self.employee_id,)).fetchall())
+        sold_tickets = {pass_type: int(sold.get(pass_type) or 0) for pass_type in pass_types}
+        pass_data = [
+            ('A', 'Express Pass', int(allocated[0] if allocated and len(allocated) > 0 else 0), sold_tickets['Express Pass']),
+            ('B', 'Junior Pass', int(allocated[1] if allocated and len(allocated) > 1 else 0), sold_tickets['Junior Pass']),
+            ('C', 'Regular Pass', int(allocated[2] if allocated and len(allocated) > 2 else 0), sold_tickets['Regular Pass']),
+            ('D', 'Student Pass', int(allocated[3] if allocated and len(allocated) > 3 else 0), sold_tickets['Student Pass']),
+            ('E', 'Senior Citizen Pass', int(allocated[4] if allocated and len(allocated) > 4 else 0), sold_tickets['Senior Citizen Pass']),
+            ('F', 'PWD Pass', int(allocated[5] if allocated and len(allocated) > 5 else 0), sold_tickets['PWD Pass'])
+        ]
+        return pass_data
+
+    def _load_recent_sales(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('''SELECT ticket_id, name, pass_type, quantity, amount, purchased_date FROM customers WHERE employee_id=? ORDER BY purchased_date DESC, rowid DESC LIMIT 5''', (self.employee_id,))
+        return cursor.fetchall()
+
     def update_time(self):
+        # Showing the dashboard again restarts the one clock timer instead of adding another
+        if self._time_job is not None:
+            self.root.after_cancel(self._time_job)
+            self._time_job = None
         try:
             current = datetime.now()
             current_time = current.strftime("%Y-%m-%d %H:%M:%S")
@@ -402,12 +555,14 @@ class EmployeeDashboard:
                 self.time_label.config(text=current_time)
             if hasattr(self, 'date_label') and self.date_label.winfo_exists():
                 self.date_label.config(text=current.strftime("%A, %B %d, %Y"))
-            self.root.after(1000, self.update_time)
+            self._time_job = self.root.after(1000, self.update_time)
         except Exception as e:
             print(f"Error updating time: {e}")
 
+    @profiled()
     def show_rides(self):
         self.clear_content()
+        self.views.show('rides')
         # Section background frame 
         rides_frame = tk.Frame(self.content_frame, bg='#F0E7D9')
         rides_frame.pack(fill=tk.BOTH, expand=True)
@@ -482,11 +637,13 @@ class EmployeeDashboard:
         ]
         return canvas.create_polygon(points, smooth=True, **kwargs)
 
+    @profiled()
     def show_customers(self):
         import customtkinter as ctk
         import tkinter.ttk as ttk
         self.clear_content()
         self.set_active_sidebar('👥  Customers')
+        self.views.show('customers')
 
         # Main Card Container
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=25)
@@ -553,6 +710,7 @@ class EmployeeDashboard:
         sort_options.grid(row=0, column=1, padx=(0, 8), pady=10)
         sort_options.configure(command=lambda value: self.sort_customers(value))
         self._customer_sort_options = sort_options_list
+        self._customer_sort = (None, False)
 
         # Add, Edit, Delete, View Receipt Buttons
         add_btn = ctk.CTkButton(
@@ -560,21 +718,26 @@ class EmployeeDashboard:
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.add_customer_dialog
         )
         add_btn.grid(row=0, column=2, padx=(0, 8), pady=10)
+        group_btn = ctk.CTkButton(
+            controls_bar, text="Group Sale", width=110, height=36, fg_color="#E0E0E0", text_color="#009688", hover_color="#B2DFDB",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.add_group_sale_dialog
+        )
+        group_btn.grid(row=0, column=3, padx=(0, 8), pady=10)
         edit_btn = ctk.CTkButton(
             controls_bar, text="Edit Customer", width=110, height=36, fg_color="#E0E0E0", text_color="#2196F3", hover_color="#BBDEFB",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.edit_customer_dialog
         )
-        edit_btn.grid(row=0, column=3, padx=(0, 8), pady=10)
+        edit_btn.grid(row=0, column=4, padx=(0, 8), pady=10)
         delete_btn = ctk.CTkButton(
             controls_bar, text="Delete", width=90, height=36, fg_color="#E0E0E0", text_color="#f44336", hover_color="#FFCDD2",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.delete_customer
         )
-        delete_btn.grid(row=0, column=4, padx=(0, 8), pady=10)
+        delete_btn.grid(row=0, column=5, padx=(0, 8), pady=10)
         receipt_btn = ctk.CTkButton(
             controls_bar, text="View Receipt", width=110, height=36, fg_color="#E0E0E0", text_color="#D0A011", hover_color="#FFF9C4",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.view_receipt
         )
-        receipt_btn.grid(row=0, column=5, padx=(0, 12), pady=10)
+        receipt_btn.grid(row=0, column=6, padx=(0, 12), pady=10)
 
         # Table Frame 
         table_card = ctk.CTkFrame(card_frame, fg_color="#fff", corner_radius=18)
@@ -600,6 +763,7 @@ class EmployeeDashboard:
             yscrollcommand=yscroll.set, xscrollcommand=xscroll.set
         )
         self.customers_tree.grid(row=0, column=0, sticky='nsew')
+        self.customers_pager = row_store.TablePager(self.customers_tree, self.customers_store, yscroll.set)
         yscroll.configure(command=self.customers_tree.yview)
         xscroll.configure(command=self.customers_tree.xview)
         column_widths = {
@@ -623,109 +787,39 @@ class EmployeeDashboard:
         self.customers_tree.bind("<Button-1>", clear_selection_on_click, add="+")
         self.load_customers_data()
 
+    @profiled()
     def search_customers(self, *args):
-        search_text = self.search_var.get().lower()
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT ticket_id, name, email, quantity, amount, 
-                   strftime('%Y-%m-%d', booked_date) as booked_date,
-                   strftime('%Y-%m-%d', purchased_date) as purchased_date,
-                   pass_type 
-            FROM customers 
-            WHERE employee_id=?
-        ''', (self.employee_id,))
-        customers = cursor.fetchall()
-        conn.close()
-
-        for customer in customers:
-            # Convert tuple to list for modification
-            # We convert tuple to a list for modification because tuples in Python are immutable, you cannot change their contents after creation. Lists, on the other hand, are mutable and allow you to modify, assign, or update their elements.
-            data = list(customer)
-            
-            # Format dates
-            try:
-                if data[5]:  # booked_date
-                    date_obj = datetime.strptime(data[5], '%Y-%m-%d')
-                    data[5] = date_obj.strftime('%m-%d-%Y')
-                if data[6]:  # purchased_date
-                    date_obj = datetime.strptime(data[6], '%Y-%m-%d')
-                    data[6] = date_obj.strftime('%m-%d-%Y')
-            except ValueError:
-                pass
-
-            if any(search_text in str(value).lower() for value in data):
-                self.customers_tree.insert('', tk.END, values=data)
+        # Searches and sorts the row store; only the rows scrolled into view are formatted
+        if not self.customers_tree.winfo_exists():
+            return
+        sort, reverse = self._customer_sort
+        self.customers_pager.show(self.customers_store.select(self.search_var.get().lower(), sort, reverse))
 
     def sort_customers(self, sort_option):
-        items = []
-        for item in self.customers_tree.get_children():
-            values = self.customers_tree.item(item)['values']
-            items.append(values)
         for label, idx, reverse in self._customer_sort_options:
             if label == sort_option:
-            # Quantity, Amount
-                if idx in [4, 5]:
-                    items.sort(key=lambda x: float(str(x[idx]).replace('₱','').replace(',','')), reverse=reverse)
-            # Booked Date, Purchased Date
-                elif idx in [6, 7]:
-                    from datetime import datetime
-                    def parse_date(val):
-                        try:
-                            return datetime.strptime(val, '%m/%d/%Y')
-                        except Exception:
-                            return datetime.min
-                    items.sort(key=lambda x: parse_date(x[idx]), reverse=reverse)
-                else:
-                    items.sort(key=lambda x: str(x[idx]).lower(), reverse=reverse)
+                self._customer_sort = (row_store.EMPLOYEE_CUSTOMERS.display_columns[idx], reverse)
                 break
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        for item in items:
-            self.customers_tree.insert('', tk.END, values=item)
+        self.search_customers()
 
     def load_customers_data(self):
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT ticket_id, name, email, quantity, amount, 
-                   strftime('%Y-%m-%d', booked_date) as booked_date,
-                   strftime('%Y-%m-%d', purchased_date) as purchased_date,
-                   pass_type 
-            FROM customers 
-            WHERE employee_id=?
-        ''', (self.employee_id,))
-        customers = cursor.fetchall()
-        conn.close()
+        # The first call loads the employee's sales on a worker, later calls only read the changed rows
+        self.db.submit(self.customers_store.read_changes, callback=self._fill_customers_tree, priority=HIGH, key='page')
 
-        for customer in customers:
-            # Convert tuple to list for modification
-            data = list(customer)
-            
-            # Format booked_date (index 5)
-            try:
-                if data[5]:
-                    date_obj = datetime.strptime(data[5], '%Y-%m-%d')
-                    data[5] = date_obj.strftime('%m-%d-%Y')
-            except ValueError:
-                pass
-
-            # Format purchased_date (index 6)
-            try:
-                if data[6]:
-                    date_obj = datetime.strptime(data[6], '%Y-%m-%d')
-                    data[6] = date_obj.strftime('%m-%d-%Y')
-            except ValueError:
-                pass
+    @profiled()
+    def _fill_customers_tree(self, patch):
+        self.customers_store.apply(patch)
+        self.search_customers()
 
-            self.customers_tree.insert('', tk.END, values=data)
+    def _refresh_stores(self, *sources):
+        # Writes that patch the table themselves do not re-render it, so the stores catch up here;
+        # otherwise the next search would bring back a row that was just deleted
+        for store, depends in ((self.customers_store, (SALES,)), (self.cancellations_store, (SALES, CANCELLATIONS))):
+            if store.loaded and (not sources or set(depends) & set(sources)):
+                self.db.submit(store.read_changes, callback=store.apply, priority=HIGH)
 
     def get_availability_for_pass(self, pass_type):
-        conn = sqlite3.connect('funpass.db')
+        conn = connect('funpass.db')
         cursor = conn.cursor()
         
         # Get total tickets sold
@@ -844,82 +938,108 @@ class EmployeeDashboard:
         purchased_date_label = tk.Label(main_frame, text=purchased_date, font=('Arial', 11), bg='white')
         purchased_date_label.pack(fill=tk.X, pady=(0, 10))
 
+        @profiled()
         def save_customer():
-            name = name_entry.get().strip()
-            email = email_entry.get().strip()
-            quantity = quantity_entry.get().strip()
-            pass_type = pass_type_combo.get().strip()
-            amount = amount_var.get().replace('₱', '').replace(',', '')
-            booked_date = booked_date_entry.get()
-
-            if not (name and quantity and pass_type and amount and booked_date):
-                messagebox.showerror("Error", "Name, Quantity, Pass Type, Amount, and Booked Date are required!")
+            try:
+                sale = self.backend.sell_tickets(
+                    employee_id=self.employee_id, name=name_entry.get(), email=email_entry.get(),
+                    pass_type=pass_type_combo.get().strip(), quantity=quantity_entry.get().strip(),
+                    booked_date=booked_date_entry.get(), ticket_id=ticket_id, purchased_date=purchased_date)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred: {str(e)}")
                 return
+            dialog.destroy()
+            self.views.invalidate(SALES)
+            amount = f"{sale['amount']:.2f}"
+            self.print_ticket(ticket_id, sale['name'], sale['email'], sale['quantity'], amount, sale['booked_date'], purchased_date, sale['pass_type'])
+            self.send_ticket_email(sale['email'], ticket_id, sale['name'], sale['email'], sale['quantity'], amount, sale['booked_date'], purchased_date, sale['pass_type'])
+            messagebox.showinfo("Success", "Customer added and ticket printed!")
+
+        tk.Button(main_frame, text="Save", command=save_customer, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(main_frame, text="Cancel", command=dialog.destroy, bg='#f44336', fg='white').pack()
+
+    def add_group_sale_dialog(self):
+        # One customer buying several pass types: one availability check, one commit, one receipt, one email
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Group Sale")
+        dialog.geometry("500x650")
+        dialog.configure(bg='white')
+        main_frame = tk.Frame(dialog, bg='white', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        group_id = self.generate_ticket_id()
+        tk.Label(main_frame, text=f"Group ID: {group_id}", font=('Arial', 11, 'bold'), bg='white').pack(anchor='w', pady=(0, 10))
+
+        # Name
+        tk.Label(main_frame, text="Name:", font=('Arial', 11), bg='white').pack(anchor='w')
+        name_entry = tk.Entry(main_frame, font=('Arial', 11))
+        name_entry.pack(fill=tk.X, pady=(0, 10))
+
+        # Email
+        tk.Label(main_frame, text="Email:", font=('Arial', 11), bg='white').pack(anchor='w')
+        email_entry = tk.Entry(main_frame, font=('Arial', 11))
+        email_entry.pack(fill=tk.X, pady=(0, 10))
+
+        # One quantity per pass type
+        lines_frame = tk.LabelFrame(main_frame, text="Passes", bg='white', pady=10, padx=10)
+        lines_frame.pack(fill=tk.X, pady=(0, 10))
+        quantity_entries = {}
+        subtotal_vars = {}
+        for pass_type in self.get_pass_types():
+            row = tk.Frame(lines_frame, bg='white')
+            row.pack(fill=tk.X, pady=2)
+            tk.Label(row, text=pass_type, font=('Arial', 11), bg='white', width=18, anchor='w').pack(side=tk.LEFT)
+            spinbox = tk.Spinbox(row, from_=0, to=1000, width=6, font=('Arial', 11))
+            spinbox.pack(side=tk.LEFT, padx=(0, 10))
+            subtotal_vars[pass_type] = tk.StringVar(value="₱0.00")
+            tk.Label(row, textvariable=subtotal_vars[pass_type], font=('Arial', 11), bg='white', anchor='e').pack(side=tk.RIGHT)
+            quantity_entries[pass_type] = spinbox
+
+        total_var = tk.StringVar(value="Total: ₱0.00")
+        tk.Label(main_frame, textvariable=total_var, font=('Arial', 12, 'bold'), bg='white').pack(anchor='e', pady=(0, 10))
+
+        def update_totals(*args):
+            total = 0.0
+            for pass_type, spinbox in quantity_entries.items():
+                try:
+                    quantity = max(int(spinbox.get() or 0), 0)
+                except ValueError:
+                    quantity = 0
+                subtotal = self.get_price_for_pass(pass_type) * quantity
+                subtotal_vars[pass_type].set(f"₱{subtotal:,.2f}")
+                total += subtotal
+            total_var.set(f"Total: ₱{total:,.2f}")
+
+        for spinbox in quantity_entries.values():
+            spinbox.configure(command=update_totals)
+            spinbox.bind('<KeyRelease>', update_totals)
+
+        tk.Label(main_frame, text="Booked Date:", font=('Arial', 11), bg='white').pack(anchor='w')
+        booked_date_entry = DateEntry(main_frame, font=('Arial', 11), width=18, date_pattern='yyyy-MM-dd')
+        booked_date_entry.pack(fill=tk.X, pady=(0, 10))
 
+        @profiled()
+        def save_group():
             try:
-                quantity = int(quantity)
-                if quantity <= 0:
-                    messagebox.showerror("Error", "Quantity must be greater than 0!")
-                    return
-
-                # Check ticket availability
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                
-                # Get employee's allocation
-                cursor.execute('''
-
-                    SELECT 
-                        CASE 
-                            WHEN ? = 'Express Pass' THEN express_pass
-                            WHEN ? = 'Junior Pass' THEN junior_pass
-                            WHEN ? = 'Regular Pass' THEN regular_pass
-                            WHEN ? = 'Student Pass' THEN student_pass
-                            WHEN ? = 'PWD Pass' THEN pwd_pass
-                            WHEN ? = 'Senior Citizen Pass' THEN senior_citizen_pass
-                        END
-                    FROM employees 
-                    WHERE employee_id = ?
-                ''', (pass_type, pass_type, pass_type, pass_type, pass_type, pass_type, self.employee_id))
-                
-                allocation = cursor.fetchone()[0] or 0
-
-                # Get tickets already sold by this employee
-                cursor.execute('''
-
-                    SELECT SUM(quantity) 
-                    FROM customers 
-                    WHERE pass_type = ? AND employee_id = ?
-                ''', (pass_type, self.employee_id))
-                
-                sold = cursor.fetchone()[0] or 0
-                available = allocation - sold
-
-                if quantity > available:
-                    messagebox.showerror("Error", 
-                        f"Not enough tickets available!\nYou can only sell {available} more {pass_type} tickets.")
-                    conn.close()
-                    return
-
-                # If validation passes, proceed with saving
-                cursor.execute('''INSERT INTO customers 
-                                (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id) 
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (ticket_id, name, email, quantity, float(amount), booked_date, purchased_date, 
-                              pass_type, self.employee_id))
-                conn.commit()
-                conn.close()
-                dialog.destroy()
-                self.load_customers_data()
-                self.print_ticket(ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type)
-                self.send_ticket_email(email, ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type)
-                messagebox.showinfo("Success", "Customer added and ticket printed!")
-            except ValueError:
-                messagebox.showerror("Error", "Invalid quantity or amount!")
+                group = self.backend.sell_group(
+                    employee_id=self.employee_id, name=name_entry.get(), email=email_entry.get(),
+                    lines={pass_type: spinbox.get().strip() for pass_type, spinbox in quantity_entries.items()},
+                    booked_date=booked_date_entry.get(), group_id=group_id)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             except Exception as e:
                 messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                return
+            dialog.destroy()
+            self.views.invalidate(SALES)
+            self.print_group_receipt(group)
+            self.send_group_email(group)
+            messagebox.showinfo("Success", f"Group sale of {len(group['sales'])} pass types saved!")
 
-        tk.Button(main_frame, text="Save", command=save_customer, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(main_frame, text="Save", command=save_group, bg='#4CAF50', fg='white').pack(pady=10)
         tk.Button(main_frame, text="Cancel", command=dialog.destroy, bg='#f44336', fg='white').pack()
 
     def edit_customer_dialog(self):
@@ -1008,6 +1128,7 @@ class EmployeeDashboard:
         pass_type_combo.bind('<<ComboboxSelected>>', update_amount)
         quantity_entry.bind('<KeyRelease>', update_amount)
 
+        @profiled()
         def save_edit():
             # Get values from the entries
             name = name_var.get().strip()
@@ -1023,28 +1144,19 @@ class EmployeeDashboard:
                 messagebox.showerror("Error", "Invalid date format!")
                 return
 
-            # Validate fields
-            if not all([name, quantity, amount, pass_type, booked_date, purchased_date]):
-                messagebox.showerror("Error", "Name, Quantity, Amount, Pass Type, Booked Date, and Purchased Date are required!")
-                return
-
             try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE customers 
-                    SET name=?, email=?, quantity=?, amount=?, 
-                        booked_date=?, purchased_date=?, pass_type=?
-                    WHERE ticket_id=?
-                ''', (name, email, int(quantity), float(amount), 
-                     booked_date, purchased_date, pass_type, ticket_id_var.get()))
-                conn.commit()
-                conn.close()
-                dialog.destroy()
-                self.load_customers_data()
-                messagebox.showinfo("Success", "Customer updated successfully!")
+                self.backend.update_sale(ticket_id=ticket_id_var.get(), name=name, email=email, quantity=quantity,
+                                         amount=amount, booked_date=booked_date, purchased_date=purchased_date,
+                                         pass_type=pass_type)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             except Exception as e:
                 messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                return
+            dialog.destroy()
+            self.views.invalidate(SALES)
+            messagebox.showinfo("Success", "Customer updated successfully!")
 
         # Button frame for Save and Cancel
         button_frame = tk.Frame(main_frame, bg='white')
@@ -1068,12 +1180,8 @@ class EmployeeDashboard:
         values = self.customers_tree.item(selected[0])['values']
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this customer?"):
             try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM customers WHERE ticket_id=? AND employee_id=?', (values[0], self.employee_id))
-                conn.commit()
-                conn.close()
-                self.load_customers_data()
+                self.backend.delete_sale(values[0], self.employee_id)
+                self.views.invalidate(SALES)
                 messagebox.showinfo("Success", "Customer deleted!")
             except Exception as e:
                 messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -1089,24 +1197,19 @@ class EmployeeDashboard:
             self.print_ticket(ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type)
 
     def generate_ticket_id(self):
-        import random, string
-        return 'F' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+        return services.generate_ticket_id()
+
+    def get_prices(self):
+        # Pass type -> price, kept in _price_cache until the next <<PriceUpdate>>
+        if not self._price_cache:
+            self._price_cache.update(self.backend.get_prices())
+        return self._price_cache
 
     def get_pass_types(self):
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT pass_type FROM pricing')
-        pass_types = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return pass_types
+        return list(self.get_prices())
 
     def get_price_for_pass(self, pass_type):
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT price FROM pricing WHERE pass_type=?', (pass_type,))
-        row = cursor.fetchone()
-        conn.close()
-        return float(row[0]) if row else 0.0
+        return self.get_prices().get(pass_type, 0.0)
 
     def print_ticket(self, ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type):
         print_win = tk.Toplevel(self.root)
@@ -1130,13 +1233,7 @@ class EmployeeDashboard:
 
         # Logo
         try:
-            logo_path = "FunPass__1_-removebg-preview.png"
-            logo_img = Image.open(logo_path)
-            logo_width = 90
-            aspect_ratio = logo_img.height / logo_img.width
-            logo_height = int(logo_width * aspect_ratio)
-            logo_img = logo_img.resize((logo_width, logo_height))
-            self.logo_image = ImageTk.PhotoImage(logo_img)
+            self.logo_image = load_photo(self.root, "FunPass__1_-removebg-preview.png", 90)
             logo_label = tk.Label(main_frame, image=self.logo_image, bg='white')
             logo_label.pack(pady=(18, 4))
         except Exception:
@@ -1188,13 +1285,78 @@ class EmployeeDashboard:
 
         tk.Button(main_frame, text="Close", command=print_win.destroy, bg='white', font=('Arial', 10), relief='groove').pack(pady=8)
     
-    def send_ticket_email(self, to_email, ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type):
-        # Configure your SMTP server details here
-        SMTP_SERVER = 'smtp.gmail.com'
-        SMTP_PORT = 587
-        SMTP_USER = 'funpasstothemagicalpark@gmail.com'  
-        SMTP_PASS = 'qauf qaub sexo hefs'   # google app password
+    def print_group_receipt(self, group):
+        # One receipt listing every line of a group sale
+        print_win = tk.Toplevel(self.root)
+        print_win.title("Booking Receipt")
+        print_win.configure(bg='white')
+        print_win.transient(self.root)
+        w = 420
+        h = 420 + 24 * len(group['sales'])
+        x = (print_win.winfo_screenwidth() // 2) - (w // 2)
+        y = (print_win.winfo_screenheight() // 2) - (h // 2)
+        print_win.geometry(f"{w}x{h}+{x}+{y}")
+
+        main_frame = tk.Frame(print_win, bg='white')
+        main_frame.pack(expand=True, fill=tk.BOTH)
+        tk.Label(main_frame, text="FunPass", font=('Arial', 18, 'bold'), bg='white', fg='#4CAF50').pack(pady=(18, 4))
+        tk.Label(main_frame, text="FunPass Group Booking Receipt", font=('Arial', 15, 'bold'), bg='white').pack(pady=(0, 10))
+
+        details_frame = tk.LabelFrame(
+            main_frame, text="Booking Details",
+            font=('Arial', 10, 'bold'), bg='white', fg='black',
+            padx=10, pady=10, relief='solid', bd=1, labelanchor='n'
+        )
+        details_frame.pack(padx=30, pady=(0, 12), anchor='n')
+        fields = [
+            ("Group ID:", group['group_id']),
+            ("Customer Name:", group['name']),
+            ("Email:", group['email']),
+            ("Booked Date:", group['booked_date']),
+            ("Purchased Date:", group['purchased_date'])
+        ]
+        for label, value in fields:
+            row = tk.Frame(details_frame, bg='white')
+            row.pack(fill=tk.X, pady=2, anchor='w')
+            tk.Label(row, text=label, font=('Arial', 10, 'bold'), bg='white', anchor='w', width=14).pack(side=tk.LEFT)
+            tk.Label(row, text=str(value), font=('Arial', 10), bg='white', anchor='w').pack(side=tk.LEFT, padx=(8, 0))
+
+        lines_frame = tk.LabelFrame(
+            main_frame, text="Tickets",
+            font=('Arial', 10, 'bold'), bg='white', fg='black',
+            padx=10, pady=10, relief='solid', bd=1, labelanchor='n'
+        )
+        lines_frame.pack(padx=30, pady=(0, 12), anchor='n')
+        for sale in group['sales']:
+            tk.Label(lines_frame, text=f"{sale['ticket_id']}   {sale['pass_type']} x{sale['quantity']}   ₱{sale['amount']:,.2f}",
+                     font=('Arial', 10), bg='white', anchor='w').pack(anchor='w')
+        tk.Label(lines_frame, text=f"Total Amount: ₱{group['total']:,.2f}", font=('Arial', 10, 'bold'), bg='white').pack(anchor='e', pady=(6, 0))
+
+        tk.Button(main_frame, text="Close", command=print_win.destroy, bg='white', font=('Arial', 10), relief='groove').pack(pady=8)
+
+    def send_group_email(self, group):
+        lines = "\n".join(f"{sale['ticket_id']}: {sale['pass_type']} x{sale['quantity']} - ₱{sale['amount']:,.2f}" for sale in group['sales'])
+        subject = f"Your FunPass Booking Receipt (Group ID: {group['group_id']})"
+        body = f"""\
+Hello {group['name']},
 
+Thank you for your purchase! Here are your ticket details:
+
+{lines}
+
+Total Amount: ₱{group['total']:,.2f}
+Booked Date: {group['booked_date']}
+Purchased Date: {group['purchased_date']}
+
+Please present this receipt at the entrance.
+Enjoy your visit!
+
+Best regards,
+FunPass: Amusement Park Ticketing System
+"""
+        mailer.send(group['email'], subject, body)
+
+    def send_ticket_email(self, to_email, ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type):
         subject = f"Your FunPass Booking Receipt (Ticket ID: {ticket_id})"
         body = f"""\
 Hello {name},
@@ -1218,27 +1380,10 @@ Best regards,
 FunPass: Amusement Park Ticketing System
 """
 
-        msg = EmailMessage()
-        msg['Subject'] = subject
-        msg['From'] = SMTP_USER
-        msg['To'] = to_email
-        msg.set_content(body)
-
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASS)
-                server.send_message(msg)
-            print(f"Ticket sent to {to_email}")
-        except Exception as e:
-            print(f"Failed to send email: {e}")
+        # Queued, the background mailer does the SMTP round trip
+        mailer.send(to_email, subject, body)
 
     def send_cancellation_pending_email(self, to_email, name, ticket_id):
-        SMTP_SERVER = 'smtp.gmail.com'
-        SMTP_PORT = 587
-        SMTP_USER = 'funpasstothemagicalpark@gmail.com'
-        SMTP_PASS = 'qauf qaub sexo hefs'
-
         subject = f"FunPass Cancellation Request Received (Ticket ID: {ticket_id})"
         body = f"""\
 Hello {name},
@@ -1253,25 +1398,15 @@ Best regards,
 FunPass: Amusement Park Ticketing System
 """
 
-        msg = EmailMessage()
-        msg['Subject'] = subject
-        msg['From'] = SMTP_USER
-        msg['To'] = to_email
-        msg.set_content(body)
-
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASS)
-                server.send_message(msg)
-            print(f"Pending cancellation email sent to {to_email}")
-        except Exception as e:
-            print(f"Failed to send pending cancellation email: {e}")
+        # Queued, the background mailer does the SMTP round trip
+        mailer.send(to_email, subject, body)
 
+    @profiled()
     def show_cancellations(self):
         import customtkinter as ctk
         self.clear_content()
         self.set_active_sidebar('❌  Cancellations & Refunds')
+        self.views.show('cancellations')
 
         # --- Main Card Container ---
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=0)
@@ -1338,6 +1473,7 @@ FunPass: Amusement Park Ticketing System
         sort_options.grid(row=0, column=1, padx=(0, 8), pady=10)
         sort_options.configure(command=lambda value: self.sort_cancellations(value))
         self._cancel_sort_options = cancel_sort_options_list
+        self._cancel_sort = (None, False)
 
         # Add Cancellation Button 
         add_btn = ctk.CTkButton(
@@ -1378,6 +1514,7 @@ FunPass: Amusement Park Ticketing System
             yscrollcommand=yscroll.set, xscrollcommand=xscroll.set
         )
         self.cancellations_tree.grid(row=0, column=0, sticky='nsew')
+        self.cancellations_pager = row_store.TablePager(self.cancellations_tree, self.cancellations_store, yscroll.set)
         yscroll.configure(command=self.cancellations_tree.yview)
         xscroll.configure(command=self.cancellations_tree.xview)
         column_widths = {
@@ -1406,7 +1543,7 @@ FunPass: Amusement Park Ticketing System
     def add_cancellation_dialog(self):
         dialog = tk.Toplevel(self.root)
         dialog.title("Add Cancellation Request")
-        dialog.geometry("500x650")
+        dialog.geometry("500x720")
         dialog.configure(bg='white')
         main_frame = tk.Frame(dialog, bg='white', padx=20, pady=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -1414,6 +1551,11 @@ FunPass: Amusement Park Ticketing System
         tk.Label(main_frame, text="Ticket ID:", font=('Arial', 11), bg='white').pack(anchor='w')
         ticket_id_entry = tk.Entry(main_frame, font=('Arial', 11))
         ticket_id_entry.pack(fill=tk.X, pady=(0, 10))
+        # Matching tickets of this employee, shown under the entry while typing
+        suggestion_list = tk.Listbox(main_frame, font=('Consolas', 10), height=5, activestyle='none')
+        suggestion_note = tk.Label(main_frame, text="", font=('Arial', 9), bg='white', fg='#f44336', anchor='w')
+        suggestion_note.pack(fill=tk.X)
+        suggestions = []
         
         # Name
         tk.Label(main_frame, text="Name:", font=('Arial', 11), bg='white').pack(anchor='w')
@@ -1457,39 +1599,78 @@ FunPass: Amusement Park Ticketing System
         pass_type_combo.pack(fill=tk.X, pady=(0, 10))
         if pass_types:
             pass_type_combo.set(pass_types[0])  # Set default to "Express Pass"
-            
+
+        def fill_from_sale(sale):
+            # Pre-fill the form with the original sale, which the request has to match
+            ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, refund_status = sale
+            for entry, value in ((ticket_id_entry, ticket_id), (name_entry, name), (email_entry, email),
+                                 (quantity_entry, quantity), (amount_entry, amount)):
+                entry.delete(0, tk.END)
+                entry.insert(0, value)
+            try:
+                booked_date_entry.set_date(datetime.strptime(booked_date, '%Y-%m-%d'))
+                purchased_date_entry.set_date(datetime.strptime(purchased_date, '%Y-%m-%d'))
+            except ValueError:
+                pass
+            pass_type_combo.set(pass_type)
+            suggestion_note.config(text=f"A refund request for this ticket is already {refund_status}." if refund_status else "")
+            suggestion_list.pack_forget()
+
+        def show_suggestions(rows):
+            if not suggestion_list.winfo_exists():
+                return  # dialog closed meanwhile
+            suggestions[:] = rows
+            suggestion_list.delete(0, tk.END)
+            for row in rows:
+                suggestion_list.insert(tk.END, f"{row[0]}  {row[1]}  {row[7]} x{row[3]}")
+            typed = ticket_id_entry.get().strip().upper()
+            if len(rows) == 1 and rows[0][0] == typed:
+                fill_from_sale(rows[0])  # the full ID was typed
+            elif rows:
+                suggestion_list.pack(fill=tk.X, after=ticket_id_entry, pady=(0, 6))
+            else:
+                suggestion_list.pack_forget()
+                suggestion_note.config(text="No ticket of yours starts with this ID." if typed else "")
+
+        def lookup_ticket(event):
+            if event.keysym in ('Down', 'Up', 'Return', 'Escape', 'Tab'):
+                return
+            suggestion_note.config(text="")
+            # Indexed prefix lookup on the worker; a newer keystroke replaces the pending one
+            self.db.submit(ticket_lookup.suggest, ticket_id_entry.get(), self.employee_id,
+                           callback=show_suggestions, priority=HIGH, key='ticket_suggest')
+
+        def choose_suggestion(event=None):
+            selection = suggestion_list.curselection()
+            if selection:
+                fill_from_sale(suggestions[selection[0]])
+                name_entry.focus_set()
+
+        def focus_suggestions(event):
+            if suggestions and suggestion_list.winfo_ismapped():
+                suggestion_list.focus_set()
+                suggestion_list.selection_clear(0, tk.END)
+                suggestion_list.selection_set(0)
+                suggestion_list.activate(0)
+
+        def accept_single(event):
+            if len(suggestions) == 1:
+                fill_from_sale(suggestions[0])
+
+        ticket_id_entry.bind('<KeyRelease>', lookup_ticket)
+        ticket_id_entry.bind('<Down>', focus_suggestions)
+        ticket_id_entry.bind('<Return>', accept_single)
+        suggestion_list.bind('<ButtonRelease-1>', choose_suggestion)
+        suggestion_list.bind('<Return>', choose_suggestion)
+        suggestion_list.bind('<Escape>', lambda e: (suggestion_list.pack_forget(), ticket_id_entry.focus_set()))
+        ticket_id_entry.focus_set()
+
+        @profiled()
         def save_cancellation():
             ticket_id = ticket_id_entry.get().strip()
             name = name_entry.get().strip()
             email = email_entry.get().strip()
-            reasons = reasons_entry.get().strip()
-            quantity = quantity_entry.get().strip()
-            amount = amount_entry.get().strip()
-            pass_type = pass_type_combo.get().strip()
-
-            # 1. Check ticket exists
-            conn = sqlite3.connect('funpass.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT name, email, quantity, amount, pass_type FROM customers WHERE ticket_id=?', (ticket_id,))
-            customer = cursor.fetchone()
-            if not customer:
-                messagebox.showerror("Error", "Ticket ID does not exist!")
-                conn.close()
-                return
 
-            # 2. Check for duplicate cancellation
-            cursor.execute('SELECT 1 FROM cancellations WHERE ticket_id=?', (ticket_id,))
-            if cursor.fetchone():
-                messagebox.showerror("Error", "A cancellation for this Ticket ID already exists!")
-                conn.close()
-                return
-
-            # 3. Validate details match
-            if (name != customer[0] or email != customer[1] or int(quantity) != customer[2] or float(amount) != customer[3] or pass_type != customer[4]):
-                messagebox.showerror("Error", "Cancellation details do not match the original purchase!")
-                conn.close()
-                return
-            
             # Format dates correctly
             try:
                 booked_date = booked_date_entry.get_date().strftime('%Y-%m-%d')
@@ -1498,45 +1679,35 @@ FunPass: Amusement Park Ticketing System
                 messagebox.showerror("Error", "Invalid date format!")
                 return
 
-            pass_type = pass_type_combo.get().strip()
-
-            # Email is optional now
-            if not (ticket_id and name and reasons and quantity and amount and booked_date and purchased_date and pass_type):
-                messagebox.showerror("Error", "All fields except Email are required!")
-                return
-
             try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO cancellations 
-                    (ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, pass_type, status) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    ticket_id, name, email, reasons, 
-                    int(quantity), float(amount), 
-                    booked_date, purchased_date,
-                    pass_type, 'Pending'
-                ))
-                conn.commit()
-                conn.close()
-                # Send Email
-                if email:
-                    self.send_cancellation_pending_email(email, name, ticket_id)
-                
-                dialog.destroy() # Close the dialog after saving
-                self.load_cancellations_data()
-                messagebox.showinfo("Success", "Cancellation request added!")
+                self.backend.request_cancellation(
+                    ticket_id=ticket_id, name=name, email=email, reasons=reasons_entry.get().strip(),
+                    quantity=quantity_entry.get().strip(), amount=amount_entry.get().strip(),
+                    booked_date=booked_date, purchased_date=purchased_date,
+                    pass_type=pass_type_combo.get().strip())
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             except Exception as e:
                 messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                return
+            # Send Email
+            if email:
+                self.send_cancellation_pending_email(email, name, ticket_id)
+
+            dialog.destroy() # Close the dialog after saving
+            self.views.invalidate(CANCELLATIONS)
+            messagebox.showinfo("Success", "Cancellation request added!")
 
         tk.Button(main_frame, text="Save", command=save_cancellation, bg='#4CAF50', fg='white').pack(pady=10)
         tk.Button(main_frame, text="Cancel", command=dialog.destroy, bg='#f44336', fg='white').pack()
 
+    @profiled()
     def show_pricing(self):
         import customtkinter as ctk
         self.clear_content()
         self.set_active_sidebar('💳  Pricing')
+        self.views.show('pricing')
 
         # Main Card Container 
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#F0E7D9", corner_radius=0, border_width=0, border_color="#e0e0e0")
@@ -1569,7 +1740,7 @@ FunPass: Amusement Park Ticketing System
         pricing_rows_container.pack(expand=True, pady=10)
 
         # Load pricing data from the database
-        conn = sqlite3.connect('funpass.db')
+        conn = connect('funpass.db')
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM pricing')
         prices = cursor.fetchall()
@@ -1601,24 +1772,15 @@ FunPass: Amusement Park Ticketing System
 
 
     def get_all_prices(self):
-        # Get all prices from database
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT pass_type, price FROM pricing')
-        prices = cursor.fetchall()
-        conn.close()
-        return prices
+        return list(self.get_prices().items())
 
+    @profiled()
     def refresh_prices(self, event=None):
         print("Price update event received")  # Debug print
         
         # Clear price cache to force fresh data
         self._price_cache.clear()
 
-        # Refresh pricing display if it's currently shown
-        if hasattr(self, 'current_price_frame') and self.current_price_frame and self.current_price_frame.winfo_exists():
-            self.show_pricing()
-
         # Update any open dialogs that show prices
         for widget in self.root.winfo_children():
             if isinstance(widget, tk.Toplevel):
@@ -1628,9 +1790,10 @@ FunPass: Amusement Park Ticketing System
                     print(f"Error updating dialog prices: {e}")  # Debug print
                     continue
 
-        # Update main displays
-        self.update_displayed_prices()
-        print("Price refresh completed")  # Debug print
+        # Only re-render the views that read pricing. Customer rows store fixed
+        # amounts and the dashboard shows no prices, so neither is rebuilt here.
+        rerendered = self.views.invalidate(PRICING)
+        print(f"Price refresh completed, re-rendered: {rerendered or 'nothing'}")  # Debug print
 
     def update_dialog_prices(self, dialog):
         """Update prices in an open dialog"""
@@ -1662,56 +1825,30 @@ FunPass: Amusement Park Ticketing System
                 print(f"Error updating dialog amount: {e}")  # Debug print
                 pass
 
-    def update_displayed_prices(self):
-        """Update all price displays in the interface"""
-        # Update dashboard if it exists
-        if hasattr(self, 'content_frame'):
-            self.show_dashboard()
-            print("Dashboard prices updated")  # Debug print
-
-        # Update customer view if it exists
-        if hasattr(self, 'customers_tree'):
-            self.load_customers_data()
-            print("Customer view prices updated")  # Debug print
-
-        # Update pricing view if it exists
-        if hasattr(self, 'current_price_frame') and self.current_price_frame and self.current_price_frame.winfo_exists():
-            self.show_pricing()
-            print("Pricing view updated")  # Debug print
-
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.root.destroy()
+            self.close()
             from login import show_login
-            show_login()
-
+            show_login(self.root)
+
+    def close(self):
+        # End this session: stop its workers and timers and drop its widgets, keeping the window
+        self.db.shutdown()
+        self.chart_worker.shutdown()
+        self.latency.stop()
+        if self._time_job is not None:
+            self.root.after_cancel(self._time_job)
+            self._time_job = None
+        self.root.unbind('<<PriceUpdate>>', self._price_binding)
+        close_session(self.root, self.frame, self)
+
+    @profiled()
     def search_cancellations(self, *args):
-        search_text = self.cancel_search_var.get().lower()
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        # Only show cancellations for tickets sold by this employee
-        cursor.execute('''
-            SELECT c.ticket_id, c.name, c.email, c.pass_type, c.reasons, c.quantity, c.amount,
-                   strftime('%m/%d/%Y', c.booked_date) as booked_date,
-                   strftime('%m/%d/%Y', c.purchased_date) as purchased_date,
-                   c.status
-            FROM cancellations c
-            INNER JOIN customers cu ON c.ticket_id = cu.ticket_id
-            WHERE cu.employee_id = ?
-        ''', (self.employee_id,))
-        cancellations = cursor.fetchall()
-        conn.close()
-        for cancellation in cancellations:
-            searchable_fields = [
-                str(cancellation[0]),  # ticket_id
-                str(cancellation[1]),  # name
-                str(cancellation[2]),  # email
-                str(cancellation[9])   # status
-            ]
-            if any(search_text in field.lower() for field in searchable_fields):
-                self.cancellations_tree.insert('', tk.END, values=cancellation)
+        # Searches ticket ID, name, email and status in the row store
+        if not self.cancellations_tree.winfo_exists():
+            return
+        sort, reverse = self._cancel_sort
+        self.cancellations_pager.show(self.cancellations_store.select(self.cancel_search_var.get().lower(), sort, reverse))
 
     def delete_cancellation(self):
         selected_item = self.cancellations_tree.selection()
@@ -1720,61 +1857,31 @@ FunPass: Amusement Park Ticketing System
             return
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this cancellation record?"):
             ticket_id = self.cancellations_tree.item(selected_item[0])['values'][0]
-            conn = sqlite3.connect('funpass.db')
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM cancellations WHERE ticket_id = ?', (ticket_id,))
-            conn.commit()
-            conn.close()
+            try:
+                self.backend.delete_cancellation(ticket_id)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             self.cancellations_tree.delete(selected_item[0])
+            self.views.invalidate(CANCELLATIONS, rerender=False)
             messagebox.showinfo("Success", "Cancellation record deleted successfully!")
 
     def sort_cancellations(self, sort_option):
-        items = []
-        for item in self.cancellations_tree.get_children():
-            values = self.cancellations_tree.item(item)['values']
-            items.append(values)
         for label, idx, reverse in self._cancel_sort_options:
             if label == sort_option:
-            # Quantity, Amount
-                if idx in [5, 6]:
-                    items.sort(key=lambda x: float(str(x[idx]).replace('₱','').replace(',','')), reverse=reverse)
-            # Booked Date, Purchased Date
-                elif idx in [7, 8]:
-                    from datetime import datetime
-                    def parse_date(val):
-                        try:
-                            return datetime.strptime(val, '%m/%d/%Y')
-                        except Exception:
-                            return datetime.min
-                    items.sort(key=lambda x: parse_date(x[idx]), reverse=reverse)
-                else:
-                    items.sort(key=lambda x: str(x[idx]).lower(), reverse=reverse)
+                self._cancel_sort = (row_store.EMPLOYEE_CANCELLATIONS.display_columns[idx], reverse)
                 break
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        for item in items:
-            self.cancellations_tree.insert('', tk.END, values=item)
+        self.search_cancellations()
 
     def load_cancellations_data(self):
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        # Only show cancellations for tickets sold by this employee
-        cursor.execute('''
-            SELECT c.ticket_id, c.name, c.email, c.pass_type, c.reasons, c.quantity, c.amount,
-                   strftime('%m/%d/%Y', c.booked_date) as booked_date,
-                   strftime('%m/%d/%Y', c.purchased_date) as purchased_date,
-                   c.status
-            FROM cancellations c
-            INNER JOIN customers cu ON c.ticket_id = cu.ticket_id
-            WHERE cu.employee_id = ?
-            ORDER BY c.id DESC
-        ''', (self.employee_id,))
-        cancellations = cursor.fetchall()
-        conn.close()
-        for cancellation in cancellations:
-            self.cancellations_tree.insert('', tk.END, values=cancellation)
+        # Only cancellations for tickets sold by this employee (the store's scope), newest first
+        self.db.submit(self.cancellations_store.read_changes, callback=self._fill_cancellations_tree,
+                       priority=HIGH, key='page')
+
+    @profiled()
+    def _fill_cancellations_tree(self, patch):
+        self.cancellations_store.apply(patch)
+        self.search_cancellations()
 
 if __name__ == "__main__":
     root = tk.Tk()
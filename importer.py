@@ -0,0 +1,240 @@
+"""
+Bulk CSV import of ticket sales into customers.
+
+The file is streamed in batches. Rows are checked in memory against prices
+and employees loaded once up front; then each batch takes the write lock
+(BEGIN IMMEDIATE), reads the remaining allocations and existing ticket ids,
+and is inserted with a single executemany in that same transaction, so a
+sale made meanwhile can neither be oversold nor collide with a ticket id.
+Rows that fail are written to a reject file next to the input, with the
+reason in an extra "error" column.
+
+Columns (header row required, case-insensitive):
+    name, email, pass_type, quantity, booked_date     required (email may be empty)
+    employee_id                                       required unless --employee gives a default
+    ticket_id, purchased_date                         optional, generated / today if empty
+The amount is always the current price times the quantity, as in services.sell_tickets.
+
+Usage: python importer.py bookings.csv [--db funpass.db] [--employee E12345] [--batch 5000]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import archive
+from services import employee_availability, generate_ticket_id
+
+BATCH_SIZE = 5000
+REQUIRED_COLUMNS = ('name', 'email', 'pass_type', 'quantity', 'booked_date')
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y')
+
+INSERT_SQL = '''INSERT INTO customers
+                (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date '{value}'")
+
+
+def _counting_lines(handle, counter):
+    # Yield the file's lines while counting the bytes read, for progress against the file size
+    for line in handle:
+        counter[0] += len(line.encode('utf-8'))
+        yield line
+
+
+class Importer:
+    def __init__(self, conn, default_employee=None, batch_size=BATCH_SIZE):
+        self.conn = conn
+        self.default_employee = default_employee
+        self.batch_size = batch_size
+        self.today = datetime.now().strftime('%Y-%m-%d')
+        # Everything the validation needs is loaded once, not per row
+        self.prices = dict(conn.execute('SELECT pass_type, price FROM pricing'))
+        self.employees = {row[0] for row in conn.execute('SELECT employee_id FROM employees')}
+        archive.install(conn)  # employee_availability subtracts archived sales too
+        conn.commit()  # each batch opens its own transaction
+        self.seen_ids = set()  # ticket ids used earlier in this file
+
+    def validate(self, row):
+        # Returns the values to insert, or raises ValueError with the reason
+        name = (row.get('name') or '').strip()
+        if not name:
+            raise ValueError("name is required")
+        pass_type = (row.get('pass_type') or '').strip()
+        if pass_type not in self.prices:
+            raise ValueError(f"unknown pass type '{pass_type}'")
+        try:
+            quantity = int(row.get('quantity') or '')
+        except ValueError:
+            raise ValueError(f"invalid quantity '{row.get('quantity')}'")
+        if quantity <= 0:
+            raise ValueError("quantity must be greater than 0")
+        booked_date = parse_date((row.get('booked_date') or '').strip())
+        purchased_date = (row.get('purchased_date') or '').strip()
+        purchased_date = parse_date(purchased_date) if purchased_date else self.today
+        employee_id = (row.get('employee_id') or '').strip() or self.default_employee
+        if not employee_id:
+            raise ValueError("employee_id is required")  # every sale counts against an employee's allocation
+        if employee_id not in self.employees:
+            raise ValueError(f"unknown employee '{employee_id}'")
+        ticket_id = (row.get('ticket_id') or '').strip() or None  # None: generated when the batch is written
+        if ticket_id in self.seen_ids:
+            raise ValueError(f"duplicate ticket id '{ticket_id}' in file")
+        return [ticket_id, name, (row.get('email') or '').strip(), quantity, self.prices[pass_type] * quantity,
+                booked_date, purchased_date, pass_type, employee_id]
+
+    def _existing_ids(self, ticket_ids):
+        # Which of these ticket ids are already in the database (in chunks under SQLite's variable limit)
+        existing = set()
+        ticket_ids = list(ticket_ids)
+        for start in range(0, len(ticket_ids), 900):
+            chunk = ticket_ids[start:start + 900]
+            existing.update(row[0] for row in self.conn.execute(
+                f"SELECT ticket_id FROM customers WHERE ticket_id IN ({', '.join('?' for _ in chunk)})", chunk))
+        return existing
+
+    def _assign_ids(self, values_list):
+        # Generate ticket ids for rows without one, drawing again while an id is taken in the file or the database
+        pending = values_list
+        while pending:
+            for values in pending:
+                values[0] = generate_ticket_id()
+                while values[0] in self.seen_ids:
+                    values[0] = generate_ticket_id()
+                self.seen_ids.add(values[0])
+            taken = self._existing_ids(values[0] for values in pending)
+            pending = [values for values in pending if values[0] in taken]
+
+    def _flush(self, batch, rejects):
+        # batch: list of (csv row, values); inserts what is valid in one transaction that holds the write lock
+        # from the first check on, so no other sale can change the allocations or take a ticket id meanwhile
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._assign_ids([values for _, values in batch if values[0] is None])
+            existing = self._existing_ids(values[0] for _, values in batch)
+            remaining = {}  # (employee_id, pass type) -> tickets the employee may still sell
+            rows = []
+            for row, values in batch:
+                if values[0] in existing:
+                    # Only ids from the file get here, generated ones were drawn again
+                    rejects.append((row, f"ticket id '{values[0]}' already exists"))
+                    continue
+                employee_id, pass_type, quantity = values[8], values[7], values[3]
+                key = (employee_id, pass_type)
+                if key not in remaining:
+                    remaining[key] = employee_availability(self.conn, employee_id, pass_type)
+                if quantity > remaining[key]:
+                    rejects.append((row, f"employee {employee_id} can only sell {remaining[key]} more {pass_type} tickets"))
+                    continue
+                remaining[key] -= quantity
+                rows.append(values)
+            self.conn.executemany(INSERT_SQL, rows)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return len(rows)
+
+    def _write_rejects(self, rejects):
+        if self._reject_writer is None:
+            self._reject_file = open(self._reject_path, 'w', newline='', encoding='utf-8')
+            self._reject_writer = csv.DictWriter(self._reject_file, fieldnames=self._fieldnames + ['error'],
+                                                 extrasaction='ignore')
+            self._reject_writer.writeheader()
+        for row, error in rejects:
+            self._reject_writer.writerow({**row, 'error': error})
+        return len(rejects)
+
+    def run(self, path, reject_path=None, progress=None):
+        """Import path and return a summary dict.
+
+        progress(rows_read, fraction_of_file) is called after every batch.
+        """
+        start = time.perf_counter()
+        self._reject_path = reject_path or os.path.splitext(path)[0] + '.rejects.csv'
+        self._reject_writer = self._reject_file = None
+        size = os.path.getsize(path) or 1
+        counter = [0]
+        imported = rejected = rows_read = 0
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            reader = csv.DictReader(_counting_lines(handle, counter))
+            self._fieldnames = reader.fieldnames = [field.strip().lower() for field in reader.fieldnames or []]
+            missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+            try:
+                batch, rejects = [], []
+                for row in reader:
+                    rows_read += 1
+                    try:
+                        values = self.validate(row)
+                    except ValueError as e:
+                        rejects.append((row, str(e)))
+                    else:
+                        if values[0] is not None:
+                            self.seen_ids.add(values[0])
+                        batch.append((row, values))
+                    if len(batch) >= self.batch_size:
+                        imported += self._flush(batch, rejects)
+                        batch = []
+                    if len(rejects) >= self.batch_size:
+                        rejected += self._write_rejects(rejects)
+                        rejects = []
+                    if progress is not None and rows_read % self.batch_size == 0:
+                        progress(rows_read, min(counter[0] / size, 1.0))
+                if batch:
+                    imported += self._flush(batch, rejects)
+                if rejects:
+                    rejected += self._write_rejects(rejects)
+            finally:
+                if self._reject_file is not None:
+                    self._reject_file.close()
+        if progress is not None:
+            progress(rows_read, 1.0)
+        return {
+            'rows': rows_read,
+            'imported': imported,
+            'rejected': rejected,
+            'reject_path': self._reject_path if rejected else None,
+            'seconds': time.perf_counter() - start,
+        }
+
+
+def import_customers(db_path, path, default_employee=None, batch_size=BATCH_SIZE, progress=None):
+    # Convenience wrapper that owns its connection, safe to call from a worker thread
+    conn = sqlite3.connect(db_path)
+    try:
+        return Importer(conn, default_employee, batch_size).run(path, progress=progress)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import ticket sales from a CSV file into customers")
+    parser.add_argument('path')
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--employee', help="employee id for rows without an employee_id column value")
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    def progress(rows, fraction):
+        print(f"\r{rows} rows read ({fraction:.0%})", end='', flush=True)
+
+    result = import_customers(args.db, args.path, args.employee, args.batch, progress)
+    print(f"\nImported {result['imported']} of {result['rows']} rows in {result['seconds']:.2f}s")
+    if result['rejected']:
+        print(f"{result['rejected']} rows rejected, see {result['reject_path']}")
+
+
+if __name__ == "__main__":
+    main()
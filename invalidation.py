@@ -0,0 +1,58 @@
+"""
+This module keeps track of which views read which data, so that a change
+only re-renders the views that actually depend on it.
+"""
+
+# Data sources a view can depend on
+PRICING = 'pricing'              # pricing table
+SALES = 'sales'                  # customers table (ticket sales)
+CANCELLATIONS = 'cancellations'  # cancellations table (refund requests and their status)
+ALLOCATIONS = 'allocations'      # employees table (accounts and pass allocations)
+
+
+class ViewRegistry:
+    # Registry of the views of one dashboard and the data sources each of them reads
+    def __init__(self):
+        self._views = {}  # view name -> (sources, render callback)
+        self._stale = set()  # views that depend on changed data but were not on screen
+        self._listeners = []  # callbacks told about every change (e.g. caches)
+        self.current = None  # name of the view currently on screen
+
+    def register(self, name, sources, render=None):
+        # render is called to refresh the view in place when it is on screen
+        self._views[name] = (frozenset(sources), render)
+
+    def show(self, name):
+        # Page builders call this once they have (re)built a view from fresh data
+        self.current = name
+        self._stale.discard(name)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def dependents(self, *sources):
+        changed = set(sources)
+        return [name for name, (deps, _) in self._views.items() if deps & changed]
+
+    def is_stale(self, name):
+        return name in self._stale
+
+    def invalidate(self, *sources, rerender=True):
+        """Tell the registry that the given data sources changed.
+
+        The visible view is re-rendered if it depends on them, every other
+        dependent view is only marked stale. Pass rerender=False when the caller
+        already patched the visible view itself. Returns the re-rendered views.
+        """
+        # Listeners go first so that re-rendered views never read stale cached data
+        for callback in self._listeners:
+            callback(*sources)
+        rerendered = []
+        for name in self.dependents(*sources):
+            render = self._views[name][1]
+            if name != self.current:
+                self._stale.add(name)
+            elif rerender and render is not None:
+                render()
+                rerendered.append(name)
+        return rerendered
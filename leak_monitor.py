@@ -0,0 +1,122 @@
+"""
+Diagnostics for widgets, images and memory that outlive their page.
+
+Turned on with FUNPASS_LEAKS=1 or `python login.py --leaks`. After every
+page render (reported by LatencyMonitor) and every return to the login
+window, check() takes a census:
+
+    tk_widgets      widgets alive in the current Tk interpreter
+    widget_objects  Python widget objects still reachable
+    dead_widgets    of those, widgets already destroyed in Tk (stale references
+                    such as self.customers_tree after clear_content)
+    tk_images       images alive in the current Tk interpreter
+    photo_objects   PhotoImage objects still reachable (login.image_refs etc.)
+    traced_kb       memory allocated by Python, from tracemalloc
+
+Each census is compared with the previous one taken at the same point (the
+same screen, or the login window), which should look identical; anything
+that grew is printed with the tracemalloc lines that grew most since then.
+With diagnostics off check() returns straight away.
+"""
+import gc
+import os
+import tkinter as tk
+import tracemalloc
+
+try:
+    from PIL import ImageTk
+except ImportError:
+    ImageTk = None
+
+TOP_ALLOCATIONS = 5
+TRACE_FRAMES = 5
+
+_enabled = False
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+
+def is_enabled():
+    return _enabled
+
+
+def _tk_widget_count(widget):
+    return 1 + sum(_tk_widget_count(child) for child in widget.winfo_children())
+
+
+def _is_dead(widget):
+    try:
+        return not widget.winfo_exists()
+    except tk.TclError:  # its interpreter (an old session's root) is gone
+        return True
+
+
+def census(root):
+    # Counts described in the module docstring; runs on the Tk thread
+    gc.collect()
+    photo_types = (tk.PhotoImage,) + ((ImageTk.PhotoImage,) if ImageTk is not None else ())
+    widget_objects = dead_widgets = photo_objects = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, tk.Misc) and not isinstance(obj, tk.Tk):
+            widget_objects += 1
+            dead_widgets += _is_dead(obj)
+        elif isinstance(obj, photo_types):
+            photo_objects += 1
+    return {
+        'tk_widgets': _tk_widget_count(root),
+        'widget_objects': widget_objects,
+        'dead_widgets': dead_widgets,
+        'tk_images': len(root.tk.call('image', 'names')),
+        'photo_objects': photo_objects,
+        'traced_kb': tracemalloc.get_traced_memory()[0] // 1024 if tracemalloc.is_tracing() else 0,
+    }
+
+
+class LeakMonitor:
+    def __init__(self):
+        self.checks = 0
+        self._last = {}  # point -> (census, tracemalloc snapshot)
+
+    def check(self, root, point):
+        """Take a census at point (e.g. 'admin/Customers') and report growth since the last one there."""
+        if not _enabled:
+            return None
+        try:
+            counts = census(root)
+        except tk.TclError:
+            return None  # the window was closed meanwhile
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        self.checks += 1
+        previous = self._last.get(point)
+        self._last[point] = (counts, snapshot)
+        print(f"[leaks] {point}: " + ', '.join(f"{name} {value}" for name, value in counts.items()))
+        if previous is None:
+            return counts
+        before, before_snapshot = previous
+        grown = {name: counts[name] - before[name] for name in counts
+                 if counts[name] > before[name] and name != 'traced_kb'}
+        if grown or counts['traced_kb'] - before['traced_kb'] > 1024:
+            growth = ', '.join(f"{name} +{delta}" for name, delta in grown.items())
+            print(f"[leaks] {point} GREW since its last check: {growth or 'memory only'} "
+                  f"(traced {counts['traced_kb'] - before['traced_kb']:+} KB)")
+            if snapshot is not None and before_snapshot is not None:
+                self._print_top(snapshot, before_snapshot)
+        return counts
+
+    def _print_top(self, snapshot, before_snapshot):
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = snapshot.filter_traces(filters).compare_to(before_snapshot.filter_traces(filters), 'lineno')
+        for stat in [stat for stat in stats if stat.size_diff > 0][:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            print(f"[leaks]   {stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+} blocks) "
+                  f"{os.path.basename(frame.filename)}:{frame.lineno}")
+
+
+leak_monitor = LeakMonitor()
+if os.environ.get('FUNPASS_LEAKS') == '1':
+    enable()
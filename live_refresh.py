@@ -0,0 +1,176 @@
+"""
+Live refresh for the admin stat cards.
+
+Instead of re-running every dashboard query on a timer, LiveStats keeps the
+raw totals behind the cards in memory and, on each poll, only reads the
+customers and cancellations rows added since the last poll (rowid high-water
+marks). PRAGMA data_version tells whether anything was committed at all, so
+an idle database costs one pragma per poll.
+
+When the change log is installed it tells which tables changed and how:
+changes to unrelated tables are ignored, and updates or deletes (which do
+not show up as new rows) trigger a full recompute. Without it, a changed
+database with no new rows is recomputed. Either way the totals are also
+recomputed every RECONCILE_SECONDS so they never drift from the tables.
+"""
+import os
+import time
+
+import change_log
+from queries import ADMIN_STATS_SQL, this_month
+
+# Seconds between polls while live mode is on
+POLL_SECONDS = float(os.environ.get('FUNPASS_LIVE_POLL', 5))
+# Seconds between full recomputes, to pick up updates and deletes
+RECONCILE_SECONDS = float(os.environ.get('FUNPASS_LIVE_RECONCILE', 300))
+
+NEW_SALES_SQL = f'''
+    SELECT rowid, amount, quantity, pass_type, {this_month('purchased_date')}
+    FROM customers
+    WHERE rowid > ?
+    ORDER BY rowid
+'''
+
+NEW_CANCELLATIONS_SQL = f'''
+    SELECT ca.id, ca.status, ca.amount, ca.quantity, {this_month('ca.purchased_date')},
+           EXISTS (SELECT 1 FROM customers c WHERE c.ticket_id = ca.ticket_id)
+    FROM cancellations ca
+    WHERE ca.id > ?
+    ORDER BY ca.id
+'''
+
+MONTH_PASS_TOTALS_SQL = f'''
+    SELECT pass_type, SUM(quantity)
+    FROM customers
+    WHERE {this_month('purchased_date')}
+    GROUP BY pass_type
+'''
+
+
+class LiveStats:
+    def __init__(self):
+        self.totals = None  # raw totals behind the cards, None until the first poll
+        self.month_passes = {}  # pass type -> tickets sold this month
+        self.last_sale = 0  # customers rowid high-water mark
+        self.last_cancellation = 0  # cancellations id high-water mark
+        self.month = None
+        self.data_version = None
+        self.log_seq = None  # change_log high-water mark, None without a change log
+        self.conn_id = None  # data_version is only comparable on the same connection
+        self.reconciled_at = 0
+        self.full_loads = 0
+        self.delta_loads = 0
+
+    def reset(self):
+        # Forget everything, the next poll does a full load
+        self.totals = None
+
+    def poll(self, conn):
+        """Bring the totals up to date and return (stats, changed).
+
+        stats has the same keys as queries.load_admin_stats(). Must always be
+        called with the same connection (the executor's worker connection).
+        """
+        cursor = conn.cursor()
+        data_version = cursor.execute('PRAGMA data_version').fetchone()[0]
+        if self.totals is not None and id(conn) == self.conn_id and data_version == self.data_version:
+            if time.monotonic() - self.reconciled_at < RECONCILE_SECONDS:
+                return self.stats(), False
+        # One read transaction so the totals and the high-water marks match
+        cursor.execute('BEGIN')
+        try:
+            changed = self._refresh(cursor, conn)
+        finally:
+            conn.commit()
+        self.data_version = data_version
+        self.conn_id = id(conn)
+        return self.stats(), changed
+
+    def _refresh(self, cursor, conn):
+        month = cursor.execute("SELECT date('now', 'start of month')").fetchone()[0]
+        if (self.totals is None or id(conn) != self.conn_id or month != self.month
+                or time.monotonic() - self.reconciled_at >= RECONCILE_SECONDS):
+            self._full_load(cursor, conn, month)
+            return True
+        if self.log_seq is None:
+            if not self._apply_new_rows(cursor):
+                # Something was updated or deleted rather than added
+                self._full_load(cursor, conn, month)
+            return True
+        changes = change_log.changes_since(conn, self.log_seq, tables=('customers', 'cancellations', 'employees'))
+        if changes == []:
+            return False  # only tables the cards do not read were written
+        if changes is None or any(op != 'INSERT' or table == 'employees' for _, table, _, op, _ in changes):
+            self._full_load(cursor, conn, month)
+            return True
+        self._apply_new_rows(cursor)
+        self.log_seq = changes[-1][0]
+        return True
+
+    def _full_load(self, cursor, conn, month):
+        cursor.execute(ADMIN_STATS_SQL)
+        (total_sales, total_refunds, month_sales, month_refunds, active_employees,
+         total_tickets, refunded_tickets, pending_refunds) = cursor.fetchone()
+        self.totals = {
+            'total_sales': total_sales,
+            'total_refunds': total_refunds,
+            'month_sales': month_sales,
+            'month_refunds': month_refunds,
+            'active_employees': active_employees,
+            'total_tickets': total_tickets,
+            'refunded_tickets': refunded_tickets,
+            'pending_refunds': pending_refunds,
+        }
+        cursor.execute(MONTH_PASS_TOTALS_SQL)
+        self.month_passes = dict(cursor.fetchall())
+        self.last_sale = cursor.execute('SELECT COALESCE(MAX(rowid), 0) FROM customers').fetchone()[0]
+        self.last_cancellation = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM cancellations').fetchone()[0]
+        self.log_seq = change_log.latest_seq(conn) if change_log.is_installed(conn) else None
+        self.month = month
+        self.reconciled_at = time.monotonic()
+        self.full_loads += 1
+
+    def _apply_new_rows(self, cursor):
+        # Add rows past the high-water marks to the totals, returns False if there were none
+        totals = self.totals
+        cursor.execute(NEW_SALES_SQL, (self.last_sale,))
+        new_sales = cursor.fetchall()
+        cursor.execute(NEW_CANCELLATIONS_SQL, (self.last_cancellation,))
+        new_cancellations = cursor.fetchall()
+        if not new_sales and not new_cancellations:
+            return False
+        for rowid, amount, quantity, pass_type, in_month in new_sales:
+            totals['total_sales'] += amount
+            totals['total_tickets'] += quantity
+            if in_month:
+                totals['month_sales'] += amount
+                self.month_passes[pass_type] = self.month_passes.get(pass_type, 0) + quantity
+            self.last_sale = rowid
+        for cancel_id, status, amount, quantity, in_month, has_ticket in new_cancellations:
+            if status == 'Pending':
+                totals['pending_refunds'] += 1
+            elif status == 'Approved':
+                totals['refunded_tickets'] += quantity
+                if has_ticket:
+                    totals['total_refunds'] += amount
+                if in_month:
+                    totals['month_refunds'] += amount
+            self.last_cancellation = cancel_id
+        self.delta_loads += 1
+        return True
+
+    def stats(self):
+        totals = self.totals
+        if self.month_passes:
+            pass_type, quantity = max(self.month_passes.items(), key=lambda item: item[1])
+            popular_pass_text = f"{pass_type} ({quantity} sold)"
+        else:
+            popular_pass_text = "No passes sold yet"
+        return {
+            'net_total_sales': totals['total_sales'] - totals['total_refunds'],
+            'net_total_month_sales': totals['month_sales'] - totals['month_refunds'],
+            'active_employees': totals['active_employees'],
+            'net_total_tickets': totals['total_tickets'] - totals['refunded_tickets'],
+            'pending_refunds': totals['pending_refunds'],
+            'popular_pass_text': popular_pass_text,
+        }
@@ -0,0 +1,103 @@
+"""
+Load test for server.py on localhost.
+
+Starts a FunPass server on a temporary copy of the database (or uses --url),
+then simulates POS terminals: each thread sells tickets and checks its
+availability in a loop, like a cashier at peak. Prints throughput and
+latency percentiles and checks that every accepted sale was stored.
+
+Usage: python load_test.py [--db funpass.db] [--terminals 8] [--sales 200] [--url http://127.0.0.1:8765 --token TOKEN]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+
+from client import ApiClient
+from server import FunPassServer
+from services import PASS_COLUMNS, ServiceError
+
+
+def terminal(client, employee_id, sales, timings, errors):
+    pass_types = list(PASS_COLUMNS)
+    for i in range(sales):
+        start = time.perf_counter()
+        try:
+            client.sell_tickets(employee_id=employee_id, name=f"Load {employee_id} {i}", email='',
+                                pass_type=pass_types[i % len(pass_types)], quantity=1,
+                                booked_date=date.today().isoformat())
+            timings['sale'].append(time.perf_counter() - start)
+        except ServiceError as e:
+            errors.append(str(e))
+        start = time.perf_counter()
+        client.availability(employee_id)
+        timings['availability'].append(time.perf_counter() - start)
+
+
+def report(name, timings):
+    timings = sorted(t * 1000 for t in timings)
+    if not timings:
+        return
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<13} {len(timings):6d} calls   median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   max {timings[-1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate POS terminals against a FunPass server")
+    parser.add_argument('--db', default='funpass.db', help="database to copy when starting a local server")
+    parser.add_argument('--url', help="use a running server instead of starting one (writes real data!)")
+    parser.add_argument('--token', default=os.environ.get('FUNPASS_API_TOKEN'), help="the running server's API token")
+    parser.add_argument('--terminals', type=int, default=8)
+    parser.add_argument('--sales', type=int, default=200, help="sales per terminal")
+    args = parser.parse_args()
+
+    server = workdir = None
+    token = args.token
+    if args.url:
+        url = args.url
+    else:
+        workdir = tempfile.mkdtemp(prefix='funpass_load_')
+        db_path = os.path.join(workdir, 'load.db')
+        shutil.copy(args.db, db_path)
+        server = FunPassServer(('127.0.0.1', 0), db_path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        token = server.token
+    try:
+        client = ApiClient(url, token)
+        # One employee per terminal, allocated enough to never run out
+        employees = [client.save_employee(name=f"Load Terminal {i}", username=f"load_{os.getpid()}_{i}", password='load',
+                                          allocations={pass_type: args.sales for pass_type in PASS_COLUMNS})
+                     for i in range(args.terminals)]
+        timings = {'sale': [], 'availability': []}
+        errors = []
+        threads = [threading.Thread(target=terminal, args=(client, employee_id, args.sales, timings, errors))
+                   for employee_id in employees]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        print(f"{args.terminals} terminals x {args.sales} sales against {url}")
+        report('sale', timings['sale'])
+        report('availability', timings['availability'])
+        print(f"{len(timings['sale']) / elapsed:.0f} sales/s, {(len(timings['sale']) + len(timings['availability'])) / elapsed:.0f} requests/s, {len(errors)} rejected")
+        stored = sum(len(client.search_sales(employee_id=employee_id, limit=args.sales + 1)) for employee_id in employees)
+        print("stored sales match" if stored == len(timings['sale']) else f"MISMATCH: {stored} stored, {len(timings['sale'])} accepted")
+        for employee_id in employees:
+            client.delete_employee(employee_id)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 import tkinter as tk  # Tkinter for GUI
 from tkinter import messagebox  # For pop-up messages
 from PIL import Image, ImageTk, ImageDraw  # For image handling and drawing
-import sqlite3  # For database connection
+import client  # Database connections, local or through a FunPass server (FUNPASS_API_URL)
+import query_trace  # Database connections (traced with FUNPASS_TRACE=1)
 import os  # For file path operations
+import sys  # For the command line switches
+import profiler  # Opt-in cProfile hooks
+import leak_monitor  # Widget/image leak diagnostics
+import change_log  # Change tracking triggers
+import archive  # Totals of archived sales
+import ticket_lookup  # Ticket ID autocomplete index
+from services import ServiceError  # Rejected requests and an unreachable FunPass server
+from shared import load_photo  # Resized images cached for the life of the window
 from main import AdminDashboard  # Import Admin dashboard
 from for_employees import EmployeeDashboard  # Import Employee dashboard
 
@@ -71,122 +80,154 @@ def create_rounded_button(parent, text, command, width=200, height=40, radius=15
     btn_canvas.pack(pady=30)
     return btn_canvas
 
-# Main Login Window function
-def show_login():
-    root = tk.Tk()  # Create main window
-    root.title("FunPass - Login")
-    # Set the window to full screen using geometry
-    screen_width = root.winfo_screenwidth()
-    screen_height = root.winfo_screenheight()
-    root.geometry(f"{screen_width}x{screen_height}+0+0")
-    resample_filter = get_resample_filter()  # Get best image resample filter
-
-    # Try to set a background image
-    try:
-        image_path = "bg_carousel.jpeg"
-        bg_image = Image.open(image_path)
-        bg_image_resized = bg_image.resize((screen_width, screen_height), resample_filter)
-        bg_photo = ImageTk.PhotoImage(bg_image_resized)
-        bg_label = tk.Label(root, image=bg_photo)
-        bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        image_refs.append(bg_photo)
-    except Exception as e:
-        root.configure(bg='white')
-        print(f"Background image error: {e}")
-
-    # Create the login card (rounded rectangle)
-    frame_width, frame_height, frame_radius = 400, 600, 50
-    login_canvas = tk.Canvas(root, width=frame_width, height=frame_height, highlightthickness=0, bg='#3C476F')
-    login_canvas.place(relx=0.5, rely=0.5, anchor='center')
-    draw_rounded_rect(login_canvas, 0, 0, frame_width, frame_height, frame_radius, fill='white')
-    main_frame = tk.Frame(login_canvas, bg='white')
-    login_canvas.create_window((frame_width//2, frame_height//2), window=main_frame, anchor='center')
-
-    # Logo at the top of the login card
-    try:
-        logo_path = "FunPass__1_-removebg-preview.png"
-        logo_img = Image.open(logo_path)
-        logo_width = 230
-        aspect_ratio = logo_img.height / logo_img.width
-        logo_height = int(logo_width * aspect_ratio)
-        logo_img = logo_img.resize((logo_width, logo_height), resample_filter)
-        logo = ImageTk.PhotoImage(logo_img)
-        logo_label = tk.Label(main_frame, image=logo, bg='white')
-        logo_label.pack(pady=(30, 0), anchor='center')
-        image_refs.append(logo)
-    except Exception:
-        # Fallback: show text if logo image fails
-        tk.Label(main_frame, text="FunPass", font=('Arial', 24, 'bold'), bg='white', fg='#4CAF50').pack(pady=20)
-
-    tk.Label(main_frame, text="For Faculty Members Only", font=('Arial', 10, 'bold'), bg='white', fg='#666666').pack(pady=(0, 20))
-
-    # Login form frame
-    form_frame = tk.Frame(main_frame, bg='white')
-    form_frame.pack(pady=10)
-
-    # Username label and entry
-    username_label_frame = tk.Frame(form_frame, bg='white')
-    username_label_frame.pack(fill='x', padx=5)
-    tk.Label(username_label_frame, text="Username:", font=('Arial', 10), bg='white', fg='#333333', anchor='w').pack(side='left', pady=5)
-    username_entry = create_rounded_entry(form_frame, bg='#e3eaff', entry_bg='#e3eaff')
-
-    # Password label and entry
-    password_label_frame = tk.Frame(form_frame, bg='white')
-    password_label_frame.pack(fill='x', padx=5)
-    tk.Label(password_label_frame, text="Password:", font=('Arial', 10), bg='white', fg='#333333', anchor='w').pack(side='left', pady=5)
-    password_entry = create_rounded_entry(form_frame, bg='#e3eaff', entry_bg='#e3eaff', show='*')
-
-    # Show Password Checkbox
-    show_password = tk.BooleanVar()
-    def toggle_password_visibility():
-        password_entry.config(show="" if show_password.get() else "*")
-    showpw_frame = tk.Frame(form_frame, bg='white')
-    showpw_frame.pack(fill='x', padx=5)
-    tk.Checkbutton(
-        showpw_frame, text="Show Password", variable=show_password,
-        command=toggle_password_visibility, bg='white', fg='#333333', anchor='w'
-    ).pack(side='right', pady=5)
-
-    # Login Button
-    def login():
-        username = username_entry.get().strip()
-        password = password_entry.get().strip()
+# The login view. It is built once per window and shown again at every logout;
+# logging in hides it and builds the dashboard in the same window, so changing
+# shifts doesn't open a new window or load the images again.
+class LoginScreen:
+    def __init__(self, root):
+        self.root = root
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        self.frame = tk.Frame(root, bg='white')
+
+        # Try to set a background image
+        try:
+            bg_photo = load_photo(root, "bg_carousel.jpeg", screen_width, screen_height)
+            bg_label = tk.Label(self.frame, image=bg_photo)
+            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+        except Exception as e:
+            print(f"Background image error: {e}")
+
+        # Create the login card (rounded rectangle)
+        frame_width, frame_height, frame_radius = 400, 600, 50
+        login_canvas = tk.Canvas(self.frame, width=frame_width, height=frame_height, highlightthickness=0, bg='#3C476F')
+        login_canvas.place(relx=0.5, rely=0.5, anchor='center')
+        draw_rounded_rect(login_canvas, 0, 0, frame_width, frame_height, frame_radius, fill='white')
+        main_frame = tk.Frame(login_canvas, bg='white')
+        login_canvas.create_window((frame_width//2, frame_height//2), window=main_frame, anchor='center')
+
+        # Logo at the top of the login card
+        try:
+            logo = load_photo(root, "FunPass__1_-removebg-preview.png", 230)
+            logo_label = tk.Label(main_frame, image=logo, bg='white')
+            logo_label.pack(pady=(30, 0), anchor='center')
+        except Exception:
+            # Fallback: show text if logo image fails
+            tk.Label(main_frame, text="FunPass", font=('Arial', 24, 'bold'), bg='white', fg='#4CAF50').pack(pady=20)
+
+        tk.Label(main_frame, text="For Faculty Members Only", font=('Arial', 10, 'bold'), bg='white', fg='#666666').pack(pady=(0, 20))
+
+        # Login form frame
+        form_frame = tk.Frame(main_frame, bg='white')
+        form_frame.pack(pady=10)
+
+        # Username label and entry
+        username_label_frame = tk.Frame(form_frame, bg='white')
+        username_label_frame.pack(fill='x', padx=5)
+        tk.Label(username_label_frame, text="Username:", font=('Arial', 10), bg='white', fg='#333333', anchor='w').pack(side='left', pady=5)
+        self.username_entry = create_rounded_entry(form_frame, bg='#e3eaff', entry_bg='#e3eaff')
+
+        # Password label and entry
+        password_label_frame = tk.Frame(form_frame, bg='white')
+        password_label_frame.pack(fill='x', padx=5)
+        tk.Label(password_label_frame, text="Password:", font=('Arial', 10), bg='white', fg='#333333', anchor='w').pack(side='left', pady=5)
+        self.password_entry = create_rounded_entry(form_frame, bg='#e3eaff', entry_bg='#e3eaff', show='*')
+
+        # Show Password Checkbox
+        self.show_password = tk.BooleanVar(master=root)
+        showpw_frame = tk.Frame(form_frame, bg='white')
+        showpw_frame.pack(fill='x', padx=5)
+        tk.Checkbutton(
+            showpw_frame, text="Show Password", variable=self.show_password,
+            command=self.toggle_password_visibility, bg='white', fg='#333333', anchor='w'
+        ).pack(side='right', pady=5)
+
+        # Create the rounded login button
+        create_rounded_button(form_frame, text="Log In", command=self.login, width=210, height=35, radius=35)
+
+    def toggle_password_visibility(self):
+        self.password_entry.config(show="" if self.show_password.get() else "*")
+
+    def show(self):
+        # Bring the login view back, emptied for the next person
+        self.root.title("FunPass - Login")
+        # Set the window to full screen using geometry
+        self.root.geometry(f"{self.root.winfo_screenwidth()}x{self.root.winfo_screenheight()}+0+0")
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+        self.show_password.set(False)
+        self.toggle_password_visibility()
+        self.frame.place(x=0, y=0, relwidth=1, relheight=1)
+        self.frame.lift()
+        # Allow pressing Enter to trigger login
+        self.root.bind('<Return>', lambda event: self.login())
+        self.username_entry.focus_set()
+        # With leak diagnostics on, every return to the login window is compared with the last one
+        self.root.after_idle(leak_monitor.leak_monitor.check, self.root, 'login')
+
+    def login(self):
+        username = self.username_entry.get().strip()
+        password = self.password_entry.get().strip()
         if not username or not password:
             messagebox.showwarning("Invalid Input", "Please enter both username and password")
             return
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        # 1. Check admin credentials
-        cursor.execute('SELECT * FROM admin WHERE username = ? AND password = ?', (username, password))
-        admin = cursor.fetchone()
-        if admin:
-            root.destroy()
-            admin_root = tk.Tk()
-            AdminDashboard(admin_root)
-            admin_root.mainloop()
-            conn.close()
+        try:
+            # Admin first, then employees; on a FunPass server this is its /login endpoint
+            user = client.get_backend().authenticate(username, password)
+        except ServiceError as e:
+            # Server down or a wrong FUNPASS_API_TOKEN
+            messagebox.showerror("Server Unavailable", str(e))
             return
-        # 2. Check employee credentials
-        cursor.execute('SELECT employee_id FROM employees WHERE username = ? AND password = ?', (username, password))
-        emp = cursor.fetchone()
-        if emp:
-            root.destroy()
-            emp_root = tk.Tk()
-            EmployeeDashboard(emp_root, employee_id=emp[0])
-            emp_root.mainloop()
-        else:
+        if user is None:
             messagebox.showerror("Login Failed", "Invalid credentials")
-        conn.close()
+        elif user['role'] == 'admin':
+            self._open_session(AdminDashboard)
+        else:
+            self._open_session(EmployeeDashboard, employee_id=user['employee_id'])
+
+    def _open_session(self, dashboard_class, **kwargs):
+        # The dashboard fills the same window; its logout calls show_login(root) to come back here
+        self.root.unbind('<Return>')
+        self.frame.place_forget()
+        dashboard_class(self.root, **kwargs)
+
 
-    # Create the rounded login button
-    create_rounded_button(form_frame, text="Log In", command=login, width=210, height=35, radius=35)
+# Login view of each window, created the first time it is shown
+login_screens = {}
 
-    # Allow pressing Enter to trigger login
-    def on_enter_key(event):
-        login()
-    root.bind('<Return>', on_enter_key)
-    root.mainloop()
+# Main Login Window function
+def show_login(root=None):
+    # Show the login view in root; without a root, open the window and run it until it is closed
+    new_window = root is None
+    if new_window:
+        root = tk.Tk()  # Create main window
+    if root not in login_screens:
+        login_screens[root] = LoginScreen(root)
+    login_screens[root].show()
+    if new_window:
+        root.mainloop()
+
+
+def ensure_schema():
+    # Databases created before the change log, archiving and ticket autocomplete existed get their tables, triggers and indexes here;
+    # also trims old change log entries. A FunPass server does this for its own database when it starts
+    if client.remote():
+        return
+    conn = query_trace.connect('funpass.db')
+    try:
+        change_log.install(conn)
+        archive.install(conn)
+        ticket_lookup.install(conn)
+        conn.commit()
+        change_log.compact(conn)  # the log gains a row per write; keep the last FUNPASS_CHANGE_LOG_DAYS days
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__": # Entry point
+    if '--profile' in sys.argv[1:]:  # Same as FUNPASS_PROFILE=1
+        profiler.enable()
+    if '--leaks' in sys.argv[1:]:  # Same as FUNPASS_LEAKS=1
+        leak_monitor.enable()
+    ensure_schema()
     show_login()
\ No newline at end of file
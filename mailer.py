@@ -0,0 +1,81 @@
+"""
+Background email queue.
+
+Sending through SMTP takes seconds (connect, STARTTLS, login), which used to
+happen inside the checkout click. mailer.send() only queues the message; a
+daemon thread delivers the queue, reusing one SMTP session for every message
+that is waiting.
+
+Every email of the app goes through here. The SMTP settings come from
+FUNPASS_SMTP_SERVER, FUNPASS_SMTP_PORT, FUNPASS_SMTP_USER and
+FUNPASS_SMTP_PASS, defaulting to the park's Gmail account.
+"""
+import os
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+
+SMTP_SERVER = os.environ.get('FUNPASS_SMTP_SERVER', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('FUNPASS_SMTP_PORT', 587))
+SMTP_USER = os.environ.get('FUNPASS_SMTP_USER', 'funpasstothemagicalpark@gmail.com')
+SMTP_PASS = os.environ.get('FUNPASS_SMTP_PASS', 'qauf qaub sexo hefs')   # google app password
+
+
+class Mailer:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def send(self, to_email, subject, body):
+        # Queue a plain-text email, returns immediately
+        if not to_email:
+            return
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        msg['From'] = SMTP_USER
+        msg['To'] = to_email
+        msg.set_content(body)
+        self._queue.put(msg)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='funpass-mailer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Everything queued meanwhile goes out over the same SMTP session
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        try:
+            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
+                server.starttls()
+                server.login(SMTP_USER, SMTP_PASS)
+                for msg in batch:
+                    try:
+                        server.send_message(msg)
+                        self.sent += 1
+                        print(f"Email sent to {msg['To']}")
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"Failed to send email to {msg['To']}: {e}")
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Failed to send email: {e}")
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+# Shared by both dashboards
+mailer = Mailer()
@@ -1,18 +1,36 @@
 # Import Tkinter for GUI components
 import tkinter as tk
 # Import themed widgets (ttk), and messagebox for pop-up dialogs
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 # Import PIL for image processing (used for logos, icons, etc.)
 from PIL import Image, ImageTk # Pillow is a fork of PIL, so we use it for image handling
 # Import sqlite3 for database operations (CRUD for app data)
 import sqlite3 # SQLite is a lightweight database engine
+from query_trace import tracer
+from profiler import profile, profiled # cProfile hooks, on with FUNPASS_PROFILE=1 or login.py --profile
+from ui_latency import LatencyMonitor # Click-to-render timings per screen
+from stall_watchdog import StallWatchdog # Logs what blocked the Tk thread
+from leak_monitor import leak_monitor # Widget/image census per screen, on with FUNPASS_LEAKS=1
 from datetime import datetime, timedelta # For datetime and timedelta for date/time logic (sales, bookings, etc.)
 from tkcalendar import DateEntry # Import tkcalendar's DateEntry for date picker widgets in forms
 import time # Time for time-based updates (e.g., live clock)
-import random # Import random for generating unique IDs (e.g., employee IDs)
-from shared import create_database, BaseWindow # Import shared utilities (database creation, base window class)
-import smtplib # For sending emails (e.g., notifications, confirmations)
-from email.message import EmailMessage # For creating email messages
+from shared import create_database, BaseWindow, ProgressDialog, load_photo, close_session # Import shared utilities (database creation, base window class)
+from invalidation import ViewRegistry, PRICING, SALES, CANCELLATIONS, ALLOCATIONS # Dependency-aware view refreshes
+from stats_cache import stats_cache # Dashboard statistics served from memory on repeat visits
+from queries import load_admin_stats, load_top_employees, load_employee_rows, matches # Dashboard queries shared with the benchmarks
+from db_executor import DBExecutor, HIGH, LOW # Runs queries off the Tk thread
+from live_refresh import LiveStats, POLL_SECONDS # Incremental stat card refresh
+import services # Business rules shared with headless tools
+import importer # Bulk CSV import of sales
+import exporter # Streaming CSV export
+import allocations # Allocation CSV files for the bulk editor
+import reports # Monthly pandas reports
+import charts # Sales-trend charts rendered off the Tk thread
+import row_store # In-memory copies of the customers and cancellations tables
+import io
+from services import ServiceError
+from client import get_backend, connect, remote # Local database or a FunPass server (FUNPASS_API_URL), for writes and reads
+from mailer import mailer # Background email queue (notifications, confirmations)
 
 # Utility function for drawing rounded rectangles
 def draw_rounded_rect(canvas, x1, y1, x2, y2, r, **kwargs):
@@ -52,35 +70,66 @@ class AdminDashboard:
             self.root.state('zoomed')  # Fallback for other platforms
         # Set a background for the root window so the padding is visible
         self.root.configure(bg='white')
+        # Everything of this session lives in one frame, so logging out drops it and keeps the window
+        self.frame = tk.Frame(self.root, bg='white')
+        self.frame.place(x=0, y=0, relwidth=1, relheight=1)
         # Configure grid: row 0 will expand vertically
-        self.root.grid_rowconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
         # Column 0 for sidebar (fixed width)
-        self.root.grid_columnconfigure(0, weight=0)
+        self.frame.grid_columnconfigure(0, weight=0)
         # Column 1 for main content (expands)
-        self.root.grid_columnconfigure(1, weight=1)
+        self.frame.grid_columnconfigure(1, weight=1)
         # Initialize price entries dictionary for pricing section
         self.price_entries = {}
+        # Record which data each view reads so changes only re-render what depends on them
+        self.views = ViewRegistry()
+        self.views.register('dashboard', (SALES, CANCELLATIONS, ALLOCATIONS), self.show_dashboard)
+        self.views.register('employees', (ALLOCATIONS, SALES, CANCELLATIONS), self.load_employees)
+        self.views.register('customers', (SALES, ALLOCATIONS), self.load_customers_data)
+        self.views.register('cancellations', (CANCELLATIONS,), self.load_cancellations_data)
+        self.views.register('pricing', (PRICING,), self.show_pricing)
+        self.views.register('reports', (SALES, CANCELLATIONS, ALLOCATIONS), self.load_report)
+        # Writes drop the cached dashboard statistics that were computed from the changed data
+        self.views.add_listener(stats_cache.invalidate)
+        # Worker thread with its own connection so queries never block the window
+        self.db = DBExecutor(self.root)
+        # Times each sidebar click until its page is filled in and idle
+        self.latency = LatencyMonitor(self.root, self.db, 'admin',
+                                      on_rendered=lambda screen: leak_monitor.check(self.root, f"admin/{screen}"))
+        # Logs the handler and stack whenever the window freezes; stops with the session frame
+        self.watchdog = StallWatchdog(self.frame)
+        # Charts render on their own worker so drawing never delays a page's queries
+        self.chart_worker = DBExecutor(self.root)
+        self._chart_images = {}
+        # Writes go through the backend: services.py locally, or a shared FunPass server
+        self.backend = get_backend()
+        # Typed in-memory copies of the sales and refund requests: loaded on first view, then brought
+        # up to date from the change log; search and sort never query the database
+        self.customers_store = row_store.RowStore(row_store.ADMIN_CUSTOMERS)
+        self.cancellations_store = row_store.RowStore(row_store.ADMIN_CANCELLATIONS)
+        self.views.add_listener(self._refresh_stores)
+        # Live mode keeps the stat cards current by polling only for new rows
+        self.live = LiveStats()
+        self.live_var = tk.BooleanVar(value=False)
+        self._live_job = None
+        self._time_job = None
         # To create the sidebar navigation (buttons, logo)
         self.create_sidebar()
         # Set a fixed size for the main content frame
-        self.content_frame = tk.Frame(self.root, bg='white', width=3000, height=2000)
+        self.content_frame = tk.Frame(self.frame, bg='white', width=3000, height=2000)
         self.content_frame.grid(row=0, column=1, padx=20, pady=20)
         self.content_frame.pack_propagate(False)
         # Show dashboard by default on startup
+        tracer.navigate('Dashboard')
         self.show_dashboard()
 
     def generate_unique_employee_id(self):
         # To generate a unique employee ID (E#####) not present in the database (Acts as a unique identifier)
-        conn = sqlite3.connect('funpass.db')  # To connect to the database
-        cursor = conn.cursor()
-        while True:
-            # Generate a random 5-digit employee ID with 'E' prefix
-            new_id = f"E{random.randint(10000, 99999)}" # Random 5-digit number
-            # Check if the ID already exists in the employees table
-            cursor.execute("SELECT 1 FROM employees WHERE employee_id = ?", (new_id,))
-            if not cursor.fetchone():  # If ID is unique
-                conn.close()
-                return new_id
+        conn = connect('funpass.db')
+        try:
+            return services.generate_employee_id(conn)
+        finally:
+            conn.close()
 
     def _is_sidebar_active(self, name):
         # Check if a sidebar button is currently active
@@ -125,7 +174,7 @@ class AdminDashboard:
         sidebar_height = 1000 
         corner_radius = 40
 
-        sidebar_container = tk.Frame(self.root, bg='white')
+        sidebar_container = tk.Frame(self.frame, bg='white')
         sidebar_container.grid(row=0, column=0, sticky="n", padx=(20, 0), pady=(22, 0))
         sidebar_container.grid_rowconfigure(0, weight=1)
         sidebar_container.grid_columnconfigure(0, weight=1)
@@ -139,18 +188,8 @@ class AdminDashboard:
         sidebar_canvas.create_window((sidebar_width//2, 0), window=sidebar_frame, anchor="n")
 
         try:
-            logo_path = "FunPass__1_-removebg-preview.png"
-            logo_img = Image.open(logo_path)
-            logo_width = 200
-            aspect_ratio = logo_img.height / logo_img.width
-            logo_height = int(logo_width * aspect_ratio)
-            # Handles pillow version compatibility for image resampling
-            try:
-                resample_filter = Image.Resampling.LANCZOS
-                logo_img = logo_img.resize((logo_width, logo_height), resample_filter)
-            except AttributeError:
-                logo_img = logo_img.resize((logo_width, logo_height))
-            self.sidebar_logo = ImageTk.PhotoImage(logo_img)
+            # Loaded and resized once per window, then reused by every later login
+            self.sidebar_logo = load_photo(self.root, "FunPass__1_-removebg-preview.png", 200)
             logo_label = tk.Label(sidebar_frame, image=self.sidebar_logo, bg='#ECCD93')
             logo_label.pack(padx=(0), pady=(30, 10))
         except Exception as e:
@@ -165,6 +204,7 @@ class AdminDashboard:
             ("👥  Customers", self.show_customers),
             ("❌  Cancellations", self.show_cancellations),
             ("💳  Pricing", self.show_pricing),
+            ("📊  Reports", self.show_reports),
             ("🚪  Logout", self.logout)
         ]
         for text, command in self.sidebar_button_names:
@@ -174,8 +214,13 @@ class AdminDashboard:
 
     def _sidebar_button_click(self, name, command):
         # Handles the sidebar button click and set active state
-        self.set_active_sidebar(name)
-        command()
+        screen = name.split(maxsplit=1)[-1]
+        tracer.navigate(screen)  # counts queries per screen when tracing
+        if screen != 'Logout':
+            self.latency.start(screen)
+        with profile(f"sidebar {screen}"):
+            self.set_active_sidebar(name)
+            command()
 
     def set_active_sidebar(self, page_name):
         # Highlight the active sidebar button
@@ -235,9 +280,11 @@ class AdminDashboard:
         if hasattr(self, 'main_content_canvas'):
             del self.main_content_canvas
 
+    @profiled()
     def show_dashboard(self):
         self.clear_content()
         self.set_active_sidebar('🏠  Dashboard')
+        self.views.show('dashboard')
         # dashboard_frame = self.create_scrollable_main_content_frame()
         dashboard_frame = tk.Frame(self.content_frame, bg='#F0E7D9')
         dashboard_frame.pack(fill=tk.BOTH, expand=True)
@@ -294,6 +341,18 @@ class AdminDashboard:
             fg='#4CAF50'
         )
         status_label.pack(side=tk.LEFT, padx=20, pady=20, anchor='w')
+
+        # Live toggle: stat cards follow new sales and refund requests without reloading
+        live_check = tk.Checkbutton(
+            top_bar_frame,
+            text="Live",
+            variable=self.live_var,
+            command=self._schedule_live_tick,
+            font=('Segoe UI', 12, 'normal'),
+            bg='#FFFFFF',
+            activebackground='#FFFFFF'
+        )
+        live_check.pack(side=tk.LEFT, padx=10, pady=20, anchor='w')
         
         self.update_time()
         # Overview Card
@@ -307,53 +366,40 @@ class AdminDashboard:
         for i in range(2):
             stats_grid.grid_rowconfigure(i, weight=1)
 
-        # Database Queries for statistics
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT COALESCE(SUM(amount), 0) FROM customers') # COALESCE handles NULL values.
-        total_sales = cursor.fetchone()[0] or 0
-        cursor.execute('''
-            SELECT COALESCE(SUM(ca.amount), 0) 
-            FROM cancellations ca
-            WHERE ca.status="Approved"
-            AND ca.ticket_id IN (SELECT ticket_id FROM customers)
-            ''') # The COALESCE function evaluates its arguments from left to right and returns the first non-NULL value it encounters.
-        total_refunds = cursor.fetchone()[0] or 0
-        net_total_sales = total_sales - total_refunds # Calculate net sales
-        cursor.execute('''SELECT COALESCE(SUM(amount), 0) FROM customers WHERE strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''')
-        total_month_sales = cursor.fetchone()[0] or 0 # Calculate total sales for the current month
-        cursor.execute('''SELECT COALESCE(SUM(amount), 0) FROM cancellations WHERE status="Approved" AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')''')
-        month_refunds = cursor.fetchone()[0] or 0 # Calculate total refunds for the current month
-        net_total_month_sales = total_month_sales - month_refunds
-        cursor.execute('SELECT COUNT(*) FROM employees')
-        active_employees = cursor.fetchone()[0] or 0 # Count active employees
-        cursor.execute('SELECT COALESCE(SUM(quantity), 0) FROM customers')
-        total_tickets = cursor.fetchone()[0] or 0 # Count total tickets sold
-        cursor.execute('SELECT COALESCE(SUM(quantity), 0) FROM cancellations WHERE status="Approved"') #
-        total_refunded_tickets = cursor.fetchone()[0] or 0 # Count total tickets refunded
-        net_total_tickets = total_tickets - total_refunded_tickets # Calculate net tickets sold
-        cursor.execute('SELECT COUNT(*) FROM cancellations WHERE status="Pending"') # Count pending refunds
-        pending_refunds = cursor.fetchone()[0] or 0 # Count pending refunds
-        cursor.execute('''SELECT pass_type, SUM(quantity) as total_qty FROM customers WHERE strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now') GROUP BY pass_type ORDER BY total_qty DESC LIMIT 1''')
-        popular_pass = cursor.fetchone() # Get the most popular pass type sold this month
-        if popular_pass:
-            popular_pass_text = f"{popular_pass[0]} ({popular_pass[1]} sold)"
-        else:
-            popular_pass_text = "No passes sold yet"
-        conn.close()
+        # Stat cards are created empty and filled in once the background query returns
         stats_data = [
-            ("Total Sales", f"₱{net_total_sales:,.2f}", "#2196F3"),
-            ("Total Month Sales", f"₱{net_total_month_sales:,.2f}", "#009688"),
-            ("Active Employees", str(active_employees), "#4CAF50"),
-            ("Total Tickets Sold", str(net_total_tickets), "#FF9800"),
-            ("Pending Refunds", str(pending_refunds), "#f44336"),
-            ("Most Popular Pass", popular_pass_text, "#673AB7")
+            ("Total Sales", 'net_total_sales', "#2196F3"),
+            ("Total Month Sales", 'net_total_month_sales', "#009688"),
+            ("Active Employees", 'active_employees', "#4CAF50"),
+            ("Total Tickets Sold", 'net_total_tickets', "#FF9800"),
+            ("Pending Refunds", 'pending_refunds', "#f44336"),
+            ("Most Popular Pass", 'popular_pass_text', "#673AB7")
         ]
-        for idx, (label, value, color) in enumerate(stats_data):
+        self.stat_value_labels = {}
+        for idx, (label, key, color) in enumerate(stats_data):
             stat = tk.Frame(stats_grid, bg='#E5ECCB', bd=0, highlightthickness=0)
             stat.grid(row=idx//3, column=idx%3, padx=12, pady=8, sticky='nsew')
             tk.Label(stat, text=label, font=('Segoe UI', 10, 'normal'), bg='#E5ECCB', fg='#6b7280').pack(anchor='w', padx=10, pady=(8, 0))
-            tk.Label(stat, text=value, font=('Segoe UI', 20, 'bold'), fg=color, bg='#E5ECCB').pack(anchor='w', padx=10, pady=(0, 8))
+            value_label = tk.Label(stat, text="…", font=('Segoe UI', 20, 'bold'), fg=color, bg='#E5ECCB')
+            value_label.pack(anchor='w', padx=10, pady=(0, 8))
+            self.stat_value_labels[key] = value_label
+
+        # Sales Trends Card (charts arrive after the stats, placeholders until then)
+        charts_card, charts_frame = self.create_rounded_card(dashboard_frame, width=1500, height=330, radius=45, bg='#FFFFFF', inner_bg='#FFFFFF')
+        charts_card.pack(pady=20, padx=30, fill='x', expand=False)
+        tk.Label(charts_frame, text='Sales Trends', font=section_title_font, bg='#FFFFFF', fg='#22223B', anchor='w').pack(anchor='w', pady=(10, 0), padx=20)
+        charts_row = tk.Frame(charts_frame, bg='#FFFFFF')
+        charts_row.pack(fill='x', padx=20, pady=(5, 10))
+        self.chart_labels = {}
+        for idx, name in enumerate(charts.CHARTS):
+            charts_row.grid_columnconfigure(idx, weight=1)
+            # Fixed pixel size so the card doesn't jump when the image replaces the placeholder
+            chart_box = tk.Frame(charts_row, width=charts.DEFAULT_SIZE[0], height=charts.DEFAULT_SIZE[1], bg='#FFFFFF')
+            chart_box.grid(row=0, column=idx, padx=8)
+            chart_box.pack_propagate(False)
+            chart_label = tk.Label(chart_box, text="Loading chart…", font=label_font, fg='#6b7280', bg='#FFFFFF')
+            chart_label.pack(fill=tk.BOTH, expand=True)
+            self.chart_labels[name] = chart_label
 
         # Top Performing Employees Card
         top_emp_card, top_emp_frame = self.create_rounded_card(dashboard_frame, width=1500, height=300, radius=40, bg='#FFFFFF', inner_bg='#FFFFFF')
@@ -377,22 +423,97 @@ class AdminDashboard:
         def on_mousewheel_emp(event):
             emp_tree.yview_scroll(int(-1*(event.delta/120)), 'units')
         emp_tree.bind('<MouseWheel>', on_mousewheel_emp)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        now = datetime.now()
-        first_day = now.replace(day=1).strftime('%Y-%m-%d')
-        last_day = now.strftime('%Y-%m-%d')
-        cursor.execute('''SELECT e.name, COALESCE(SUM(c.quantity), 0) - COALESCE((SELECT SUM(ca.quantity) FROM cancellations ca WHERE ca.status = 'Approved' AND ca.ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id = e.employee_id AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')) AND strftime('%Y-%m', ca.purchased_date) = strftime('%Y-%m', 'now')), 0) AS tickets_sold, COALESCE(SUM(c.amount), 0) - COALESCE((SELECT SUM(ca.amount) FROM cancellations ca WHERE ca.status = 'Approved' AND ca.ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id = e.employee_id AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')) AND strftime('%Y-%m', ca.purchased_date) = strftime('%Y-%m', 'now')), 0) AS total_sales FROM employees e LEFT JOIN customers c ON e.employee_id = c.employee_id AND c.purchased_date BETWEEN ? AND ? GROUP BY e.employee_id, e.name ORDER BY total_sales DESC LIMIT 5''', (first_day, last_day))
-        top_employees = cursor.fetchall()
-        conn.close()
+        self.top_emp_tree = emp_tree
+
+        # Statistics are queried off the Tk thread and cached until a sale, cancellation
+        # or employee change invalidates them
+        self.db.submit(self._load_dashboard_stats, datetime.now().strftime('%Y-%m'),
+                       callback=self._render_dashboard_stats, priority=HIGH, key='page')
+        self._schedule_live_tick()
+        self.load_dashboard_charts()
+
+    def load_dashboard_charts(self):
+        # Rendered with Agg on the chart worker, redrawn only when the rollups change (see charts.py)
+        self.chart_worker.submit(charts.dashboard_charts, None, charts.DEFAULT_SIZE,
+                                 callback=self._show_dashboard_charts, priority=LOW, key='charts')
+
+    def _show_dashboard_charts(self, images):
+        if not self.top_emp_tree.winfo_exists():
+            return
+        for name, png in images.items():
+            # PhotoImages are kept per PNG so an unchanged chart is not decoded again
+            photo = self._chart_images.get(name)
+            if photo is None or photo[0] is not png:
+                photo = (png, ImageTk.PhotoImage(Image.open(io.BytesIO(png))))
+                self._chart_images[name] = photo
+            self.chart_labels[name].config(image=photo[1], text='')
+
+    def _load_dashboard_stats(self, conn, month):
+        # Runs on a database worker
+        sources = (SALES, CANCELLATIONS, ALLOCATIONS)
+        # All stat cards come from two statements using conditional aggregation (see queries.py)
+        stats = stats_cache.get(('admin_stats', month), lambda: load_admin_stats(conn), sources)
+        top_employees = stats_cache.get(('admin_top_employees', month), lambda: self._load_top_employees(conn), sources)
+        return stats, top_employees
+
+    def _render_dashboard_stats(self, result):
+        stats, top_employees = result
+        if not self.top_emp_tree.winfo_exists():
+            return
+        self._fill_stat_cards(stats)
         for emp in top_employees:
             name, tickets, sales = emp
             formatted_sales = f"₱{sales:,.2f}" if sales else "₱0.00"
             tickets = str(tickets) if tickets else "0"
-            emp_tree.insert('', tk.END, values=(name, tickets, formatted_sales))
+            self.top_emp_tree.insert('', tk.END, values=(name, tickets, formatted_sales))
+
+    @profiled()
+    def _fill_stat_cards(self, stats):
+        formatted = {
+            'net_total_sales': f"₱{stats['net_total_sales']:,.2f}",
+            'net_total_month_sales': f"₱{stats['net_total_month_sales']:,.2f}",
+            'active_employees': str(stats['active_employees']),
+            'net_total_tickets': str(stats['net_total_tickets']),
+            'pending_refunds': str(stats['pending_refunds']),
+            'popular_pass_text': stats['popular_pass_text'],
+        }
+        for key, value_label in self.stat_value_labels.items():
+            value_label.config(text=formatted[key])
+
+    def _schedule_live_tick(self):
+        # (Re)start the live refresh timer, or stop it when live mode is off
+        if self._live_job is not None:
+            self.root.after_cancel(self._live_job)
+            self._live_job = None
+        if self.live_var.get():
+            self._live_job = self.root.after(int(POLL_SECONDS * 1000), self._live_tick)
+
+    def _live_tick(self):
+        self._live_job = None
+        if not self.live_var.get() or self.views.current != 'dashboard' or not self.top_emp_tree.winfo_exists():
+            return
+        # Low priority so a page the user opens is never kept waiting by a refresh
+        self.db.submit(self.live.poll, callback=self._apply_live_stats, errback=self._live_failed, priority=LOW, key='live')
+
+    def _apply_live_stats(self, result):
+        stats, changed = result
+        if changed and self.views.current == 'dashboard' and self.top_emp_tree.winfo_exists():
+            self._fill_stat_cards(stats)
+        self._schedule_live_tick()
+
+    def _live_failed(self, error):
+        print(f"Live refresh failed: {error}")
+        self._schedule_live_tick()
+
+    def _load_top_employees(self, conn):
+        # Top 5 employees by net sales this month
+        return load_top_employees(conn)
 
     def update_time(self):
-        # Update the time and date labels every second
+        # Update the time and date labels every second; showing the dashboard again restarts the one timer
+        if self._time_job is not None:
+            self.root.after_cancel(self._time_job)
+            self._time_job = None
         try:
             current = datetime.now()
             current_time = current.strftime("%m/%d/%Y %H:%M:%S")
@@ -400,12 +521,14 @@ class AdminDashboard:
                 self.time_label.config(text=current_time)
             if hasattr(self, 'date_label') and self.date_label.winfo_exists():
                 self.date_label.config(text=current.strftime("%A, %B %d, %Y"))
-            self.root.after(1000, self.update_time)
+            self._time_job = self.root.after(1000, self.update_time)
         except Exception as e:
             print(f"Error updating time: {e}")
 
+    @profiled()
     def show_rides(self):
         self.clear_content()
+        self.views.show('rides')
         # Section background frame 
         rides_frame = tk.Frame(self.content_frame, bg='#F0E7D9')
         rides_frame.pack(fill=tk.BOTH, expand=True)
@@ -496,10 +619,12 @@ class AdminDashboard:
         card_canvas.create_window((width//2, height//2), window=frame, anchor='center', width=width-20)
         return card_canvas, frame
 
+    @profiled()
     def show_employee_management(self):
         import customtkinter as ctk
         self.clear_content()
         self.set_active_sidebar('💼  Employees')
+        self.views.show('employees')
 
         # Main Card Container
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=0)
@@ -522,6 +647,8 @@ class AdminDashboard:
         controls_bar.grid_columnconfigure(2, weight=0)
         controls_bar.grid_columnconfigure(3, weight=0)
         controls_bar.grid_columnconfigure(4, weight=0)
+        controls_bar.grid_columnconfigure(5, weight=0)
+        controls_bar.grid_columnconfigure(6, weight=0)
 
         # Search Entry
         self.emp_search_var = ctk.StringVar()
@@ -590,7 +717,21 @@ class AdminDashboard:
             controls_bar, text="+ Add Account", width=140, height=36, fg_color="#4CAF50", text_color="#fff", hover_color="#388E3C",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=lambda: self.show_employee_dialog(mode="add")
         )
-        add_btn.grid(row=0, column=4, padx=(0, 12), pady=10)
+        add_btn.grid(row=0, column=4, padx=(0, 8), pady=10)
+
+        # Bulk Allocations Button (every employee's allocations in one grid)
+        bulk_btn = ctk.CTkButton(
+            controls_bar, text="Bulk Allocations", width=140, height=36, fg_color="#9A4E62", text_color="#fff", hover_color="#7D3C4F",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.show_bulk_allocation_dialog
+        )
+        bulk_btn.grid(row=0, column=5, padx=(0, 8), pady=10)
+
+        # Export Button
+        export_btn = ctk.CTkButton(
+            controls_bar, text="Export", width=90, height=36, fg_color="#E0E0E0", text_color="#22223B", hover_color="#D0D0D0",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=lambda: self.export_dialog('employee_sales')
+        )
+        export_btn.grid(row=0, column=6, padx=(0, 12), pady=10)
 
         # Table Frame 
         table_card = ctk.CTkFrame(card_frame, fg_color="#fff", corner_radius=18)
@@ -640,10 +781,12 @@ class AdminDashboard:
         self.emp_tree.bind("<Button-1>", clear_selection_on_click, add="+")
         self.load_employees()
 
+    @profiled()
     def show_customers(self):
         import customtkinter as ctk
         self.clear_content()
         self.set_active_sidebar('👥  Customers')
+        self.views.show('customers')
 
         # Main Card Container 
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=0)
@@ -664,6 +807,8 @@ class AdminDashboard:
         controls_bar.grid_columnconfigure(0, weight=1)
         controls_bar.grid_columnconfigure(1, weight=0)
         controls_bar.grid_columnconfigure(2, weight=0)
+        controls_bar.grid_columnconfigure(3, weight=0)
+        controls_bar.grid_columnconfigure(4, weight=0)
 
         # Search Entry
         self.search_var = ctk.StringVar()
@@ -710,13 +855,28 @@ class AdminDashboard:
         sort_options.grid(row=0, column=1, padx=(0, 8), pady=10)
         sort_options.configure(command=lambda value: self.sort_customers(value))
         self._customer_sort_options = sort_options_list
+        self._customer_sort = (None, False)
 
         # Delete Button
         delete_btn = ctk.CTkButton(
             controls_bar, text="Delete", width=90, height=36, fg_color="#E0E0E0", text_color="#f44336", hover_color="#FFCDD2",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.delete_customer
         )
-        delete_btn.grid(row=0, column=2, padx=(0, 12), pady=10)
+        delete_btn.grid(row=0, column=2, padx=(0, 8), pady=10)
+
+        # Import Button (bulk bookings from a spreadsheet)
+        import_btn = ctk.CTkButton(
+            controls_bar, text="Import CSV", width=110, height=36, fg_color="#9A4E62", text_color="#fff", hover_color="#7D3C4F",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.import_customers_csv
+        )
+        import_btn.grid(row=0, column=3, padx=(0, 8), pady=10)
+
+        # Export Button
+        export_btn = ctk.CTkButton(
+            controls_bar, text="Export", width=90, height=36, fg_color="#E0E0E0", text_color="#22223B", hover_color="#D0D0D0",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=lambda: self.export_dialog('customers')
+        )
+        export_btn.grid(row=0, column=4, padx=(0, 12), pady=10)
 
         # Table Frame (with scrollbars)
         table_card = ctk.CTkFrame(card_frame, fg_color="#fff", corner_radius=18)
@@ -743,6 +903,7 @@ class AdminDashboard:
             yscrollcommand=yscroll.set, xscrollcommand=xscroll.set
         )
         self.customers_tree.grid(row=0, column=0, sticky='nsew')
+        self.customers_pager = row_store.TablePager(self.customers_tree, self.customers_store, yscroll.set)
         yscroll.configure(command=self.customers_tree.yview)
         xscroll.configure(command=self.customers_tree.xview)
         for col in columns:
@@ -755,10 +916,12 @@ class AdminDashboard:
         self.customers_tree.bind("<Button-1>", clear_selection_on_click, add="+")
         self.load_customers_data()
 
+    @profiled()
     def show_cancellations(self):
         import customtkinter as ctk
         self.clear_content()
         self.set_active_sidebar('❌  Cancellations')
+        self.views.show('cancellations')
 
         # Main Card Container 
         card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=0)
@@ -780,6 +943,7 @@ class AdminDashboard:
         controls_bar.grid_columnconfigure(1, weight=0)
         controls_bar.grid_columnconfigure(2, weight=0)
         controls_bar.grid_columnconfigure(3, weight=0)
+        controls_bar.grid_columnconfigure(4, weight=0)
 
         # Search Entry
         self.cancel_search_var = ctk.StringVar()
@@ -827,6 +991,7 @@ class AdminDashboard:
         sort_options.grid(row=0, column=1, padx=(0, 8), pady=10)
         sort_options.configure(command=lambda value: self.sort_cancellations(value)) # Set the command to sort cancellations
         self._cancel_sort_options = cancel_sort_options_list
+        self._cancel_sort = (None, False)
 
         # Edit Status Button
         edit_btn = ctk.CTkButton(
@@ -840,7 +1005,14 @@ class AdminDashboard:
             controls_bar, text="Delete", width=90, height=36, fg_color="#E0E0E0", text_color="#f44336", hover_color="#FFCDD2",
             font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.delete_cancellation
         )
-        delete_btn.grid(row=0, column=3, padx=(0, 12), pady=10)
+        delete_btn.grid(row=0, column=3, padx=(0, 8), pady=10)
+
+        # Export Button
+        export_btn = ctk.CTkButton(
+            controls_bar, text="Export", width=90, height=36, fg_color="#E0E0E0", text_color="#22223B", hover_color="#D0D0D0",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=lambda: self.export_dialog('cancellations')
+        )
+        export_btn.grid(row=0, column=4, padx=(0, 12), pady=10)
 
         # Table Frame 
         table_card = ctk.CTkFrame(card_frame, fg_color="#fff", corner_radius=18)
@@ -866,6 +1038,7 @@ class AdminDashboard:
             yscrollcommand=yscroll.set, xscrollcommand=xscroll.set
         )
         self.cancellations_tree.grid(row=0, column=0, sticky='nsew')
+        self.cancellations_pager = row_store.TablePager(self.cancellations_tree, self.cancellations_store, yscroll.set)
         yscroll.configure(command=self.cancellations_tree.yview)
         xscroll.configure(command=self.cancellations_tree.xview)
         column_widths = {
@@ -891,8 +1064,124 @@ class AdminDashboard:
         self.cancellations_tree.bind("<Button-1>", clear_selection_on_click, add="+")
         self.load_cancellations_data()
 
+    @profiled()
+    def show_reports(self):
+        import customtkinter as ctk
+        self.clear_content()
+        self.set_active_sidebar('📊  Reports')
+        self.views.show('reports')
+
+        card_frame = ctk.CTkFrame(self.content_frame, fg_color="#FFFFFF", corner_radius=0)
+        card_frame.pack(fill="both", expand=True, padx=30, pady=30)
+
+        # Header Block
+        header_row = ctk.CTkFrame(card_frame, fg_color="#FFFFFF")
+        header_row.pack(fill="x", pady=(10, 0), anchor="w")
+        ctk.CTkLabel(header_row, text="Monthly Reports", font=("Segoe UI", 22, "bold"), text_color="#22223B").grid(row=0, column=0, padx=15, sticky="w")
+        ctk.CTkLabel(header_row, text="Net Sales, Refund Rates and Average Ticket Size", font=("Segoe UI", 15), text_color="#6b7280").grid(row=1, column=0, padx=15, pady=10, sticky="w")
+
+        # Controls Bar
+        controls_bar = ctk.CTkFrame(card_frame, fg_color="#F0E7D9", corner_radius=0, height=50)
+        controls_bar.pack(fill="x", padx=10, pady=(0, 15))
+        controls_bar.grid_columnconfigure(0, weight=0)
+        controls_bar.grid_columnconfigure(1, weight=1)
+        controls_bar.grid_columnconfigure(2, weight=0)
+        self.report_month = ctk.CTkComboBox(
+            controls_bar, values=reports.recent_months(), width=140, font=("Segoe UI", 12), dropdown_font=("Segoe UI", 12),
+            state="readonly", fg_color="#fff", border_color="#cccccc", border_width=2, command=lambda value: self.load_report()
+        )
+        self.report_month.set(reports.recent_months(2)[1])  # last month, the one month-end is about
+        self.report_month.grid(row=0, column=0, padx=(16, 8), pady=10, sticky="w")
+        self.report_summary = ctk.CTkLabel(controls_bar, text="Loading…", font=("Segoe UI", 12), text_color="#22223B", anchor="w")
+        self.report_summary.grid(row=0, column=1, padx=8, pady=10, sticky="w")
+        save_btn = ctk.CTkButton(
+            controls_bar, text="Save CSV", width=100, height=36, fg_color="#E0E0E0", text_color="#22223B", hover_color="#D0D0D0",
+            font=("Segoe UI", 12, "bold"), corner_radius=10, command=self.save_report_csv
+        )
+        save_btn.grid(row=0, column=2, padx=(0, 12), pady=10)
+
+        # Net sales by employee, one column per pass type
+        ctk.CTkLabel(card_frame, text="Net Sales by Employee", font=("Segoe UI", 15, "bold"), text_color="#9A4E62").pack(anchor="w", padx=15)
+        columns = ('Employee',) + tuple(services.PASS_COLUMNS) + ('Total',)
+        self.report_emp_tree = ttk.Treeview(card_frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            self.report_emp_tree.heading(col, text=col)
+            self.report_emp_tree.column(col, width=150 if col == 'Employee' else 110, anchor='w' if col == 'Employee' else 'e')
+        self.report_emp_tree.pack(fill="x", padx=10, pady=(5, 15))
+
+        # Per pass type: average ticket size and refund rate
+        ctk.CTkLabel(card_frame, text="By Pass Type", font=("Segoe UI", 15, "bold"), text_color="#9A4E62").pack(anchor="w", padx=15)
+        columns = ('Pass Type', 'Tickets', 'Sales', 'Avg Ticket Price', 'Avg Sale Value', 'Tickets per Sale', 'Refunded', 'Refund Rate')
+        self.report_pass_tree = ttk.Treeview(card_frame, columns=columns, show='headings', height=7)
+        for col in columns:
+            self.report_pass_tree.heading(col, text=col)
+            self.report_pass_tree.column(col, width=130, anchor='w' if col == 'Pass Type' else 'e')
+        self.report_pass_tree.pack(fill="x", padx=10, pady=(5, 10))
+        self.load_report()
+
+    def load_report(self):
+        # Closed months come from the report cache, the current month is rebuilt on the worker
+        self._report = None
+        self.report_summary.configure(text="Loading…")
+        self.db.submit(reports.monthly_report, self.report_month.get(), callback=self._fill_report,
+                       errback=self._report_failed, priority=HIGH, key='page')
+
+    def _report_failed(self, error):
+        # e.g. a month whose archived sales were compressed to .csv.gz files
+        if not self.report_emp_tree.winfo_exists():
+            return
+        for tree in (self.report_emp_tree, self.report_pass_tree):
+            tree.delete(*tree.get_children())
+        self.report_summary.configure(text="No report for this month")
+        messagebox.showerror("Report Unavailable", str(error))
+
+    @profiled()
+    def _fill_report(self, report):
+        if not self.report_emp_tree.winfo_exists():
+            return
+        self._report = report
+        summary = report['summary']
+        self.report_summary.configure(text=(
+            f"Net ₱{summary['net_sales']:,.2f}   •   Gross ₱{summary['gross_sales']:,.2f}   •   "
+            f"Refunds ₱{summary['refunds']:,.2f}   •   {summary['tickets']:,} tickets   •   "
+            f"Refund rate {summary['refund_rate']:.1%}"))
+
+        for tree in (self.report_emp_tree, self.report_pass_tree):
+            tree.delete(*tree.get_children())
+        by_employee = report['net_sales'].groupby(level=['employee_id', 'employee']).sum()
+        for (_, employee), row in by_employee.iterrows():
+            values = [employee] + [f"₱{row.get(pass_type, 0):,.2f}" for pass_type in services.PASS_COLUMNS]
+            self.report_emp_tree.insert('', tk.END, values=values + [f"₱{row.get('Total', 0):,.2f}"])
+
+        refunds = report['refund_rates'].groupby(level='pass_type')[['sold', 'refunded']].sum()
+        for pass_type, row in report['avg_ticket'].iterrows():
+            refunded = int(refunds['refunded'].get(pass_type, 0))
+            rate = refunded / row['tickets'] if row['tickets'] else 0
+            self.report_pass_tree.insert('', tk.END, values=(
+                pass_type, f"{int(row['tickets']):,}", f"{int(row['sales']):,}", f"₱{row['avg_ticket_price']:,.2f}",
+                f"₱{row['avg_sale_value']:,.2f}", f"{row['tickets_per_sale']:.2f}", f"{refunded:,}", f"{rate:.1%}"))
+
+    @profiled()
+    def save_report_csv(self):
+        if self._report is None:
+            messagebox.showwarning("Report", "The report is still loading.")
+            return
+        month = self._report['summary']['month']
+        path = filedialog.asksaveasfilename(title="Save Daily Net Sales", initialfile=f"net_sales_{month}.csv",
+                                            defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        try:
+            self._report['net_sales'].to_csv(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
+            return
+        messagebox.showinfo("Report", f"Daily net sales for {month} saved to:\n{path}")
+
+    @profiled()
     def show_pricing(self):
         self.clear_content()
+        self.views.show('pricing')
         
         # Add pass type pricing title and subtitle
         pricing_title = tk.Label(self.content_frame, text="Pass Type Pricing", font=('Arial', 16, 'bold'), bg='white', anchor='w')
@@ -909,7 +1198,7 @@ class AdminDashboard:
         main_frame.pack(fill=tk.BOTH, expand=True, padx=50, pady=20)
 
         # Get current prices from database
-        conn = sqlite3.connect('funpass.db')
+        conn = connect('funpass.db')
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM pricing')
         prices = cursor.fetchall()
@@ -1003,95 +1292,56 @@ class AdminDashboard:
         # Show last update time
         self.price_update_label.config(text=f"Last updated: {time.strftime('%m/%d/%Y %H:%M:%S')}")
 
+    @profiled()
     def save_prices(self):
+        # Prices are validated and saved in one transaction by the service layer
         try:
-            # Validate that all prices are valid numbers and store them
-            new_prices = {}
-            for pass_type, price_var in self.price_entries.items():
-                try:
-                    # Remove commas and spaces, then convert to float
-                    price_str = price_var.get().replace(',', '').replace(' ', '')
-                    price = float(price_str)
-                    if price < 0:
-                        raise ValueError(f"Price for {pass_type} cannot be negative")
-                    new_prices[pass_type] = price
-                except ValueError as e:
-                    messagebox.showerror("Invalid Input", str(e))
-                    return False
-
-            # Start database transaction
-            conn = sqlite3.connect('funpass.db')
-            try:
-                cursor = conn.cursor()
-                # Begin transaction
-                cursor.execute('BEGIN')
-
-                for pass_type, price in new_prices.items():
-                    # Update price in database
-                    cursor.execute('UPDATE pricing SET price = ? WHERE pass_type = ?',
-                                 (price, pass_type))
-                    # Update the entry display with the formatted price
-                    self.price_entries[pass_type].set(f"{price:.2f}")
-                
-                # Commit transaction
-                conn.commit()
-
-                # Generate price update event
-                if hasattr(self, 'root') and self.root:
-                    print("Generating price update event")  # Debug print
-                    self.root.event_generate('<<PriceUpdate>>')
-                    print("Price update event generated successfully")  # Debug print
-                
-                messagebox.showinfo("Success", "Prices updated successfully!")
-                return True
-
-            except sqlite3.Error as e:
-                # Rollback on error
-                conn.rollback()
-                messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-                return False
-            finally:
-                conn.close()
-
+            new_prices = self.backend.set_prices({pass_type: price_var.get() for pass_type, price_var in self.price_entries.items()})
+        except ServiceError as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return False
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
+            return False
         except Exception as e:
             messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
             return False
 
+        # Update the entry display with the formatted prices
+        for pass_type, price in new_prices.items():
+            self.price_entries[pass_type].set(f"{price:.2f}")
+        # The entries above already show the new prices
+        self.views.invalidate(PRICING, rerender=False)
+
+        # Generate price update event
+        if hasattr(self, 'root') and self.root:
+            print("Generating price update event")  # Debug print
+            self.root.event_generate('<<PriceUpdate>>')
+            print("Price update event generated successfully")  # Debug print
+
+        messagebox.showinfo("Success", "Prices updated successfully!")
+        return True
+
     def reset_prices(self):
         if messagebox.askyesno("Confirm Reset", 
                              "Are you sure you want to reset to default prices?"):
-            default_prices = {
-                'Express Pass': 2300.00,
-                'Junior Pass': 900.00,
-                'Regular Pass': 1300.00,
-                'Student Pass': 1300.00,
-                'Senior Citizen Pass': 900.00,
-                'PWD Pass': 900.00
-            }
+            # Save to database
+            try:
+                default_prices = self.backend.reset_prices()
+            except (sqlite3.Error, ServiceError) as e:
+                messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
+                return
 
             # Update entry fields
             for pass_type, price in default_prices.items():
                 if pass_type in self.price_entries:
                     self.price_entries[pass_type].set(f"{price:.2f}")
+            self.views.invalidate(PRICING, rerender=False)
 
-            # Save to database
-            try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                
-                for pass_type, price in default_prices.items():
-                    cursor.execute('UPDATE pricing SET price = ? WHERE pass_type = ?',
-                                 (price, pass_type))
-                
-                conn.commit()
-                conn.close()
-                
-                # Notify employee dashboard to refresh prices
-                self.notify_price_update()
-                
-                messagebox.showinfo("Success", "Prices reset to default values!")
-            except sqlite3.Error as e:
-                messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
+            # Notify employee dashboard to refresh prices
+            self.notify_price_update()
+
+            messagebox.showinfo("Success", "Prices reset to default values!")
 
     def notify_price_update(self):
         # Call refresh prices on all employee dashboards
@@ -1100,10 +1350,22 @@ class AdminDashboard:
 
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.root.destroy()
+            self.close()
             from login import show_login
-            show_login()
-
+            show_login(self.root)
+
+    def close(self):
+        # End this session: stop its workers and timers and drop its widgets, keeping the window
+        self.db.shutdown()
+        self.chart_worker.shutdown()
+        self.latency.stop()
+        for job in (self._live_job, self._time_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self._live_job = self._time_job = None
+        close_session(self.root, self.frame, self)
+
+    @profiled()
     def search_employees(self, *args):
         search_text = self.emp_search_var.get().lower()
         
@@ -1111,17 +1373,17 @@ class AdminDashboard:
         for item in self.emp_tree.get_children():
             self.emp_tree.delete(item)
             
-        # To get all employees from database   
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM employees')
-        employees = cursor.fetchall()
-        conn.close()
+        # To get all employees from database, as the employees page shows them
+        conn = connect('funpass.db')
+        try:
+            employees = load_employee_rows(conn)
+        finally:
+            conn.close()
         
         # To filter and display matching employees
         for employee in employees:
             # To search in all fields
-            if any(search_text in str(value).lower() for value in employee):
+            if matches(employee, search_text):
                 self.emp_tree.insert('', tk.END, values=employee)
 
     def sort_employees(self, sort_option):
@@ -1158,18 +1420,12 @@ class AdminDashboard:
             ticket_id = self.customers_tree.item(selected_item[0])['values'][0]
 
             try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                
                 # Delete the customer record
-                cursor.execute('DELETE FROM customers WHERE ticket_id = ?', (ticket_id,))
-                
-                # Commit changes and close connection
-                conn.commit()
-                conn.close()
+                self.backend.delete_sale(ticket_id)
 
                 # Remove from treeview
                 self.customers_tree.delete(selected_item[0])
+                self.views.invalidate(SALES, rerender=False)
                 
                 messagebox.showinfo("Success", "Customer record deleted successfully!")
             
@@ -1182,66 +1438,129 @@ class AdminDashboard:
                 if hasattr(self, 'emp_tree') and self.emp_tree.winfo_exists():
                     self.load_employees()   
 
+    def import_customers_csv(self):
+        if remote():
+            # The importer writes straight to the database file, so it runs where that file is
+            messagebox.showinfo("Import Customers", "This terminal uses a FunPass server. Run the import on the server:\n\n"
+                                "python importer.py FILE.csv --db funpass.db")
+            return
+        path = filedialog.askopenfilename(title="Import Customers", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def run(progress):
+            # Background thread, with its own connection to the database
+            return importer.import_customers(
+                'funpass.db', path, progress=lambda rows, fraction: progress(f"{rows:,} rows read", fraction))
+
+        def done(result):
+            self.views.invalidate(SALES)
+            message = f"Imported {result['imported']:,} of {result['rows']:,} rows in {result['seconds']:.1f} seconds."
+            if result['rejected']:
+                message += f"\n\n{result['rejected']:,} rows were rejected, see:\n{result['reject_path']}"
+                messagebox.showwarning("Import Finished", message)
+            else:
+                messagebox.showinfo("Import Finished", message)
+
+        def failed(error):
+            # Batches committed before the error stay imported
+            self.views.invalidate(SALES)
+            messagebox.showerror("Import Failed", f"An error occurred: {error}")
+
+        ProgressDialog(self.root, "Importing Customers", run, on_done=done, on_error=failed)
+
+    def export_dialog(self, name):
+        titles = {'customers': "Customers", 'cancellations': "Cancellations", 'employee_sales': "Employee Sales Summary"}
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Export {titles[name]}")
+        dialog.geometry("380x320")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+
+        frame = tk.Frame(dialog, bg='white', padx=20, pady=20)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        # Optional purchased date range
+        range_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame, text="Only purchases between", variable=range_var, bg='white',
+                       font=('Arial', 11)).grid(row=0, column=0, columnspan=2, sticky='w', pady=(0, 8))
+        tk.Label(frame, text="From:", font=('Arial', 11), bg='white').grid(row=1, column=0, sticky='w', pady=5)
+        from_entry = DateEntry(frame, width=16, date_pattern='yyyy-mm-dd')
+        from_entry.set_date(datetime.now().replace(day=1))
+        from_entry.grid(row=1, column=1, sticky='w', pady=5)
+        tk.Label(frame, text="To:", font=('Arial', 11), bg='white').grid(row=2, column=0, sticky='w', pady=5)
+        to_entry = DateEntry(frame, width=16, date_pattern='yyyy-mm-dd')
+        to_entry.grid(row=2, column=1, sticky='w', pady=5)
+
+        tk.Label(frame, text="Pass Type:", font=('Arial', 11), bg='white').grid(row=3, column=0, sticky='w', pady=(15, 5))
+        pass_var = tk.StringVar(value="All")
+        ttk.Combobox(frame, textvariable=pass_var, values=["All"] + list(services.PASS_COLUMNS),
+                     state='readonly', width=20).grid(row=3, column=1, sticky='w', pady=(15, 5))
+
+        def start_export():
+            date_from = date_to = None
+            if range_var.get():
+                date_from, date_to = from_entry.get_date().isoformat(), to_entry.get_date().isoformat()
+                if date_from > date_to:
+                    messagebox.showerror("Error", "The start date is after the end date.", parent=dialog)
+                    return
+            pass_types = None if pass_var.get() == "All" else [pass_var.get()]
+            path = filedialog.asksaveasfilename(
+                parent=dialog, title=f"Export {titles[name]}", initialfile=f"{name}_{datetime.now():%Y%m%d}.csv",
+                defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz")])
+            if not path:
+                return
+            dialog.destroy()
+
+            def run(progress):
+                # Background thread, with its own connection to the database (or the server)
+                conn = connect('funpass.db')
+                try:
+                    return exporter.export(conn, name, path, date_from, date_to, pass_types,
+                                           progress=lambda rows, fraction: progress(f"{rows:,} rows written", fraction))
+                finally:
+                    conn.close()
+
+            ProgressDialog(self.root, f"Exporting {titles[name]}", run, on_done=lambda result: messagebox.showinfo(
+                "Export Finished", f"Exported {result['rows']:,} rows in {result['seconds']:.1f} seconds to:\n{result['path']}"))
+
+        buttons_frame = tk.Frame(frame, bg='white')
+        buttons_frame.grid(row=4, column=0, columnspan=2, pady=(25, 0))
+        tk.Button(buttons_frame, text="Export", command=start_export,
+                  bg='#4CAF50', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Cancel", command=dialog.destroy,
+                  bg='#f44336', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+
+    @profiled()
     def search_customers(self, *args):
-        search_text = self.search_var.get().lower()
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT c.ticket_id, c.name, c.email, c.pass_type, c.quantity, c.amount, \
-                    strftime('%m/%d/%Y', c.booked_date) as booked_date, \
-                    strftime('%m/%d/%Y', c.purchased_date) as purchased_date, \
-                    IFNULL(e.name, '') as employee_name \
-                    FROM customers c \
-                    LEFT JOIN employees e ON c.employee_id = e.employee_id''')
-        customers = cursor.fetchall()
-        conn.close()
-        for customer in customers:
-            if any(search_text in str(value).lower() for value in customer):
-                self.customers_tree.insert('', tk.END, values=customer)
+        # Searches and sorts the row store; only the rows scrolled into view are formatted
+        if not self.customers_tree.winfo_exists():
+            return
+        sort, reverse = self._customer_sort
+        self.customers_pager.show(self.customers_store.select(self.search_var.get().lower(), sort, reverse))
 
     def sort_customers(self, sort_option):
-        items = []
-        for item in self.customers_tree.get_children():
-            values = self.customers_tree.item(item)['values']
-            items.append(values)
         for label, idx, reverse in self._customer_sort_options:
             if label == sort_option:
-            # Quantity, Amount
-                if idx in [4, 5]:
-                    items.sort(key=lambda x: float(str(x[idx]).replace('₱','').replace(',','')), reverse=reverse)
-            # Booked Date, Purchased Date
-                elif idx in [6, 7]:
-                    from datetime import datetime
-                    def parse_date(val):
-                        try:
-                            return datetime.strptime(val, '%m/%d/%Y')
-                        except Exception:
-                            return datetime.min
-                    items.sort(key=lambda x: parse_date(x[idx]), reverse=reverse)
-                else:
-                    items.sort(key=lambda x: str(x[idx]).lower(), reverse=reverse)
+                self._customer_sort = (row_store.ADMIN_CUSTOMERS.display_columns[idx], reverse)
                 break
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        for item in items:
-            self.customers_tree.insert('', tk.END, values=item)
+        self.search_customers()
 
     def load_customers_data(self):
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT c.ticket_id, c.name, c.email, c.pass_type, c.quantity, c.amount, \
-                    strftime('%m/%d/%Y', c.booked_date) as booked_date, \
-                    strftime('%m/%d/%Y', c.purchased_date) as purchased_date, \
-                    IFNULL(e.name, '') as employee_name \
-                    FROM customers c \
-                    LEFT JOIN employees e ON c.employee_id = e.employee_id''')
-        customers = cursor.fetchall()
-        conn.close()
-        for customer in customers:
-            self.customers_tree.insert('', tk.END, values=customer)
+        # The first call loads every sale on a worker, later calls only read the changed rows
+        self.db.submit(self.customers_store.read_changes, callback=self._fill_customers_tree, priority=HIGH, key='page')
+
+    @profiled()
+    def _fill_customers_tree(self, patch):
+        self.customers_store.apply(patch)
+        self.search_customers()
+
+    def _refresh_stores(self, *sources):
+        # Writes that patch the table themselves do not re-render it, so the stores catch up here;
+        # otherwise the next search would bring back a row that was just deleted
+        for store, depends in ((self.customers_store, (SALES, ALLOCATIONS)), (self.cancellations_store, (CANCELLATIONS,))):
+            if store.loaded and (not sources or set(depends) & set(sources)):
+                self.db.submit(store.read_changes, callback=store.apply, priority=HIGH)
 
     def edit_cancellation_status(self):
         selected_item = self.cancellations_tree.selection()
@@ -1277,16 +1596,16 @@ class AdminDashboard:
                                 values=["Pending", "Approved", "Rejected"])
         status_combo.pack(pady=5)
 
+        @profiled()
         def save_status():
             new_status = status_var.get()
             if new_status != current_values[9]:
         # Update database
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                cursor.execute('UPDATE cancellations SET status = ? WHERE ticket_id = ?',
-                    (new_status, current_values[0]))
-                conn.commit()
-                conn.close()
+                try:
+                    self.backend.decide_cancellation(current_values[0], new_status)
+                except ServiceError as e:
+                    messagebox.showerror("Error", str(e))
+                    return
 
         # Send email notification if status is changed to Approved or Rejected
                 if new_status in ["Approved", "Rejected"]:
@@ -1296,12 +1615,8 @@ class AdminDashboard:
                     if to_email:
                         self.send_cancellation_status_email(to_email, name, ticket_id, new_status)
 
-        # Refresh all relevant tables and dashboard
-                if hasattr(self, 'cancellations_tree') and self.cancellations_tree.winfo_exists():
-                    self.load_cancellations_data()
-                if hasattr(self, 'emp_tree') and self.emp_tree.winfo_exists():
-                    self.load_employees()
-                self.show_cancellations()
+        # Refresh only the views that read cancellations
+                self.views.invalidate(CANCELLATIONS)
                 messagebox.showinfo("Success", "Status updated successfully!")
             # Always close the window after clicking Save
             edit_window.destroy()
@@ -1327,156 +1642,57 @@ class AdminDashboard:
             ticket_id = self.cancellations_tree.item(selected_item[0])['values'][0]
 
             # Delete from database
-            conn = sqlite3.connect('funpass.db')
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM cancellations WHERE ticket_id = ?', (ticket_id,))
-            conn.commit()
-            conn.close()
+            try:
+                self.backend.delete_cancellation(ticket_id)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
 
             # Remove from treeview
             self.cancellations_tree.delete(selected_item[0])
+            self.views.invalidate(CANCELLATIONS, rerender=False)
             messagebox.showinfo("Success", "Cancellation record deleted successfully!")
+    @profiled()
     def search_cancellations(self, *args):
-        search_text = self.cancel_search_var.get().lower()
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''        SELECT ticket_id, name, email, pass_type, reasons, quantity, amount,
-            strftime('%m/%d/%Y', booked_date) as booked_date, 
-            strftime('%m/%d/%Y', purchased_date) as purchased_date,
-            status
-        FROM cancellations
-        ''')
-        cancellations = cursor.fetchall()
-        conn.close()
-        for cancellation in cancellations:
-            searchable_fields = [
-                str(cancellation[0]),  # ticket_id
-                str(cancellation[1]),  # name
-                str(cancellation[2]),  # email
-                str(cancellation[9])   # status
-            ]
-            if any(search_text in field.lower() for field in searchable_fields):
-                self.cancellations_tree.insert('', tk.END, values=cancellation)
+        # Searches ticket ID, name, email and status in the row store
+        if not self.cancellations_tree.winfo_exists():
+            return
+        sort, reverse = self._cancel_sort
+        self.cancellations_pager.show(self.cancellations_store.select(self.cancel_search_var.get().lower(), sort, reverse))
 
     def sort_cancellations(self, sort_option):
-        items = []
-        for item in self.cancellations_tree.get_children():
-            values = self.cancellations_tree.item(item)['values']
-            items.append(values)
         for label, idx, reverse in self._cancel_sort_options:
             if label == sort_option:
-            # Quantity, Amount
-                if idx in [5, 6]:
-                    items.sort(key=lambda x: float(str(x[idx]).replace('₱','').replace(',','')), reverse=reverse)
-            # Booked Date, Purchased Date
-                elif idx in [7, 8]:
-                    from datetime import datetime
-                    def parse_date(val):
-                        try:
-                            return datetime.strptime(val, '%m/%d/%Y')
-                        except Exception:
-                            return datetime.min
-                    items.sort(key=lambda x: parse_date(x[idx]), reverse=reverse)
-                else:
-                    items.sort(key=lambda x: str(x[idx]).lower(), reverse=reverse)
+                self._cancel_sort = (row_store.ADMIN_CANCELLATIONS.display_columns[idx], reverse)
                 break
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        for item in items:
-            self.cancellations_tree.insert('', tk.END, values=item)
+        self.search_cancellations()
 
     def load_cancellations_data(self):
-        for item in self.cancellations_tree.get_children():
-            self.cancellations_tree.delete(item)
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT ticket_id, name, email, pass_type, reasons, quantity, amount,
-                   strftime('%m/%d/%Y', booked_date) as booked_date,
-                   strftime('%m/%d/%Y', purchased_date) as purchased_date,
-                   status
-            FROM cancellations
-            ORDER BY id DESC
-        ''')
-        cancellations = cursor.fetchall()
-        conn.close()
-        for cancellation in cancellations:
-            self.cancellations_tree.insert('', tk.END, values=cancellation)
+        # Newest requests first (the store's default order)
+        self.db.submit(self.cancellations_store.read_changes, callback=self._fill_cancellations_tree,
+                       priority=HIGH, key='page')
+
+    @profiled()
+    def _fill_cancellations_tree(self, patch):
+        self.cancellations_store.apply(patch)
+        self.search_cancellations()
 
     def load_employees(self):
+        # Employees and their month sales are loaded on a worker
+        self.db.submit(self._query_employees, callback=self._fill_employees_tree, priority=HIGH, key='page')
+
+    def _query_employees(self, conn):
+        return load_employee_rows(conn)
+
+    @profiled()
+    def _fill_employees_tree(self, rows):
+        if not self.emp_tree.winfo_exists():
+            return
         # Clear existing items
         for item in self.emp_tree.get_children():
             self.emp_tree.delete(item)
-            
-        # Load from database
-        conn = sqlite3.connect('funpass.db')
-        cursor = conn.cursor()        # First get all employees and their basic info
-        cursor.execute('SELECT * FROM employees')
-        employees = cursor.fetchall()
-        
-        # Then get the monthly sales for each employee
-        for emp in employees:
-            employee_id = emp[0]
-            # Get monthly sales
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0) 
-                FROM customers 
-                WHERE employee_id = ? 
-                AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')
-            ''', (employee_id,))
-            monthly_sales = cursor.fetchone()[0] or 0
-
-            # Get tickets sold this month
-            cursor.execute('''
-                SELECT COALESCE(SUM(quantity), 0)
-                FROM customers
-                WHERE employee_id = ?
-                AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')
-            ''', (employee_id,))
-            tickets_sold = cursor.fetchone()[0] or 0
-
-            # Get approved refunds for this month (amount)
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0)
-                FROM cancellations
-                WHERE ticket_id IN (
-                    SELECT ticket_id 
-                    FROM customers 
-                    WHERE employee_id = ?
-                )
-                AND status = 'Approved'
-                AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')
-            ''', (employee_id,))
-            refunds = cursor.fetchone()[0] or 0
-
-            # Get approved refunds for this month (tickets)
-            cursor.execute('''
-                SELECT COALESCE(SUM(quantity), 0)
-                FROM cancellations
-                WHERE ticket_id IN (
-                    SELECT ticket_id 
-                    FROM customers 
-                    WHERE employee_id = ?
-                )
-                AND status = 'Approved'
-                AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')
-            ''', (employee_id,))
-            refunded_tickets = cursor.fetchone()[0] or 0
-
-            # Calculate net monthly sales and tickets
-            net_monthly_sales = monthly_sales - refunds
-            net_tickets_sold = tickets_sold - refunded_tickets
-
-            # Create list of values for treeview
-            emp_list = list(emp)
-            emp_list.append(f"₱{net_monthly_sales:,.2f}")  # Add monthly sales 
-
-            # Insert into treeview
+        for emp_list in rows:
             self.emp_tree.insert('', tk.END, values=emp_list)
-            
-        conn.close()
 
     def show_employee_dialog(self, mode="add", event=None):
         if mode == "edit":
@@ -1578,76 +1794,35 @@ class AdminDashboard:
             alloc_entries['senior'].delete(0, tk.END)
             alloc_entries['senior'].insert(0, values[9])
 
+        @profiled()
         def save_employee():
-            # Get values from entries
-            employee_data = {
-                'name': basic_entries['name'].get().strip(),
-                'username': basic_entries['username'].get().strip(),
-                'password': basic_entries['password'].get().strip(),
-                'express': int(alloc_entries['express'].get()),
-                'junior': int(alloc_entries['junior'].get()),
-                'regular': int(alloc_entries['regular'].get()),
-                'student': int(alloc_entries['student'].get()),
-                'pwd': int(alloc_entries['pwd'].get()),
-                'senior': int(alloc_entries['senior'].get())
+            # Allocation fields are keyed by a short name, the service layer by pass type
+            alloc_pass_types = {
+                'express': 'Express Pass',
+                'junior': 'Junior Pass',
+                'regular': 'Regular Pass',
+                'student': 'Student Pass',
+                'pwd': 'PWD Pass',
+                'senior': 'Senior Citizen Pass'
             }
-
-            # Validate inputs
-            if not all([employee_data['name'], employee_data['username'], employee_data['password']]):
-                messagebox.showerror("Error", "Name, username and password are required!")
-                return
-                
-            # Validate ticket allocations
-            for field in ['express', 'junior', 'regular', 'student', 'pwd', 'senior']:
-                if not str(employee_data[field]).isdigit() or int(employee_data[field]) < 0:
-                    messagebox.showerror("Error", f"Invalid ticket quantity for {field} pass!")
-                    return
-
             try:
-                conn = sqlite3.connect('funpass.db')
-                cursor = conn.cursor()
-                
-                if mode == "add":
-                    employee_id = self.generate_unique_employee_id()
-                    cursor.execute('''
-                        INSERT INTO employees (
-                            employee_id, name, username, password, express_pass, junior_pass,
-                            regular_pass, student_pass, pwd_pass, senior_citizen_pass
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        employee_id,
-                        employee_data['name'], employee_data['username'],
-                        employee_data['password'], employee_data['express'],
-                        employee_data['junior'], employee_data['regular'],
-                        employee_data['student'], employee_data['pwd'],
-                        employee_data['senior']
-                    )) 
-                else:  # edit mode
-                    cursor.execute('''
-                        UPDATE employees SET
-                            name=?, username=?, password=?, express_pass=?,
-                            junior_pass=?, regular_pass=?, student_pass=?,
-                            pwd_pass=?, senior_citizen_pass=?
-                        WHERE employee_id=?
-                    ''', (
-                        employee_data['name'], employee_data['username'],
-                        employee_data['password'], employee_data['express'],
-                        employee_data['junior'], employee_data['regular'],
-                        employee_data['student'], employee_data['pwd'],
-                        employee_data['senior'], values[0]
-                    ))
-
-                conn.commit()
-                messagebox.showinfo("Success", 
-                                  "Employee saved successfully!")
-                dialog.destroy()
-                self.load_employees()  
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Username already exists!")
+                self.backend.save_employee(
+                    name=basic_entries['name'].get().strip(),
+                    username=basic_entries['username'].get().strip(),
+                    password=basic_entries['password'].get().strip(),
+                    allocations={pass_type: alloc_entries[field].get().strip() for field, pass_type in alloc_pass_types.items()},
+                    employee_id=values[0] if mode == "edit" else None
+                )
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             except sqlite3.Error as e:
                 messagebox.showerror("Error", f"Database error: {str(e)}")
-            finally:
-                conn.close()
+                return
+            messagebox.showinfo("Success", 
+                              "Employee saved successfully!")
+            dialog.destroy()
+            self.views.invalidate(ALLOCATIONS)
 
         # Create buttons frame
         btn_frame = tk.Frame(main_frame, bg='white')
@@ -1658,6 +1833,151 @@ class AdminDashboard:
         tk.Button(btn_frame, text="Cancel", command=dialog.destroy,
                  bg='#f44336', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
 
+    def show_bulk_allocation_dialog(self):
+        # Every employee's allocations in one grid; typed and CSV-loaded changes are saved together in one transaction
+        pass_types = list(services.PASS_COLUMNS)
+        conn = connect('funpass.db')
+        try:
+            rows = conn.execute(f"SELECT employee_id, name, {', '.join(services.PASS_COLUMNS.values())} FROM employees ORDER BY name").fetchall()
+        finally:
+            conn.close()
+        changes = {}  # employee id -> {pass type: new allocation}
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Bulk Allocations")
+        dialog.geometry("1100x620")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text="Bulk Allocations", font=('Segoe UI', 16, 'bold'), bg='white', fg='#22223B').pack(pady=(16, 0))
+        tk.Label(dialog, text="Double-click a number to change it, or load a CSV file. Nothing is saved until you click Save All.",
+                 font=('Segoe UI', 10), bg='white', fg='#6b7280').pack(pady=(0, 10))
+
+        table_frame = tk.Frame(dialog, bg='white')
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=16)
+        tree = ttk.Treeview(table_frame, columns=['ID', 'Name'] + pass_types, show='headings', style='Treeview')
+        yscroll = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=yscroll.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.heading('ID', text='Employee ID')
+        tree.column('ID', width=110, anchor='w')
+        tree.heading('Name', text='Name')
+        tree.column('Name', width=180, anchor='w')
+        for pass_type in pass_types:
+            tree.heading(pass_type, text=pass_type)
+            tree.column(pass_type, width=110, anchor='center')
+        tree.tag_configure('changed', background='#FFF4D6')
+        for row in rows:
+            tree.insert('', tk.END, iid=row[0], values=row)
+
+        status_var = tk.StringVar(master=dialog, value="No changes yet")
+        tk.Label(dialog, textvariable=status_var, font=('Segoe UI', 10), bg='white', fg='#6b7280').pack(pady=(8, 0))
+
+        def set_allocation(employee_id, pass_type, value):
+            tree.set(employee_id, pass_type, value)
+            tree.item(employee_id, tags=('changed',))
+            changes.setdefault(employee_id, {})[pass_type] = value
+            status_var.set(f"{len(changes)} employee(s) changed")
+
+        def start_edit(event):
+            item = tree.identify_row(event.y)
+            column = tree.identify_column(event.x)
+            index = int(column[1:]) - 1 if column else -1
+            if not item or index < 2:
+                return
+            pass_type = pass_types[index - 2]
+            x, y, width, height = tree.bbox(item, column)
+            entry = tk.Entry(tree, justify='center', font=('Segoe UI', 11))
+            entry.place(x=x, y=y, width=width, height=height)
+            entry.insert(0, tree.set(item, pass_type))
+            entry.select_range(0, tk.END)
+            entry.focus_set()
+            done = []
+
+            def finish(save):
+                if done:  # Return is followed by a FocusOut while the entry is destroyed
+                    return
+                done.append(True)
+                value = entry.get().strip()
+                entry.destroy()
+                if not save or value == tree.set(item, pass_type):
+                    return
+                if not value.isdigit():
+                    messagebox.showerror("Invalid Allocation", f"Invalid ticket quantity for {pass_type}!", parent=dialog)
+                    return
+                set_allocation(item, pass_type, value)
+
+            entry.bind('<Return>', lambda e: finish(True))
+            entry.bind('<FocusOut>', lambda e: finish(True))
+            entry.bind('<Escape>', lambda e: finish(False))
+
+        tree.bind('<Double-1>', start_edit)
+
+        def load_csv():
+            path = filedialog.askopenfilename(parent=dialog, title="Load Allocations", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+            if not path:
+                return
+            try:
+                loaded = allocations.read_allocations(path)
+            except (ServiceError, OSError, UnicodeDecodeError) as e:
+                messagebox.showerror("Load Failed", str(e), parent=dialog)
+                return
+            unknown = [employee_id for employee_id in loaded if not tree.exists(employee_id)]
+            for employee_id, quantities in loaded.items():
+                if employee_id in unknown:
+                    continue
+                for pass_type, value in quantities.items():
+                    if value != tree.set(employee_id, pass_type):
+                        set_allocation(employee_id, pass_type, value)
+            message = f"Loaded {len(loaded) - len(unknown)} employee(s). Review the highlighted rows and click Save All."
+            if unknown:
+                message += f"\n\nSkipped unknown employee IDs: {', '.join(unknown[:10])}{' ...' if len(unknown) > 10 else ''}"
+            messagebox.showinfo("CSV Loaded", message, parent=dialog)
+
+        def save_template():
+            path = filedialog.asksaveasfilename(parent=dialog, title="Save Allocations Template", initialfile="allocations.csv",
+                                                defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+            if not path:
+                return
+            conn = connect('funpass.db')
+            try:
+                allocations.write_template(conn, path)
+            except OSError as e:
+                messagebox.showerror("Save Failed", str(e), parent=dialog)
+            finally:
+                conn.close()
+
+        @profiled()
+        def save_all():
+            if not changes:
+                messagebox.showinfo("Bulk Allocations", "There are no changes to save.", parent=dialog)
+                return
+            try:
+                updated = self.backend.allocate_many(changes)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Database error: {str(e)}", parent=dialog)
+                return
+            dialog.destroy()
+            messagebox.showinfo("Success", f"Allocations of {updated} employee(s) saved.")
+            # One refresh of the employee table for the whole batch
+            self.views.invalidate(ALLOCATIONS)
+
+        btn_frame = tk.Frame(dialog, bg='white')
+        btn_frame.pack(pady=14)
+        tk.Button(btn_frame, text="Load CSV...", command=load_csv,
+                  bg='#9A4E62', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Save Template...", command=save_template,
+                  bg='#E0E0E0', fg='#22223B', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Save All", command=save_all,
+                  bg='#4CAF50', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", command=dialog.destroy,
+                  bg='#f44336', fg='white', font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+
     def delete_employee(self):
         selected_items = self.emp_tree.selection()
         if not selected_items:
@@ -1668,18 +1988,13 @@ class AdminDashboard:
                              "Are you sure you want to delete this employee?"):
             employee_id = self.emp_tree.item(selected_items[0])['values'][0]
 
-            conn = sqlite3.connect('funpass.db')
-            cursor = conn.cursor()
             try:
-                cursor.execute('DELETE FROM employees WHERE employee_id = ?', 
-                             (employee_id,))
-                conn.commit()
+                self.backend.delete_employee(employee_id)
                 self.emp_tree.delete(selected_items[0])
+                self.views.invalidate(ALLOCATIONS, rerender=False)
                 messagebox.showinfo("Success", "Employee deleted successfully!")
-            except sqlite3.Error as e:
-                messagebox.showerror("Error", f"Database error: {str(e)}")
-            finally:
-                conn.close()    
+            except (sqlite3.Error, ServiceError) as e:
+                messagebox.showerror("Error", f"Database error: {str(e)}")    
     
     # wala ito, sa iba na ito, huwag na lang sigurong galawin hehehe
     def create_icon_button(self, parent, icon, command, bg='black', fg='pink', size=40, radius=15, font_size=20):
@@ -1691,15 +2006,7 @@ class AdminDashboard:
         canvas.config(cursor='hand2')
         return canvas
 
-    import smtplib
-    from email.message import EmailMessage
-
     def send_cancellation_status_email(self, to_email, name, ticket_id, status):
-        SMTP_SERVER = 'smtp.gmail.com'
-        SMTP_PORT = 587
-        SMTP_USER = 'funpasstothemagicalpark@gmail.com'
-        SMTP_PASS = 'qauf qaub sexo hefs'
-
         subject = f"FunPass Cancellation Request Update (Ticket ID: {ticket_id})"
         if status == "Approved":
             body = f"""\
@@ -1728,20 +2035,8 @@ FunPass: Amusement Park Ticketing System
         else:
             return  # Only send for Approved or Rejected
 
-        msg = EmailMessage()
-        msg['Subject'] = subject
-        msg['From'] = SMTP_USER
-        msg['To'] = to_email
-        msg.set_content(body)
-
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASS)
-                server.send_message(msg)
-            print(f"Status update email sent to {to_email}")
-        except Exception as e:
-            print(f"Failed to send status update email: {e}")
+        # Queued, the background mailer does the SMTP round trip
+        mailer.send(to_email, subject, body)
 
 if __name__ == "__main__":
     create_database()  # Initialize the database
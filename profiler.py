@@ -0,0 +1,107 @@
+"""
+Opt-in cProfile hooks for UI actions.
+
+Turn profiling on with FUNPASS_PROFILE=1 or `python login.py --profile`.
+Every profiled action (sidebar clicks, page builds, dialog saves) then runs
+under cProfile. Actions that take at least FUNPASS_PROFILE_MIN_MS (default
+50) are dumped to FUNPASS_PROFILE_DIR (default profiles/) as
+<time>-<action>.prof, for snakeviz or pstats, and their top functions by
+cumulative time are appended to summary.txt in the same directory.
+
+An action started inside another one (the page build run by a sidebar
+click) is part of the outer profile. Only the Tk-thread part of an action is
+measured; queries on DBExecutor workers show up in query_trace instead.
+When profiling is off a hook is one flag check.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('FUNPASS_PROFILE_DIR', 'profiles')
+MIN_MS = float(os.environ.get('FUNPASS_PROFILE_MIN_MS', 50))
+TOP_N = int(os.environ.get('FUNPASS_PROFILE_TOP', 20))
+
+_enabled = os.environ.get('FUNPASS_PROFILE') == '1'
+_local = threading.local()  # .active is set while an action is being profiled on this thread
+_lock = threading.Lock()  # serialises writes to summary.txt
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def _file_name(action):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', action).strip('_') or 'action'
+
+
+def _dump(action, profile, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+    path = os.path.join(PROFILE_DIR, f"{stamp}-{_file_name(action)}.prof")
+    profile.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(profile, stream=text).strip_dirs().sort_stats('cumulative').print_stats(TOP_N)
+    with _lock:
+        with open(os.path.join(PROFILE_DIR, 'summary.txt'), 'a', encoding='utf-8') as handle:
+            handle.write(f"==== {stamp} {action}: {elapsed * 1000:.1f} ms ({os.path.basename(path)})\n")
+            handle.write(text.getvalue())
+            handle.write('\n')
+    print(f"[profile] {action}: {elapsed * 1000:.1f} ms -> {path}")
+
+
+@contextmanager
+def _profiled(action):
+    _local.active = True
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profile.enable()
+    except ValueError:  # another profiler (e.g. a debugger's) already runs on this thread
+        _local.active = False
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        _local.active = False
+        elapsed = time.perf_counter() - start
+        if elapsed * 1000 >= MIN_MS:
+            try:
+                _dump(action, profile, elapsed)
+            except OSError as e:
+                print(f"Could not write profile for {action}: {e}")
+
+
+def profile(action):
+    """Context manager profiling the block as action; does nothing while profiling is off."""
+    if not _enabled or getattr(_local, 'active', False):
+        return nullcontext()
+    return _profiled(action)
+
+
+def profiled(action=None):
+    """Decorator form of profile(); action defaults to the function's name."""
+    def decorate(func):
+        name = action or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled or getattr(_local, 'active', False):
+                return func(*args, **kwargs)
+            with _profiled(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,129 @@
+"""
+Read-only queries behind the dashboards, kept free of any GUI code so that
+benchmarks and headless tools can run exactly the statements the app runs.
+"""
+from datetime import datetime, timedelta
+
+
+# Dates are stored as ISO text, so "this month" is a plain range comparison
+# instead of a strftime() call on every row.
+def this_month(column):
+    return f"({column} >= date('now', 'start of month') AND {column} < date('now', 'start of month', '+1 month'))"
+
+# Every admin stat card in one statement: each table is read once and the
+# individual cards are picked out with conditional aggregation. The all-time
+# figures include the totals of archived sales (see archive.py).
+ADMIN_STATS_SQL = f'''
+    WITH sales AS (
+        SELECT COALESCE(SUM(amount), 0) AS total_sales,
+               COALESCE(SUM(CASE WHEN {this_month('purchased_date')} THEN amount END), 0) AS month_sales,
+               COALESCE(SUM(quantity), 0) AS total_tickets
+        FROM customers
+    ),
+    refunds AS (
+        SELECT COALESCE(SUM(CASE WHEN ca.status = 'Approved'
+                                  AND EXISTS (SELECT 1 FROM customers c WHERE c.ticket_id = ca.ticket_id)
+                                 THEN ca.amount END), 0) AS total_refunds,
+               COALESCE(SUM(CASE WHEN ca.status = 'Approved'
+                                  AND {this_month('ca.purchased_date')}
+                                 THEN ca.amount END), 0) AS month_refunds,
+               COALESCE(SUM(CASE WHEN ca.status = 'Approved' THEN ca.quantity END), 0) AS refunded_tickets,
+               COUNT(CASE WHEN ca.status = 'Pending' THEN 1 END) AS pending_refunds
+        FROM cancellations ca
+    ),
+    archived AS (
+        SELECT COALESCE(SUM(amount), 0) AS amount, COALESCE(SUM(tickets), 0) AS tickets,
+               COALESCE(SUM(matched_refunded_amount), 0) AS refunds, COALESCE(SUM(refunded_tickets), 0) AS refunded_tickets
+        FROM archived_totals
+    )
+    SELECT sales.total_sales + archived.amount, refunds.total_refunds + archived.refunds,
+           sales.month_sales, refunds.month_refunds,
+           (SELECT COUNT(*) FROM employees) AS active_employees,
+           sales.total_tickets + archived.tickets, refunds.refunded_tickets + archived.refunded_tickets,
+           refunds.pending_refunds
+    FROM sales, refunds, archived
+'''
+
+# Most popular pass this month (needs its own GROUP BY, so it stays a second statement)
+ADMIN_TOP_PASS_SQL = f'''
+    SELECT pass_type, SUM(quantity) AS total_qty
+    FROM customers
+    WHERE {this_month('purchased_date')}
+    GROUP BY pass_type
+    ORDER BY total_qty DESC
+    LIMIT 1
+'''
+
+
+def load_admin_stats(conn):
+    # Values for the six admin stat cards, in two statements
+    cursor = conn.cursor()
+    cursor.execute(ADMIN_STATS_SQL)
+    (total_sales, total_refunds, month_sales, month_refunds, active_employees,
+     total_tickets, refunded_tickets, pending_refunds) = cursor.fetchone()
+    cursor.execute(ADMIN_TOP_PASS_SQL)
+    popular_pass = cursor.fetchone()
+    if popular_pass:
+        popular_pass_text = f"{popular_pass[0]} ({popular_pass[1]} sold)"
+    else:
+        popular_pass_text = "No passes sold yet"
+    return {
+        'net_total_sales': total_sales - total_refunds,
+        'net_total_month_sales': month_sales - month_refunds,
+        'active_employees': active_employees,
+        'net_total_tickets': total_tickets - refunded_tickets,
+        'pending_refunds': pending_refunds,
+        'popular_pass_text': popular_pass_text,
+    }
+
+
+# Top 5 employees by net sales (sales less approved refunds) this month; params: first day, today
+TOP_EMPLOYEES_SQL = '''
+    SELECT e.name,
+           COALESCE(SUM(c.quantity), 0) - COALESCE((SELECT SUM(ca.quantity) FROM cancellations ca WHERE ca.status = 'Approved' AND ca.ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id = e.employee_id AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')) AND strftime('%Y-%m', ca.purchased_date) = strftime('%Y-%m', 'now')), 0) AS tickets_sold,
+           COALESCE(SUM(c.amount), 0) - COALESCE((SELECT SUM(ca.amount) FROM cancellations ca WHERE ca.status = 'Approved' AND ca.ticket_id IN (SELECT ticket_id FROM customers WHERE employee_id = e.employee_id AND strftime('%Y-%m', purchased_date) = strftime('%Y-%m', 'now')) AND strftime('%Y-%m', ca.purchased_date) = strftime('%Y-%m', 'now')), 0) AS total_sales
+    FROM employees e
+    LEFT JOIN customers c ON e.employee_id = c.employee_id AND c.purchased_date BETWEEN ? AND ?
+    GROUP BY e.employee_id, e.name
+    ORDER BY total_sales DESC
+    LIMIT 5
+'''
+
+
+def load_top_employees(conn):
+    now = datetime.now()
+    first_day = now.replace(day=1).strftime('%Y-%m-%d')
+    last_day = now.strftime('%Y-%m-%d')
+    return conn.execute(TOP_EMPLOYEES_SQL, (first_day, last_day)).fetchall()
+
+
+# Rows of the Employees page: every employees column plus net sales this month (sales less approved
+# refunds of them requested this month); params: first day of this month, first day of next month
+EMPLOYEE_ROWS_SQL = '''
+    SELECT e.*, COALESCE(s.amount, 0) - COALESCE(r.amount, 0)
+    FROM employees e
+    LEFT JOIN (SELECT employee_id, SUM(amount) AS amount
+               FROM customers
+               WHERE purchased_date >= ?1 AND purchased_date < ?2
+               GROUP BY employee_id) s ON s.employee_id = e.employee_id
+    LEFT JOIN (SELECT c.employee_id, SUM(ca.amount) AS amount
+               FROM cancellations ca
+               JOIN customers c ON c.ticket_id = ca.ticket_id
+               WHERE ca.status = 'Approved' AND ca.purchased_date >= ?1 AND ca.purchased_date < ?2
+               GROUP BY c.employee_id) r ON r.employee_id = e.employee_id
+    ORDER BY e.rowid
+'''
+
+
+def load_employee_rows(conn):
+    # One grouped query instead of four per employee; the month sales column comes formatted
+    first_day = datetime.now().replace(day=1)
+    next_month = (first_day + timedelta(days=32)).replace(day=1)
+    rows = conn.execute(EMPLOYEE_ROWS_SQL, (first_day.strftime('%Y-%m-%d'), next_month.strftime('%Y-%m-%d'))).fetchall()
+    # A FunPass server sends the password as NULL, shown blank
+    return [list(row[:3]) + [row[3] or ''] + list(row[4:-1]) + [f"₱{row[-1]:,.2f}"] for row in rows]
+
+
+def matches(row, search_text):
+    # The search boxes: does any column contain search_text (already lower-case)?
+    return any(search_text in str(value).lower() for value in row)
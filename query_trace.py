@@ -0,0 +1,251 @@
+"""
+Query tracing for finding slow screens.
+
+With FUNPASS_TRACE=1, connections opened through connect() time every
+statement: execute plus fetching its rows. The tracer records the SQL, the
+number of bound parameters, rows returned (or changed) and the app function
+that ran it, then:
+
+  - writes statements slower than FUNPASS_SLOW_MS (default 100) to a rotating
+    slow-query log, FUNPASS_SLOW_LOG (default slow_queries.log);
+  - counts queries and time per navigation. The dashboards call navigate()
+    when a sidebar button is clicked, and each screen prints a one-line
+    summary when the user leaves it. A statement run REPEAT_WARNING times or
+    more in one visit is called out there, which is how N+1 loops show up;
+  - prints the totals per screen at exit.
+
+Work submitted to a DBExecutor is counted against the screen it was
+submitted from, even though it runs on a worker thread later. Without
+FUNPASS_TRACE, connect() is plain sqlite3.connect and costs nothing.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get('FUNPASS_TRACE') == '1'
+SLOW_MS = float(os.environ.get('FUNPASS_SLOW_MS', 100))
+SLOW_LOG = os.environ.get('FUNPASS_SLOW_LOG', 'slow_queries.log')
+# The same statement this many times in one visit to a screen is reported as a likely N+1 loop
+REPEAT_WARNING = 10
+
+# Frames in these files are plumbing; the caller reported is the first frame outside them
+_WRAPPER_FILES = {os.path.basename(__file__), 'db_executor.py', 'client.py', 'server.py', 'threading.py'}
+
+
+def _caller(depth=2):
+    # 'function (file.py:line) < its caller (file.py:line)' for the nearest app code that ran the statement
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < depth:
+        code = frame.f_code
+        if os.path.basename(code.co_filename) not in _WRAPPER_FILES and code.co_name != '<lambda>':
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ' < '.join(frames) or '?'
+
+
+def _one_line(sql):
+    return ' '.join(sql.split())
+
+
+class Visit:
+    # Queries run during one visit to a screen
+    def __init__(self, screen):
+        self.screen = screen
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = Counter()  # normalised SQL -> executions
+        self.callers = {}  # normalised SQL -> caller of its first execution
+
+
+class QueryTracer:
+    def __init__(self, slow_ms=SLOW_MS, slow_log=SLOW_LOG):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.screen = None  # screen on display, set by navigate() on the Tk thread
+        self.totals = {}  # screen -> {'visits', 'queries', 'seconds'}
+        self._visit = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._logger = None
+
+    def navigate(self, screen):
+        # Called by the dashboards when the user opens a screen
+        with self._lock:
+            previous, self._visit = self._visit, Visit(screen)
+            self.screen = screen
+            totals = self.totals.setdefault(screen, {'visits': 0, 'queries': 0, 'seconds': 0.0})
+            totals['visits'] += 1
+        if previous is not None and previous.queries:
+            self._print_visit(previous)
+
+    @contextmanager
+    def screen_context(self, screen):
+        # Attribute statements run on this thread to screen (used by DBExecutor workers)
+        previous = getattr(self._local, 'screen', None)
+        self._local.screen = screen
+        try:
+            yield
+        finally:
+            self._local.screen = previous
+
+    def record(self, sql, binds, rows, seconds, caller):
+        screen = getattr(self._local, 'screen', None) or self.screen or '(no screen)'
+        text = _one_line(sql)
+        with self._lock:
+            totals = self.totals.setdefault(screen, {'visits': 0, 'queries': 0, 'seconds': 0.0})
+            totals['queries'] += 1
+            totals['seconds'] += seconds
+            visit = self._visit
+            if visit is not None and visit.screen == screen:
+                visit.queries += 1
+                visit.seconds += seconds
+                visit.statements[text] += 1
+                visit.callers.setdefault(text, caller)
+        if seconds * 1000 >= self.slow_ms:
+            self._log_slow(text, binds, rows, seconds, caller, screen)
+
+    def _log_slow(self, text, binds, rows, seconds, caller, screen):
+        if self._logger is None:
+            logger = logging.getLogger('funpass.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.slow_log, maxBytes=1_000_000, backupCount=3, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            self._logger = logger
+        self._logger.info(f"{seconds * 1000:.1f} ms  rows={rows}  binds={binds}  screen={screen}  "
+                          f"caller={caller}  sql={text}")
+
+    def _print_visit(self, visit):
+        print(f"[trace] {visit.screen}: {visit.queries} queries, {visit.seconds * 1000:.1f} ms")
+        for text, count in visit.statements.most_common():
+            if count < REPEAT_WARNING:
+                break
+            print(f"[trace]   {count}x from {visit.callers[text]} (N+1?): {text[:120]}")
+
+    def print_totals(self):
+        with self._lock:
+            if self._visit is not None and self._visit.queries:
+                self._print_visit(self._visit)
+                self._visit = None
+            rows = sorted(self.totals.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        if not rows:
+            return
+        print("[trace] totals per screen")
+        for screen, totals in rows:
+            visits = max(totals['visits'], 1)
+            print(f"[trace]   {screen:<16} {totals['visits']:>4} visits {totals['queries']:>7} queries "
+                  f"{totals['seconds'] * 1000:>10.1f} ms  ({totals['queries'] / visits:.1f} queries, "
+                  f"{totals['seconds'] * 1000 / visits:.1f} ms per visit)")
+
+
+tracer = QueryTracer()
+if ENABLED:
+    atexit.register(tracer.print_totals)
+
+
+class TracingCursor(sqlite3.Cursor):
+    # Times execute and the fetches that follow it; the statement is recorded once its rows are read
+    _pending = None
+
+    def _start(self, sql, binds, run):
+        self._finish()
+        caller = _caller()
+        start = time.perf_counter()
+        try:
+            run()
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.description is None:  # no rows to fetch (DML, DDL, PRAGMA setters, or an error)
+                tracer.record(sql, binds, max(self.rowcount, 0), elapsed, caller)
+            else:
+                self._pending = [sql, binds, 0, elapsed, caller]
+        return self
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            tracer.record(*pending)
+
+    def _fetched(self, start, rows):
+        if self._pending is not None:
+            self._pending[2] += rows
+            self._pending[3] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, len(parameters), lambda: super(TracingCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        binds = sum(len(parameters) for parameters in seq_of_parameters)
+        return self._start(sql, binds, lambda: super(TracingCursor, self).executemany(sql, seq_of_parameters))
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0)
+            self._finish()
+            raise
+        self._fetched(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # A cursor dropped half-read (e.g. fetchone()[0]) is recorded here
+        self._finish()
+
+
+class TracingConnection(sqlite3.Connection):
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path='funpass.db', **kwargs):
+    """sqlite3.connect, returning a traced connection when FUNPASS_TRACE=1."""
+    if ENABLED:
+        kwargs.setdefault('factory', TracingConnection)
+    return sqlite3.connect(db_path, **kwargs)
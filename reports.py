@@ -0,0 +1,261 @@
+"""
+Monthly sales reports built with pandas.
+
+Sales and approved refunds for a month are read in chunks of CHUNK_SIZE rows,
+and each chunk is reduced to (employee id, pass type, day) totals straight
+away, so memory depends on the number of employees and days, not on the
+number of tickets. The report tables are then pivots of those totals:
+
+    net_sales     net amount per employee and day, one column per pass type
+    refund_rates  tickets sold and refunded per employee and pass type
+    (employees are told apart by employee_id, the name is carried along for display)
+    avg_ticket    average price per ticket and per sale, by pass type
+    summary       month totals
+
+Refunds count against the month the ticket was bought in, like the
+dashboard does. Reports for closed months are pickled to REPORT_CACHE_DIR,
+one file per month and database file, and reused; a cached report is only re-checked (with one aggregate query)
+when change_log shows sales or refunds were written since it was built.
+
+Usage: python reports.py 2025-01 [--db funpass.db] [--refresh] [--csv net_sales.csv]
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+
+import archive
+import change_log
+
+REPORT_CACHE_DIR = os.environ.get('FUNPASS_REPORT_CACHE', 'report_cache')
+CHUNK_SIZE = 50000
+KEYS = ['employee_id', 'employee', 'pass_type', 'day']  # the name follows the id, so this groups by id
+
+SALES_SQL = '''
+    SELECT IFNULL(c.employee_id, '') AS employee_id, IFNULL(e.name, 'Unassigned') AS employee,
+           c.pass_type, c.purchased_date AS day,
+           c.quantity, c.amount
+    FROM {customers} c
+    LEFT JOIN employees e ON c.employee_id = e.employee_id
+    WHERE c.purchased_date >= ? AND c.purchased_date < ?
+'''
+
+REFUNDS_SQL = '''
+    SELECT IFNULL(c.employee_id, '') AS employee_id, IFNULL(e.name, 'Unassigned') AS employee,
+           ca.pass_type, ca.purchased_date AS day,
+           ca.quantity, ca.amount
+    FROM {cancellations} ca
+    LEFT JOIN {customers} c ON c.ticket_id = ca.ticket_id
+    LEFT JOIN employees e ON c.employee_id = e.employee_id
+    WHERE ca.status = 'Approved' AND ca.purchased_date >= ? AND ca.purchased_date < ?
+'''
+
+# Cheap check that a cached month still matches the tables
+FINGERPRINT_SQL = '''
+    SELECT (SELECT COUNT(*) FROM {customers} WHERE purchased_date >= ?1 AND purchased_date < ?2),
+           (SELECT TOTAL(amount) FROM {customers} WHERE purchased_date >= ?1 AND purchased_date < ?2),
+           (SELECT COUNT(*) FROM {cancellations} WHERE status = 'Approved' AND purchased_date >= ?1 AND purchased_date < ?2),
+           (SELECT TOTAL(amount) FROM {cancellations} WHERE status = 'Approved' AND purchased_date >= ?1 AND purchased_date < ?2)
+'''
+
+
+def month_range(month):
+    # 'YYYY-MM' -> ('YYYY-MM-01', first day of the next month)
+    year, number = map(int, month.split('-'))
+    start = date(year, number, 1)
+    end = date(year + number // 12, number % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def recent_months(count=12):
+    # 'YYYY-MM' strings, the current month first
+    today = date.today()
+    months = []
+    year, number = today.year, today.month
+    for _ in range(count):
+        months.append(f"{year:04d}-{number:02d}")
+        year, number = (year - 1, 12) if number == 1 else (year, number - 1)
+    return months
+
+
+def is_closed(month):
+    return month < date.today().strftime('%Y-%m')
+
+
+def load_totals(conn, sql, params, chunk_size=CHUNK_SIZE):
+    # Read sql in chunks and reduce each one to totals per employee, pass type and day
+    parts = []
+    # A plain cursor rather than pd.read_sql, so a client.RemoteConnection works too
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        chunk['day'] = chunk['day'].str[:10]
+        chunk['sales'] = 1
+        parts.append(chunk.groupby(KEYS, as_index=False)[['quantity', 'amount', 'sales']].sum())
+    if not parts:
+        return pd.DataFrame({'employee_id': pd.Series(dtype=object), 'employee': pd.Series(dtype=object), 'pass_type': pd.Series(dtype=object),
+                             'day': pd.Series(dtype=object), 'quantity': pd.Series(dtype='int64'),
+                             'amount': pd.Series(dtype='float64'), 'sales': pd.Series(dtype='int64')})
+    return pd.concat(parts, ignore_index=True).groupby(KEYS, as_index=False).sum()
+
+
+def build_report(month, sales, refunds):
+    # sales and refunds: totals from load_totals
+    net = pd.concat([sales.assign(kind='sale'),
+                     refunds.assign(quantity=-refunds['quantity'], amount=-refunds['amount'], kind='refund')],
+                    ignore_index=True)
+    net_sales = net.pivot_table(index=['employee_id', 'employee', 'day'], columns='pass_type', values='amount',
+                                aggfunc='sum', fill_value=0)
+    if not net_sales.empty:
+        net_sales['Total'] = net_sales.sum(axis=1)
+
+    sold = sales.groupby(['employee_id', 'employee', 'pass_type'])['quantity'].sum()
+    refunded = refunds.groupby(['employee_id', 'employee', 'pass_type'])['quantity'].sum()
+    refund_rates = pd.DataFrame({'sold': sold, 'refunded': refunded}).fillna(0).astype('int64')
+    refund_rates['refund_rate'] = (refund_rates['refunded'] / refund_rates['sold'].where(refund_rates['sold'] > 0)).fillna(0)
+
+    by_pass = sales.groupby('pass_type')[['quantity', 'amount', 'sales']].sum()
+    avg_ticket = pd.DataFrame({
+        'tickets': by_pass['quantity'],
+        'sales': by_pass['sales'],
+        'avg_ticket_price': by_pass['amount'] / by_pass['quantity'].where(by_pass['quantity'] > 0),
+        'avg_sale_value': by_pass['amount'] / by_pass['sales'].where(by_pass['sales'] > 0),
+        'tickets_per_sale': by_pass['quantity'] / by_pass['sales'].where(by_pass['sales'] > 0),
+    }).fillna(0)
+
+    gross, refund_total = sales['amount'].sum(), refunds['amount'].sum()
+    tickets, refunded_tickets = sales['quantity'].sum(), refunds['quantity'].sum()
+    summary = {
+        'month': month,
+        'gross_sales': float(gross),
+        'refunds': float(refund_total),
+        'net_sales': float(gross - refund_total),
+        'tickets': int(tickets),
+        'refunded_tickets': int(refunded_tickets),
+        'sales': int(sales['sales'].sum()),
+        'refund_rate': float(refunded_tickets / tickets) if tickets else 0.0,
+        'avg_ticket_price': float(gross / tickets) if tickets else 0.0,
+    }
+    return {'summary': summary, 'net_sales': net_sales, 'refund_rates': refund_rates, 'avg_ticket': avg_ticket}
+
+
+def _database_id(conn):
+    # Resolved path, device and inode of the main database file; None for in-memory databases, never cached
+    if not isinstance(conn, sqlite3.Connection):
+        return conn.url  # a FunPass server's database (client.RemoteConnection), whichever file it is
+    path = next((row[2] for row in conn.execute('PRAGMA database_list') if row[1] == 'main'), '')
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    info = os.stat(path)
+    return f"{path}:{info.st_dev}:{info.st_ino}"
+
+
+def _cache_path(database_id, month):
+    digest = hashlib.sha1(database_id.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(REPORT_CACHE_DIR, f"{month}-{digest}.pkl")
+
+
+def _tables(conn, month):
+    # Archived months are read through the hot + archive views; compressed months raise ValueError
+    start, end = month_range(month)
+    last_day = (date.fromisoformat(end) - timedelta(days=1)).isoformat()
+    customers, cancellations = archive.history_tables(conn, start, last_day)
+    return {'customers': customers, 'cancellations': cancellations}
+
+
+def _fingerprint(conn, month):
+    return tuple(conn.execute(FINGERPRINT_SQL.format(**_tables(conn, month)), month_range(month)).fetchone())
+
+
+def _read_cache(conn, database_id, month):
+    try:
+        with open(_cache_path(database_id, month), 'rb') as handle:
+            entry = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if entry.get('database') != database_id:
+        return None
+    if entry['seq'] is not None and change_log.is_installed(conn):
+        changed = change_log.changes_since(conn, entry['seq'], ('customers', 'cancellations'), limit=1)
+        if changed == []:
+            return entry['report']
+    # Something was written since (or it can't be told), compare the month's totals
+    seq = _latest_seq(conn)
+    if _fingerprint(conn, month) == entry['fingerprint']:
+        _write_cache(database_id, month, entry['report'], entry['fingerprint'], seq)
+        return entry['report']
+    return None
+
+
+def _latest_seq(conn):
+    # None if change_log isn't installed, such entries are always checked with the fingerprint
+    return change_log.latest_seq(conn) if change_log.is_installed(conn) else None
+
+
+def _write_cache(database_id, month, report, fingerprint, seq):
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = _cache_path(database_id, month)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump({'database': database_id, 'seq': seq, 'fingerprint': fingerprint, 'report': report},
+                    handle, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def monthly_report(conn, month, refresh=False):
+    """Report tables for month ('YYYY-MM'), served from the cache for closed months."""
+    database_id = _database_id(conn)
+    closed = is_closed(month) and database_id is not None
+    if closed and not refresh:
+        report = _read_cache(conn, database_id, month)
+        if report is not None:
+            return report
+    # Taken before reading, so a write that lands meanwhile makes the entry look stale, never fresh
+    seq = _latest_seq(conn)
+    fingerprint = _fingerprint(conn, month) if closed else None
+    start, end = month_range(month)
+    tables = _tables(conn, month)
+    report = build_report(month, load_totals(conn, SALES_SQL.format(**tables), (start, end)),
+                          load_totals(conn, REFUNDS_SQL.format(**tables), (start, end)))
+    if closed:
+        _write_cache(database_id, month, report, fingerprint, seq)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly FunPass sales report")
+    parser.add_argument('month', nargs='?', default=recent_months(2)[1], help="YYYY-MM, defaults to last month")
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--refresh', action='store_true', help="rebuild even if a cached report exists")
+    parser.add_argument('--csv', help="also write the daily net sales pivot to this file")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        report = monthly_report(conn, args.month, args.refresh)
+    except ValueError as e:  # a compressed month
+        parser.error(str(e))
+    finally:
+        conn.close()
+    summary = report['summary']
+    print(f"Month {summary['month']}: net ₱{summary['net_sales']:,.2f} "
+          f"(gross ₱{summary['gross_sales']:,.2f}, refunds ₱{summary['refunds']:,.2f}), "
+          f"{summary['tickets']} tickets, refund rate {summary['refund_rate']:.1%}")
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print("\nRefund rates\n", report['refund_rates'])
+        print("\nAverage ticket size\n", report['avg_ticket'].round(2))
+    if args.csv:
+        report['net_sales'].to_csv(args.csv)
+        print(f"\nDaily net sales written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Typed, column-oriented copies of the rows behind the customers and
+cancellations tables of both dashboards.
+
+A RowStore keeps one column per field with the raw database values:
+quantities in array('q'), amounts in array('d'), dates as ISO text. Sorting
+compares numbers and ISO dates directly instead of parsing amounts and
+mm/dd/yyyy strings back out of a Treeview, and search and sort never touch
+the database. A store is loaded once per dashboard session; after that
+read_changes() only re-reads the rows the change log reports as inserted,
+updated or deleted (or everything, if the log was compacted or is missing).
+
+Reading happens on a DBExecutor worker and returns a patch; apply(patch)
+changes the store on the Tk thread, so the Tk thread never sees a
+half-updated store.
+
+TablePager shows a selection in a Treeview PAGE_SIZE rows at a time and
+formats the next page only when the user scrolls near the end, so rows
+nobody scrolls to are never formatted.
+"""
+import array
+from itertools import compress
+
+import change_log
+
+PAGE_SIZE = 200
+SCROLL_THRESHOLD = 0.9  # load the next page once the view reaches this far down
+MAX_PARAMS = 500  # keys per IN (...) when re-reading changed rows
+
+# Column kinds: how a column is stored and sorted
+TEXT, INT, REAL, DATE = 'text', 'int', 'real', 'date'
+_ARRAY_CODES = {INT: 'q', REAL: 'd'}
+
+
+def _as_is(value):
+    return value
+
+
+def slash_date(value):
+    # 'YYYY-MM-DD' -> 'MM/DD/YYYY', as strftime('%m/%d/%Y') used to return in SQL
+    return f"{value[5:7]}/{value[8:10]}/{value[:4]}" if value and len(value) == 10 else ''
+
+
+def dash_date(value):
+    # 'YYYY-MM-DD' -> 'MM-DD-YYYY'
+    return f"{value[5:7]}-{value[8:10]}-{value[:4]}" if value and len(value) == 10 else (value or '')
+
+
+class Source:
+    """The rows of one dashboard table.
+
+    columns: (name, kind) pairs, in the order sql selects them
+    sql: SELECT ... FROM ... without WHERE
+    key: column that identifies a row (the Treeview item id)
+    links: change-log table -> (SQL expression, column) that a change's
+        row_key matches, so only the affected rows are read again
+    scope: WHERE condition limiting the rows, with ? for the store's params
+    display: (column, formatter) pairs, the Treeview values in order
+    search: columns the search box looks in (default: every displayed one)
+    default_sort: (column, reverse) used when no sort option is chosen
+    """
+    def __init__(self, columns, sql, key, links, display, scope=None, search=None, default_sort=None):
+        self.columns = columns
+        self.names = [name for name, _ in columns]
+        self.sql = sql
+        self.key = key
+        self.links = links
+        self.scope = scope
+        self.display = [(self.names.index(name), formatter or _as_is) for name, formatter in display]
+        self.display_columns = [name for name, _ in display]
+        # Search looks at the text as displayed, so '10/22/2024' finds a booking date
+        self.search = [self.display[self.display_columns.index(name)] for name in (search or self.display_columns)]
+        self.default_sort = default_sort
+
+    def query(self, condition=None):
+        conditions = [c for c in (self.scope, condition) if c]
+        return self.sql + (' WHERE ' + ' AND '.join(conditions) if conditions else '')
+
+
+# customers.employee_id was declared INTEGER and employees.employee_id TEXT; comparing them
+# directly cannot use the employees primary key, so the join casts and looks each name up
+ADMIN_CUSTOMERS = Source(
+    columns=[('ticket_id', TEXT), ('name', TEXT), ('email', TEXT), ('pass_type', TEXT), ('quantity', INT),
+             ('amount', REAL), ('booked_date', DATE), ('purchased_date', DATE), ('employee_name', TEXT),
+             ('employee_id', TEXT)],
+    sql='''SELECT c.ticket_id, c.name, c.email, c.pass_type, c.quantity, c.amount, c.booked_date, c.purchased_date,
+                  IFNULL(e.name, ''), c.employee_id
+           FROM customers c
+           LEFT JOIN employees e ON e.employee_id = CAST(c.employee_id AS TEXT)''',
+    key='ticket_id',
+    links={'customers': ('c.ticket_id', 'ticket_id'), 'employees': ('c.employee_id', 'employee_id')},
+    display=[('ticket_id', None), ('name', None), ('email', None), ('pass_type', None), ('quantity', None),
+             ('amount', None), ('booked_date', slash_date), ('purchased_date', slash_date), ('employee_name', None)],
+)
+
+# param: employee_id
+EMPLOYEE_CUSTOMERS = Source(
+    columns=[('ticket_id', TEXT), ('name', TEXT), ('email', TEXT), ('quantity', INT), ('amount', REAL),
+             ('booked_date', DATE), ('purchased_date', DATE), ('pass_type', TEXT)],
+    sql='''SELECT ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type
+           FROM customers''',
+    key='ticket_id',
+    links={'customers': ('ticket_id', 'ticket_id')},
+    scope='employee_id = ?',
+    display=[('ticket_id', None), ('name', None), ('email', None), ('quantity', None), ('amount', None),
+             ('booked_date', dash_date), ('purchased_date', dash_date), ('pass_type', None)],
+)
+
+_CANCELLATION_COLUMNS = [('ticket_id', TEXT), ('name', TEXT), ('email', TEXT), ('pass_type', TEXT), ('reasons', TEXT),
+                         ('quantity', INT), ('amount', REAL), ('booked_date', DATE), ('purchased_date', DATE),
+                         ('status', TEXT), ('id', INT)]
+_CANCELLATION_SELECT = '''SELECT ca.ticket_id, ca.name, ca.email, ca.pass_type, ca.reasons, ca.quantity, ca.amount,
+                                 ca.booked_date, ca.purchased_date, ca.status, ca.id'''
+_CANCELLATION_DISPLAY = [('ticket_id', None), ('name', None), ('email', None), ('pass_type', None), ('reasons', None),
+                         ('quantity', None), ('amount', None), ('booked_date', slash_date),
+                         ('purchased_date', slash_date), ('status', None)]
+
+ADMIN_CANCELLATIONS = Source(
+    columns=_CANCELLATION_COLUMNS,
+    sql=_CANCELLATION_SELECT + ' FROM cancellations ca',
+    key='id',
+    links={'cancellations': ('ca.id', 'id')},
+    display=_CANCELLATION_DISPLAY,
+    search=['ticket_id', 'name', 'email', 'status'],
+    default_sort=('id', True),
+)
+
+# Refund requests for the employee's own sales; param: employee_id
+EMPLOYEE_CANCELLATIONS = Source(
+    columns=_CANCELLATION_COLUMNS,
+    sql=_CANCELLATION_SELECT + ' FROM cancellations ca INNER JOIN customers cu ON ca.ticket_id = cu.ticket_id',
+    key='id',
+    links={'cancellations': ('ca.id', 'id'), 'customers': ('ca.ticket_id', 'ticket_id')},
+    scope='cu.employee_id = ?',
+    display=_CANCELLATION_DISPLAY,
+    search=['ticket_id', 'name', 'email', 'status'],
+    default_sort=('id', True),
+)
+
+
+class RowStore:
+    def __init__(self, source, params=()):
+        self.source = source
+        self.params = tuple(params)
+        self.seq = None  # change-log position the store is current to, None until loaded
+        # Deleted rows stay in the columns, marked dead, until the next full reload; positions
+        # handed out by select() stay valid until then, and generation counts the reloads
+        self.generation = 0
+        self._key = source.names.index(source.key)
+        self._columns, self._alive, self._positions = self._build([])
+        self._haystack = []
+
+    @property
+    def loaded(self):
+        return self.seq is not None
+
+    def __len__(self):
+        return len(self._positions)
+
+    # --- Reading (on a worker thread; only reads self.seq) ---
+
+    def read_changes(self, conn):
+        """What changed since the store was loaded, as a patch for apply(); None if nothing did."""
+        if self.seq is None or not change_log.is_installed(conn):
+            return self._read_all(conn)
+        changes = change_log.changes_since(conn, self.seq, list(self.source.links))
+        if changes is None or any(op == 'RELOAD' for _, _, _, op, _ in changes):
+            return self._read_all(conn)
+        if not changes:
+            return None
+        changed = {}  # table -> row keys
+        for _, table, row_key, _, _ in changes:
+            changed.setdefault(table, set()).add(row_key)
+        reads = []
+        for table, keys in changed.items():
+            expression, column = self.source.links[table]
+            keys = sorted(keys)
+            rows = []
+            for start in range(0, len(keys), MAX_PARAMS):
+                chunk = keys[start:start + MAX_PARAMS]
+                sql = self.source.query(f"{expression} IN ({', '.join('?' for _ in chunk)})")
+                rows += conn.execute(sql, self.params + tuple(chunk)).fetchall()
+            reads.append((column, set(keys), rows))
+        return ('changes', changes[-1][0], reads)
+
+    def _read_all(self, conn):
+        seq = change_log.latest_seq(conn) if change_log.is_installed(conn) else 0
+        rows = conn.execute(self.source.query(), self.params).fetchall()
+        return ('reload', seq, self._build(rows))
+
+    # --- Changing (on the Tk thread) ---
+
+    def apply(self, patch):
+        # Returns True if the rows changed
+        if patch is None:
+            return False
+        kind, seq, data = patch
+        if kind == 'reload':
+            self._columns, self._alive, self._positions = data
+            self._haystack = [None] * len(self._alive)
+            self.generation += 1
+        else:
+            for column, keys, rows in data:
+                index = self.source.names.index(column)
+                # Rows linked to the changed keys that did not come back left the table or the scope
+                stale = {self._key_value(position) for position in self._find(index, keys)}
+                for row in rows:
+                    self._upsert(row)
+                    stale.discard(str(row[self._key]))
+                for key in stale:
+                    self._delete(key)
+        self.seq = seq
+        return True
+
+    def load(self, conn):
+        # Read and apply in one go, for callers that own the connection on the Tk thread (and the benchmarks)
+        self.seq = None
+        return self.apply(self.read_changes(conn))
+
+    def _build(self, rows):
+        # Column by column: one array() call per column instead of an append per value
+        values = list(zip(*rows)) if rows else [()] * len(self.source.columns)
+        columns = []
+        for (_, kind), column in zip(self.source.columns, values):
+            if kind in _ARRAY_CODES:
+                columns.append(array.array(_ARRAY_CODES[kind], [0 if value is None else value for value in column]))
+            else:
+                columns.append(list(column))
+        positions = {str(key): position for position, key in enumerate(values[self._key])}
+        return columns, bytearray(b'\x01') * len(rows), positions
+
+    def _upsert(self, row):
+        key = str(row[self._key])
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._alive)
+            self._positions[key] = position
+            self._alive.append(1)
+            self._haystack.append(None)
+            for column, value in zip(self._columns, row):
+                column.append(value if value is not None or isinstance(column, list) else 0)
+        else:
+            for column, value in zip(self._columns, row):
+                column[position] = value if value is not None or isinstance(column, list) else 0
+            self._haystack[position] = None
+
+    def _delete(self, key):
+        position = self._positions.pop(key, None)
+        if position is not None:
+            self._alive[position] = 0
+            self._haystack[position] = None
+
+    def _find(self, index, keys):
+        # Live positions whose column index holds one of keys (text)
+        if index == self._key:
+            return [self._positions[key] for key in keys if key in self._positions]
+        column = self._columns[index]
+        return [position for position in self._live_positions() if str(column[position]) in keys]
+
+    def _live_positions(self):
+        return list(compress(range(len(self._alive)), self._alive))
+
+    def _key_value(self, position):
+        return str(self._columns[self._key][position])
+
+    # --- Queries (on the Tk thread) ---
+
+    def row(self, position):
+        return tuple(column[position] for column in self._columns)
+
+    def get(self, key):
+        # Raw values of the row with this key, None if it is not in the store
+        position = self._positions.get(str(key))
+        return None if position is None else self.row(position)
+
+    def key(self, position):
+        return self._key_value(position)
+
+    def display(self, position):
+        # The Treeview values of one row; the only place values are formatted
+        return tuple(formatter(self._columns[index][position]) for index, formatter in self.source.display)
+
+    def select(self, search='', sort=None, reverse=False):
+        """Positions of the rows containing search (lower-case) in a searched column, sorted by column sort."""
+        positions = self._live_positions()
+        if search:
+            haystack = self._haystack
+            for position in positions:
+                if haystack[position] is None:
+                    haystack[position] = '\x1f'.join(str(formatter(self._columns[index][position]))
+                                                     for index, formatter in self.source.search).lower()
+            positions = [position for position in positions if search in haystack[position]]
+        if sort is None and self.source.default_sort is not None:
+            sort, reverse = self.source.default_sort
+        if sort is not None:
+            index = self.source.names.index(sort)
+            column = self._columns[index]
+            if self.source.columns[index][1] == TEXT:
+                positions.sort(key=lambda position: (column[position] or '').lower(), reverse=reverse)
+            elif self.source.columns[index][1] == DATE:
+                positions.sort(key=lambda position: column[position] or '', reverse=reverse)
+            else:
+                positions.sort(key=column.__getitem__, reverse=reverse)
+        return positions
+
+
+class TablePager:
+    """Fills a Treeview from a RowStore selection, PAGE_SIZE formatted rows at a time.
+
+    The pager takes over the tree's yscrollcommand and passes it on to
+    scroll_set (the scrollbar's set) after deciding whether to add a page.
+    """
+    def __init__(self, tree, store, scroll_set=None, page_size=PAGE_SIZE):
+        self.tree = tree
+        self.store = store
+        self.scroll_set = scroll_set
+        self.page_size = page_size
+        self.positions = []
+        self.shown = 0
+        self.generation = store.generation
+        self._pending = None
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def show(self, positions):
+        self.tree.delete(*self.tree.get_children())
+        self.positions = positions
+        self.shown = 0
+        self.generation = self.store.generation
+        self.more()
+
+    def more(self):
+        self._pending = None
+        if self.generation != self.store.generation or not self.tree.winfo_exists():
+            return  # the store was reloaded since show(): the positions are stale until the next show()
+        end = min(len(self.positions), self.shown + self.page_size)
+        store, tree = self.store, self.tree
+        for position in self.positions[self.shown:end]:
+            tree.insert('', 'end', iid=store.key(position), values=store.display(position))
+        self.shown = end
+
+    def _on_scroll(self, first, last):
+        if self.scroll_set is not None:
+            self.scroll_set(first, last)
+        if float(last) >= SCROLL_THRESHOLD and self.shown < len(self.positions) and self._pending is None:
+            self._pending = self.tree.after_idle(self.more)
@@ -0,0 +1,258 @@
+"""
+Local HTTP/JSON ticketing backend for several POS terminals.
+
+The server owns funpass.db: all writes go through one writer thread with a
+single connection, so terminals queue in memory instead of fighting over the
+SQLite file lock, while reads run in parallel on per-thread connections (the
+database is switched to WAL mode so readers never wait for the writer).
+Every endpoint calls the same functions in services.py as the desktop app.
+The dashboards' own page loads, searches and stat cards read through
+POST /query, which runs one SELECT on a reader connection that refuses
+anything but reads (see client.RemoteConnection). The password columns read
+as NULL there; logins are checked by POST /login instead.
+
+Every request must carry the shared token as "Authorization: Bearer <token>",
+otherwise it gets a 401. The token comes from --token or FUNPASS_API_TOKEN; if
+neither is set a random one is made and printed at startup. The server listens
+on 127.0.0.1 only unless --host says otherwise; the token travels in plain
+HTTP, so only open it to a trusted network.
+
+Usage: python server.py [--db funpass.db] [--host 127.0.0.1] [--port 8765] [--token TOKEN]
+Point a dashboard at it with FUNPASS_API_URL=http://127.0.0.1:8765 and the
+same FUNPASS_API_TOKEN (see client.py).
+
+Endpoints (JSON in and out, errors as {"error": message}):
+    GET  /health
+    POST /login                          {"username": ..., "password": ...} -> {"role": "admin"|"employee", "employee_id": ...} or null
+    POST /query                          {"sql": "SELECT ...", "params": [...]} -> {"columns": [...], "rows": [[...], ...]}
+    GET  /pricing                        POST /pricing  {"prices": {...}}  or  {"reset": true}
+    GET  /availability?employee_id=E12345
+    GET  /sales?q=text&employee_id=E12345&limit=50
+    POST /sales                          sell_tickets arguments
+    POST /sales/group                    sell_group arguments, lines as {"Regular Pass": 2, ...}
+    POST /sales/update                   update_sale arguments
+    POST /sales/delete                   {"ticket_id": ..., "employee_id": ...}
+    POST /cancellations                  request_cancellation arguments
+    POST /cancellations/decision         {"ticket_id": ..., "status": ...}
+    POST /cancellations/delete           {"ticket_id": ...}
+    POST /employees                      save_employee arguments
+    POST /employees/allocations          {"employee_id": ..., "allocations": {...}}
+    POST /employees/allocations/bulk     {"allocations": {"E12345": {...}, ...}}
+    POST /employees/delete               {"employee_id": ...}
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import archive
+import change_log
+import query_trace
+import services
+import ticket_lookup
+from services import ServiceError
+
+DEFAULT_PORT = 8765
+
+# What a /query statement may do: read tables and views, call functions, and the read-only pragmas the dashboards use
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+READ_PRAGMAS = {'data_version', 'database_list', 'table_info'}
+# Columns a /query statement reads as NULL, so the shared token doesn't hand out every login
+SECRET_COLUMNS = {('admin', 'password'), ('employees', 'password')}
+
+
+def _read_only(action, arg1, arg2, database, trigger):
+    if action == sqlite3.SQLITE_READ and (arg1, arg2) in SECRET_COLUMNS:
+        return sqlite3.SQLITE_IGNORE
+    if action in READ_ACTIONS or (action == sqlite3.SQLITE_PRAGMA and arg1.lower() in READ_PRAGMAS):
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+class Backend:
+    # Database side of the server: one writer thread, a connection per reader thread
+    def __init__(self, db_path='funpass.db'):
+        self.db_path = db_path
+        self._readers = threading.local()
+        self._writer_conn = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='funpass-writer',
+                                          initializer=self._open_writer)
+        self.writes = 0
+        self.reads = 0
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        change_log.install(conn)  # the terminals' row stores and stat cards read only what changed
+        archive.install(conn)  # the sales queries add the archived totals
+        ticket_lookup.install(conn)
+        conn.commit()
+        change_log.compact(conn)  # as login.ensure_schema does for a single terminal
+        conn.close()
+        # Never writes, so its data_version moves with every commit by the writer or anyone else
+        self._version_conn = self._connect()
+        self._version_lock = threading.Lock()
+
+    def _connect(self):
+        conn = query_trace.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _open_writer(self):
+        self._writer_conn = self._connect()
+
+    def read(self, func, *args, **kwargs):
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = self._readers.conn = self._connect()
+        self.reads += 1
+        return func(conn, *args, **kwargs)
+
+    def query(self, sql, params=()):
+        # One read-only statement for a client.RemoteConnection, on this request thread's reader connection
+        if ' '.join(sql.split()).lower() == 'pragma data_version':
+            # Readers come and go between requests, so the version a terminal polls is always the same connection's
+            with self._version_lock:
+                return {'columns': ['data_version'], 'rows': self._version_conn.execute(sql).fetchall()}
+        return self.read(self._query, sql, params)
+
+    def _query(self, conn, sql, params):
+        # archive.history_tables can't create its views over /query, so each reader keeps them open
+        boundary = archive.archived_before(conn)
+        if boundary is not None and getattr(self._readers, 'history', None) != boundary:
+            archive.open_history(conn)
+            self._readers.history = boundary
+        conn.set_authorizer(_read_only)
+        try:
+            cursor = conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description or ()]
+            return {'columns': columns, 'rows': cursor.fetchall()}
+        except sqlite3.Error as e:
+            raise ValueError(str(e)) from e  # a 400, like any other bad request
+        finally:
+            conn.set_authorizer(None)
+
+    def write(self, func, *args, **kwargs):
+        # Runs on the writer thread, the calling request thread waits for the result
+        self.writes += 1
+        return self._writer.submit(lambda: func(self._writer_conn, *args, **kwargs)).result()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._version_conn.close()
+
+
+# (method, path) -> handler(backend, query, body); query values are single strings
+ROUTES = {
+    ('GET', '/health'): lambda backend, query, body: {'status': 'ok', 'reads': backend.reads, 'writes': backend.writes},
+    ('POST', '/login'): lambda backend, query, body: backend.read(services.authenticate, body['username'], body['password']),
+    ('POST', '/query'): lambda backend, query, body: backend.query(body['sql'], body.get('params') or ()),
+    ('GET', '/pricing'): lambda backend, query, body: backend.read(services.get_prices),
+    ('POST', '/pricing'): lambda backend, query, body: (
+        backend.write(services.reset_prices) if body.get('reset') else backend.write(services.set_prices, body['prices'])),
+    ('GET', '/availability'): lambda backend, query, body: backend.read(services.availability, query['employee_id']),
+    ('GET', '/sales'): lambda backend, query, body: backend.read(
+        services.search_sales, query.get('q', ''), query.get('employee_id'), int(query.get('limit', 50))),
+    ('POST', '/sales'): lambda backend, query, body: backend.write(services.sell_tickets, **body),
+    ('POST', '/sales/group'): lambda backend, query, body: backend.write(services.sell_group, **body),
+    ('POST', '/sales/update'): lambda backend, query, body: backend.write(services.update_sale, **body),
+    ('POST', '/sales/delete'): lambda backend, query, body: backend.write(services.delete_sale, **body),
+    ('POST', '/cancellations'): lambda backend, query, body: backend.write(services.request_cancellation, **body),
+    ('POST', '/cancellations/decision'): lambda backend, query, body: backend.write(services.decide_cancellation, **body),
+    ('POST', '/cancellations/delete'): lambda backend, query, body: backend.write(services.delete_cancellation, **body),
+    ('POST', '/employees'): lambda backend, query, body: backend.write(services.save_employee, **body),
+    ('POST', '/employees/allocations'): lambda backend, query, body: backend.write(services.allocate, **body),
+    ('POST', '/employees/allocations/bulk'): lambda backend, query, body: backend.write(services.allocate_many, **body),
+    ('POST', '/employees/delete'): lambda backend, query, body: backend.write(services.delete_employee, **body),
+}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'FunPass/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive, so a terminal reuses its connection
+    disable_nagle_algorithm = True  # headers and body are separate writes, don't wait for delayed ACKs
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        handler = ROUTES.get((method, url.path))
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {self.server.token}"):
+            self._reply(401, {'error': "Missing or wrong API token (FUNPASS_API_TOKEN)"})
+            return
+        if handler is None:
+            self._reply(404, {'error': f"No such endpoint: {method} {url.path}"})
+            return
+        try:
+            body = json.loads(raw) if raw else {}
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._reply(200, {'result': handler(self.server.backend, query, body)})
+        except ServiceError as e:
+            self._reply(422, {'error': str(e)})
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {'error': f"Bad request: {e}"})
+        except Exception as e:
+            print(f"Error handling {method} {self.path}: {e}")
+            self._reply(500, {'error': f"An error occurred: {e}"})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Quiet by default, one line per request would slow down load tests
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FunPassServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path='funpass.db', verbose=False, token=None):
+        super().__init__(address, RequestHandler)
+        self.backend = Backend(db_path)
+        self.verbose = verbose
+        self.token = token or secrets.token_urlsafe(24)
+
+    def server_close(self):
+        super().server_close()
+        self.backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the FunPass database to POS terminals over HTTP/JSON")
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--token', default=os.environ.get('FUNPASS_API_TOKEN'),
+                        help="shared token the terminals send (default FUNPASS_API_TOKEN, or a random one)")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+    server = FunPassServer((args.host, args.port), args.db, args.verbose, args.token)
+    print(f"FunPass server on http://{args.host}:{server.server_address[1]} using {args.db}")
+    if not args.token:
+        print(f"API token (set FUNPASS_API_TOKEN on the terminals): {server.token}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Business rules for sales, refunds, pricing and allocations.
+
+Plain functions over an open sqlite3 connection, with no Tk code, so the
+dashboards, load tests and headless workers all run the same logic. Every
+write runs in its own transaction; a rejected request raises ServiceError
+with a message that can be shown to the user as is.
+"""
+import random
+import sqlite3
+import string
+from contextlib import contextmanager
+from datetime import datetime
+
+import archive
+
+# Pass type -> employees column holding an employee's allocation for it
+PASS_COLUMNS = {
+    'Express Pass': 'express_pass',
+    'Junior Pass': 'junior_pass',
+    'Regular Pass': 'regular_pass',
+    'Student Pass': 'student_pass',
+    'PWD Pass': 'pwd_pass',
+    'Senior Citizen Pass': 'senior_citizen_pass',
+}
+
+DEFAULT_PRICES = {
+    'Express Pass': 2300.00,
+    'Junior Pass': 900.00,
+    'Regular Pass': 1300.00,
+    'Student Pass': 1300.00,
+    'Senior Citizen Pass': 900.00,
+    'PWD Pass': 900.00,
+}
+
+CANCELLATION_STATUSES = ('Pending', 'Approved', 'Rejected')
+
+
+class ServiceError(Exception):
+    # A request the business rules reject, the message is meant for the user
+    pass
+
+
+@contextmanager
+def transaction(conn):
+    # BEGIN IMMEDIATE takes the write lock up front, so checks and writes see the same data
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def generate_ticket_id():
+    return 'F' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+
+
+def generate_employee_id(conn):
+    # A random E##### id not used by any employee yet
+    cursor = conn.cursor()
+    while True:
+        new_id = f"E{random.randint(10000, 99999)}"
+        cursor.execute('SELECT 1 FROM employees WHERE employee_id = ?', (new_id,))
+        if not cursor.fetchone():
+            return new_id
+
+
+def get_prices(conn):
+    # Pass type -> price
+    return {pass_type: float(price) for pass_type, price in conn.execute('SELECT pass_type, price FROM pricing')}
+
+
+def get_price(conn, pass_type):
+    row = conn.execute('SELECT price FROM pricing WHERE pass_type=?', (pass_type,)).fetchone()
+    return float(row[0]) if row else 0.0
+
+
+def employee_availability(conn, employee_id, pass_type):
+    # Tickets of pass_type the employee may still sell: allocation minus what they already sold
+    column = PASS_COLUMNS.get(pass_type)
+    if column is None:
+        raise ServiceError(f"Unknown pass type: {pass_type}")
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT {column} FROM employees WHERE employee_id = ?', (employee_id,))
+    row = cursor.fetchone()
+    allocation = (row[0] or 0) if row else 0
+    cursor.execute('''SELECT (SELECT SUM(quantity) FROM customers WHERE pass_type = ?1 AND employee_id = ?2),
+                             (SELECT SUM(tickets) FROM archived_totals WHERE pass_type = ?1 AND employee_id = ?2)''',
+                   (pass_type, employee_id))
+    sold, archived = cursor.fetchone()
+    return allocation - (sold or 0) - (archived or 0)
+
+
+# Tickets an employee ever sold per pass type, archived sales included; param: employee_id
+SOLD_BY_PASS_SQL = '''
+    SELECT pass_type, SUM(quantity) FROM (
+        SELECT pass_type, quantity FROM customers WHERE employee_id = ?1
+        UNION ALL
+        SELECT pass_type, tickets FROM archived_totals WHERE employee_id = ?1
+    )
+    GROUP BY pass_type
+'''
+
+
+def availability(conn, employee_id):
+    # Pass type -> tickets the employee may still sell, for every pass type
+    columns = ', '.join(PASS_COLUMNS.values())
+    row = conn.execute(f'SELECT {columns} FROM employees WHERE employee_id = ?', (employee_id,)).fetchone()
+    if not row:
+        raise ServiceError("Employee not found!")
+    sold = dict(conn.execute(SOLD_BY_PASS_SQL, (employee_id,)))
+    return {pass_type: (allocation or 0) - (sold.get(pass_type) or 0) for pass_type, allocation in zip(PASS_COLUMNS, row)}
+
+
+def search_sales(conn, text='', employee_id=None, limit=50, include_archive=False):
+    # Sales whose ticket id, name or email contains text, newest first, as dicts; archived sales only when asked
+    table = 'customers'
+    if include_archive:
+        archive.open_history(conn)
+        table = 'all_customers'
+    sql = f'SELECT ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id FROM {table} WHERE 1=1'
+    params = []
+    if text:
+        sql += ' AND (ticket_id LIKE ? OR name LIKE ? OR email LIKE ?)'
+        params += [f'%{text}%'] * 3
+    if employee_id is not None:
+        sql += ' AND employee_id = ?'
+        params.append(employee_id)
+    sql += ' ORDER BY purchased_date DESC, ticket_id DESC LIMIT ?' if include_archive else ' ORDER BY purchased_date DESC, rowid DESC LIMIT ?'
+    params.append(int(limit))
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _parse_quantity(quantity):
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ServiceError("Invalid quantity or amount!")
+    if quantity <= 0:
+        raise ServiceError("Quantity must be greater than 0!")
+    return quantity
+
+
+def sell_tickets(conn, employee_id, name, email, pass_type, quantity, booked_date, ticket_id=None, purchased_date=None):
+    """Record a sale after checking the employee's remaining allocation.
+
+    The amount is always the current price times the quantity. Returns the
+    sale as a dict with the same keys as the customers table.
+    """
+    name = (name or '').strip()
+    email = (email or '').strip()
+    if not (name and quantity and pass_type and booked_date):
+        raise ServiceError("Name, Quantity, Pass Type, Amount, and Booked Date are required!")
+    quantity = _parse_quantity(quantity)
+    sale = {
+        'ticket_id': ticket_id or generate_ticket_id(),
+        'name': name,
+        'email': email,
+        'quantity': quantity,
+        'amount': 0.0,
+        'booked_date': booked_date,
+        'purchased_date': purchased_date or datetime.now().strftime('%Y-%m-%d'),
+        'pass_type': pass_type,
+        'employee_id': employee_id,
+    }
+    with transaction(conn) as cursor:
+        available = employee_availability(conn, employee_id, pass_type)
+        if quantity > available:
+            raise ServiceError(f"Not enough tickets available!\nYou can only sell {available} more {pass_type} tickets.")
+        sale['amount'] = get_price(conn, pass_type) * quantity
+        cursor.execute('''INSERT INTO customers
+                        (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id)
+                        VALUES (:ticket_id, :name, :email, :quantity, :amount, :booked_date, :purchased_date, :pass_type, :employee_id)''',
+                       sale)
+    return sale
+
+
+def sell_group(conn, employee_id, name, email, lines, booked_date, group_id=None, purchased_date=None):
+    """Record a group booking (several pass types for one customer) as one sale.
+
+    lines maps pass type -> quantity. Every line is checked against the
+    employee's remaining allocation and all of them are inserted in a single
+    transaction, so either the whole group is sold or nothing is. Each line
+    gets its own ticket id: the group id with a -1, -2, ... suffix. Returns
+    {'group_id', 'name', 'email', 'booked_date', 'purchased_date', 'total', 'sales'}.
+    """
+    name = (name or '').strip()
+    email = (email or '').strip()
+    if not (name and booked_date):
+        raise ServiceError("Name and Booked Date are required!")
+    quantities = {}
+    for pass_type, quantity in dict(lines).items():
+        if quantity in (None, '', 0, '0'):
+            continue
+        if pass_type not in PASS_COLUMNS:
+            raise ServiceError(f"Unknown pass type: {pass_type}")
+        quantities[pass_type] = _parse_quantity(quantity)
+    if not quantities:
+        raise ServiceError("Add at least one pass to the group!")
+    group_id = group_id or generate_ticket_id()
+    purchased_date = purchased_date or datetime.now().strftime('%Y-%m-%d')
+    with transaction(conn) as cursor:
+        available = availability(conn, employee_id)
+        short = [f"{pass_type}: only {available[pass_type]} left" for pass_type, quantity in quantities.items()
+                 if quantity > available[pass_type]]
+        if short:
+            raise ServiceError("Not enough tickets available!\n" + "\n".join(short))
+        prices = get_prices(conn)
+        sales = [{
+            'ticket_id': f"{group_id}-{i}",
+            'name': name,
+            'email': email,
+            'quantity': quantity,
+            'amount': prices.get(pass_type, 0.0) * quantity,
+            'booked_date': booked_date,
+            'purchased_date': purchased_date,
+            'pass_type': pass_type,
+            'employee_id': employee_id,
+        } for i, (pass_type, quantity) in enumerate(quantities.items(), start=1)]
+        cursor.executemany('''INSERT INTO customers
+                            (ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type, employee_id)
+                            VALUES (:ticket_id, :name, :email, :quantity, :amount, :booked_date, :purchased_date, :pass_type, :employee_id)''',
+                           sales)
+    return {
+        'group_id': group_id,
+        'name': name,
+        'email': email,
+        'booked_date': booked_date,
+        'purchased_date': purchased_date,
+        'total': sum(sale['amount'] for sale in sales),
+        'sales': sales,
+    }
+
+
+def update_sale(conn, ticket_id, name, email, quantity, amount, booked_date, purchased_date, pass_type):
+    if not all([name, quantity, amount, pass_type, booked_date, purchased_date]):
+        raise ServiceError("Name, Quantity, Amount, Pass Type, Booked Date, and Purchased Date are required!")
+    try:
+        quantity, amount = int(quantity), float(amount)
+    except (TypeError, ValueError):
+        raise ServiceError("Invalid quantity or amount!")
+    with transaction(conn) as cursor:
+        cursor.execute('''
+            UPDATE customers
+            SET name=?, email=?, quantity=?, amount=?,
+                booked_date=?, purchased_date=?, pass_type=?
+            WHERE ticket_id=?
+        ''', (name, email, quantity, amount, booked_date, purchased_date, pass_type, ticket_id))
+
+
+def delete_sale(conn, ticket_id, employee_id=None):
+    # Employees may only delete their own sales, the admin (employee_id=None) any sale
+    with transaction(conn) as cursor:
+        if employee_id is None:
+            cursor.execute('DELETE FROM customers WHERE ticket_id=?', (ticket_id,))
+        else:
+            cursor.execute('DELETE FROM customers WHERE ticket_id=? AND employee_id=?', (ticket_id, employee_id))
+        return cursor.rowcount > 0
+
+
+def request_cancellation(conn, ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, pass_type):
+    # Open a Pending refund request; the details have to match the original sale
+    if not (ticket_id and name and reasons and quantity and amount and booked_date and purchased_date and pass_type):
+        raise ServiceError("All fields except Email are required!")
+    try:
+        quantity, amount = int(quantity), float(amount)
+    except (TypeError, ValueError):
+        raise ServiceError("Invalid quantity or amount!")
+    with transaction(conn) as cursor:
+        cursor.execute('SELECT name, email, quantity, amount, pass_type FROM customers WHERE ticket_id=?', (ticket_id,))
+        customer = cursor.fetchone()
+        if not customer:
+            raise ServiceError("Ticket ID does not exist!")
+        cursor.execute('SELECT 1 FROM cancellations WHERE ticket_id=?', (ticket_id,))
+        if cursor.fetchone():
+            raise ServiceError("A cancellation for this Ticket ID already exists!")
+        if (name, email, quantity, amount, pass_type) != tuple(customer):
+            raise ServiceError("Cancellation details do not match the original purchase!")
+        cursor.execute('''
+            INSERT INTO cancellations
+            (ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, pass_type, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending')
+        ''', (ticket_id, name, email, reasons, quantity, amount, booked_date, purchased_date, pass_type))
+
+
+def decide_cancellation(conn, ticket_id, status):
+    """Set the status of a refund request.
+
+    Returns (name, email) of the customer if the status changed, None if it
+    already had that status.
+    """
+    if status not in CANCELLATION_STATUSES:
+        raise ServiceError(f"Invalid status: {status}")
+    with transaction(conn) as cursor:
+        cursor.execute('SELECT name, email, status FROM cancellations WHERE ticket_id = ?', (ticket_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise ServiceError("Cancellation request not found!")
+        if row[2] == status:
+            return None
+        cursor.execute('UPDATE cancellations SET status = ? WHERE ticket_id = ?', (status, ticket_id))
+    return row[0], row[1]
+
+
+def delete_cancellation(conn, ticket_id):
+    with transaction(conn) as cursor:
+        cursor.execute('DELETE FROM cancellations WHERE ticket_id = ?', (ticket_id,))
+
+
+def set_prices(conn, prices):
+    # prices: pass type -> price (numbers or strings like "1,300.00"), all saved in one transaction
+    new_prices = {}
+    for pass_type, price in prices.items():
+        try:
+            price = float(str(price).replace(',', '').replace(' ', ''))
+        except ValueError:
+            raise ServiceError(f"Invalid price for {pass_type}")
+        if price < 0:
+            raise ServiceError(f"Price for {pass_type} cannot be negative")
+        new_prices[pass_type] = price
+    with transaction(conn) as cursor:
+        cursor.executemany('UPDATE pricing SET price = ? WHERE pass_type = ?',
+                           [(price, pass_type) for pass_type, price in new_prices.items()])
+    return new_prices
+
+
+def reset_prices(conn):
+    return set_prices(conn, DEFAULT_PRICES)
+
+
+def _parse_allocations(allocations):
+    parsed = {}
+    for pass_type, quantity in allocations.items():
+        if pass_type not in PASS_COLUMNS:
+            raise ServiceError(f"Unknown pass type: {pass_type}")
+        if not str(quantity).isdigit():
+            raise ServiceError(f"Invalid ticket quantity for {pass_type}!")
+        parsed[pass_type] = int(quantity)
+    return parsed
+
+
+def allocate(conn, employee_id, allocations):
+    # allocations: pass type -> tickets the employee may sell, missing pass types are left as they are
+    allocations = _parse_allocations(allocations)
+    if not allocations:
+        return
+    columns = ', '.join(f"{PASS_COLUMNS[pass_type]}=?" for pass_type in allocations)
+    with transaction(conn) as cursor:
+        cursor.execute(f'UPDATE employees SET {columns} WHERE employee_id=?', (*allocations.values(), employee_id))
+        if cursor.rowcount == 0:
+            raise ServiceError("Employee not found!")
+
+
+def allocate_many(conn, allocations):
+    """Set the allocations of many employees in one transaction; returns how many were updated.
+
+    allocations: employee id -> {pass type: tickets}, as for allocate(). Every
+    row is checked before anything is written, and an unknown employee id
+    rejects the whole batch.
+    """
+    parsed = {}
+    for employee_id, employee_allocations in allocations.items():
+        try:
+            parsed[employee_id] = _parse_allocations(employee_allocations)
+        except ServiceError as e:
+            raise ServiceError(f"{employee_id}: {e}")
+    parsed = {employee_id: quantities for employee_id, quantities in parsed.items() if quantities}
+    if not parsed:
+        return 0
+    with transaction(conn) as cursor:
+        known = {row[0] for row in cursor.execute('SELECT employee_id FROM employees')}
+        unknown = sorted(set(parsed) - known)
+        if unknown:
+            raise ServiceError(f"Employee not found: {', '.join(unknown[:10])}{' ...' if len(unknown) > 10 else ''}")
+        # One executemany per set of pass types, so a grid that changes every row of a column is a single statement
+        by_columns = {}
+        for employee_id, quantities in parsed.items():
+            by_columns.setdefault(tuple(quantities), []).append((*quantities.values(), employee_id))
+        for pass_types, rows in by_columns.items():
+            columns = ', '.join(f"{PASS_COLUMNS[pass_type]}=?" for pass_type in pass_types)
+            cursor.executemany(f'UPDATE employees SET {columns} WHERE employee_id=?', rows)
+    return len(parsed)
+
+
+def authenticate(conn, username, password):
+    # Who these credentials belong to: {'role': 'admin'}, {'role': 'employee', 'employee_id': ...} or None
+    if conn.execute('SELECT 1 FROM admin WHERE username = ? AND password = ?', (username, password)).fetchone():
+        return {'role': 'admin'}
+    row = conn.execute('SELECT employee_id FROM employees WHERE username = ? AND password = ?', (username, password)).fetchone()
+    return {'role': 'employee', 'employee_id': row[0]} if row else None
+
+
+def save_employee(conn, name, username, password, allocations, employee_id=None):
+    # Add an employee (employee_id=None) or update one; returns the employee id.
+    # An update with an empty password keeps the current one (terminals on a server never see passwords)
+    if not all([name, username]) or (employee_id is None and not password):
+        raise ServiceError("Name, username and password are required!")
+    allocations = _parse_allocations(allocations)
+    quantities = [allocations.get(pass_type, 0) for pass_type in PASS_COLUMNS]
+    try:
+        with transaction(conn) as cursor:
+            if employee_id is None:
+                employee_id = generate_employee_id(conn)
+                cursor.execute(f'''
+                    INSERT INTO employees (employee_id, name, username, password, {', '.join(PASS_COLUMNS.values())})
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (employee_id, name, username, password, *quantities))
+            else:
+                cursor.execute(f'''
+                    UPDATE employees SET name=?, username=?, password=COALESCE(NULLIF(?, ''), password), {', '.join(f"{column}=?" for column in PASS_COLUMNS.values())}
+                    WHERE employee_id=?
+                ''', (name, username, password, *quantities, employee_id))
+    except sqlite3.IntegrityError:
+        raise ServiceError("Username already exists!")
+    return employee_id
+
+
+def delete_employee(conn, employee_id):
+    with transaction(conn) as cursor:
+        cursor.execute('DELETE FROM employees WHERE employee_id = ?', (employee_id,))
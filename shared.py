@@ -12,16 +12,20 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
 import random
 import string
+import threading
+import change_log
+import archive
+import ticket_lookup
 
 # Common database functions
-def create_database():
-    conn = sqlite3.connect('funpass.db')
+def create_database(db_path='funpass.db'):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Employees table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS employees (
-            employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id TEXT PRIMARY KEY,
             name TEXT NOT NULL,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL,
@@ -77,9 +81,14 @@ def create_database():
             booked_date TEXT NOT NULL,
             purchased_date TEXT NOT NULL,
             status TEXT DEFAULT 'Pending',
+            pass_type TEXT,
             FOREIGN KEY (ticket_id) REFERENCES customers (ticket_id)
         )
     ''')
+    # Databases created before refunds recorded the pass type
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(cancellations)')]
+    if 'pass_type' not in columns:
+        cursor.execute('ALTER TABLE cancellations ADD COLUMN pass_type TEXT')
 
     # Pricing table
     cursor.execute('''
@@ -105,6 +114,13 @@ def create_database():
             VALUES (?, ?)
         ''', default_prices)
 
+    # Triggers that record every change for incremental consumers
+    change_log.install(conn)
+    # Totals of archived sales, added to the all-time figures
+    archive.install(conn)
+    # Index for ticket ID autocomplete
+    ticket_lookup.install(conn)
+
     conn.commit()
     conn.close()
 
@@ -118,3 +134,100 @@ class BaseWindow:
         x = (screen_width - window_width) // 2
         y = (screen_height - window_height) // 2
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
+
+
+class ProgressDialog:
+    """Runs func(progress) on a background thread behind a modal progress bar.
+
+    func reports with progress(text, fraction) from its thread; the dialog
+    polls the latest report with root.after, so the window stays responsive.
+    on_done(result) or on_error(exception) is called on the Tk thread.
+    """
+    def __init__(self, root, title, func, on_done=None, on_error=None, poll_ms=100):
+        self.root = root
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._report = ("Starting...", 0.0)
+        self._outcome = None  # (result, error) once the thread has finished
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.transient(root)
+        self.window.protocol("WM_DELETE_WINDOW", lambda: None)  # the work can't be interrupted halfway
+        self.label = tk.Label(self.window, text="Starting...", font=("Segoe UI", 11), width=40, anchor="w")
+        self.label.pack(padx=20, pady=(20, 8))
+        self.bar = ttk.Progressbar(self.window, length=320, maximum=1.0, mode="determinate")
+        self.bar.pack(padx=20, pady=(0, 20))
+        self.window.grab_set()
+
+        threading.Thread(target=self._run, args=(func,), daemon=True).start()
+        self.window.after(self.poll_ms, self._poll)
+
+    def _progress(self, text, fraction):
+        self._report = (text, fraction)
+
+    def _run(self, func):
+        try:
+            self._outcome = (func(self._progress), None)
+        except Exception as e:
+            self._outcome = (None, e)
+
+    def _poll(self):
+        text, fraction = self._report
+        self.label.configure(text=text)
+        self.bar['value'] = fraction
+        if self._outcome is None:
+            self.window.after(self.poll_ms, self._poll)
+            return
+        result, error = self._outcome
+        self.window.grab_release()
+        self.window.destroy()
+        if error is not None:
+            if self.on_error is not None:
+                self.on_error(error)
+            else:
+                messagebox.showerror("Error", f"An error occurred: {error}")
+        elif self.on_done is not None:
+            self.on_done(result)
+
+
+# Resized images by interpreter, file and size, kept while the window lives
+_photos = {}
+
+
+def load_photo(master, path, width, height=None):
+    """PhotoImage of the image at path resized to width x height (height keeps the aspect ratio if None).
+
+    Every login in the same window gets the same object back instead of
+    decoding and resampling the file again. Errors opening the file are
+    raised, and nothing is cached for them.
+    """
+    photos = _photos.setdefault(master.tk, {})
+    key = (path, width, height)
+    if key not in photos:
+        image = Image.open(path)
+        if height is None:
+            height = int(width * image.height / image.width)
+        resample = getattr(getattr(Image, "Resampling", Image), "LANCZOS", getattr(Image, "LANCZOS", None))
+        photos[key] = ImageTk.PhotoImage(image.resize((width, height), resample), master=master)
+    return photos[key]
+
+
+def close_session(root, frame, owner):
+    """Drop a dashboard session but keep the window for the next login.
+
+    Closes the session's dialogs, removes the traces its Tk variables hold
+    on owner (they would keep the whole dashboard alive), clears the global
+    mouse-wheel binding and destroys frame, which holds all of its widgets.
+    """
+    for child in root.winfo_children():
+        if isinstance(child, tk.Toplevel):
+            child.destroy()
+    for value in list(vars(owner).values()):
+        if isinstance(value, tk.Variable):
+            for mode, callback in value.trace_info():
+                value.trace_remove(mode, callback)
+    root.unbind_all('<MouseWheel>')
+    frame.destroy()
@@ -0,0 +1,134 @@
+"""
+Watchdog for work that blocks the Tk thread.
+
+The Tk thread posts a heartbeat every HEARTBEAT_MS with root.after. A
+monitor thread checks the heartbeats; when one is more than
+FUNPASS_STALL_MS (default 250) late, the window is frozen, and the monitor
+grabs the Tk thread's stack with sys._current_frames(). When the heartbeat
+comes back the stall is logged with its duration, the handler Tk was
+running (the first app frame under tkinter's callback wrapper) and the
+stack, to the rotating log FUNPASS_STALL_LOG (default stalls.log) and to
+stdout. Set FUNPASS_STALL_MS=0 to turn the watchdog off.
+
+The stack is sampled at detection and again every threshold while the
+stall lasts; the log shows the handler of the first sample and the frame
+seen most often, which for a long SMTP send or table reload is where the
+time actually went.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+STALL_MS = float(os.environ.get('FUNPASS_STALL_MS', 250))
+STALL_LOG = os.environ.get('FUNPASS_STALL_LOG', 'stalls.log')
+HEARTBEAT_MS = 100
+
+# Frames from these are plumbing, not the handler that blocked
+_TK_PACKAGES = (os.sep + 'tkinter' + os.sep, os.sep + 'customtkinter' + os.sep, os.sep + 'tkcalendar' + os.sep)
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _logger():
+    logger = logging.getLogger('funpass.stalls')
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(STALL_LOG, maxBytes=1_000_000, backupCount=3, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+def _is_app(entry):
+    return os.path.abspath(entry.filename).startswith(_APP_DIR) and not entry.filename.endswith(os.path.basename(__file__))
+
+
+def _handler(stack):
+    # First app frame after the last tkinter frame: the callback Tk was running
+    last_tk = -1
+    for i, entry in enumerate(stack):
+        if any(package in entry.filename for package in _TK_PACKAGES):
+            last_tk = i
+    for entry in stack[last_tk + 1:]:
+        if _is_app(entry):
+            return entry
+    return stack[-1] if stack else None
+
+
+def _describe(entry):
+    return f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})" if entry else '?'
+
+
+class StallWatchdog:
+    def __init__(self, root, threshold_ms=STALL_MS, heartbeat_ms=HEARTBEAT_MS):
+        self.root = root
+        self.threshold = threshold_ms / 1000
+        self.heartbeat_ms = heartbeat_ms
+        self.stalls = 0
+        self._tk_thread = threading.get_ident()  # created on the Tk thread
+        self._last_beat = None  # set by the first heartbeat, so building the window before mainloop isn't a stall
+        self._gaps = {}  # heartbeat time -> seconds until the next one, for late heartbeats
+        self._stopped = threading.Event()
+        self._after_id = None
+        if threshold_ms <= 0:
+            return
+        self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+        self.root.bind('<Destroy>', self._on_destroy, add='+')
+        threading.Thread(target=self._monitor, name='funpass-stall-watchdog', daemon=True).start()
+
+    def _beat(self):
+        now = time.perf_counter()
+        if self._last_beat is not None and now - self._last_beat - self.heartbeat_ms / 1000 >= self.threshold:
+            self._gaps[self._last_beat] = now - self._last_beat
+        self._last_beat = now
+        if not self._stopped.is_set():
+            self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+
+    def _on_destroy(self, event):
+        if event.widget is self.root:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._tk_thread)
+        return traceback.extract_stack(frame) if frame is not None else []
+
+    def _monitor(self):
+        poll = self.heartbeat_ms / 2000
+        while not self._stopped.wait(poll):
+            beat = self._last_beat
+            if beat is None or time.perf_counter() - beat - self.heartbeat_ms / 1000 < self.threshold:
+                continue
+            # Stalled: sample the Tk thread's stack until the heartbeat comes back
+            samples = [self._sample()]
+            while self._last_beat == beat and not self._stopped.wait(self.threshold):
+                samples.append(self._sample())
+            if self._stopped.is_set():
+                break
+            gap = self._gaps.pop(beat, self._last_beat - beat)
+            self._report(samples, gap - self.heartbeat_ms / 1000)
+
+    def _report(self, samples, seconds):
+        self.stalls += 1
+        first = samples[0]
+        handler = _handler(first)
+        # The innermost app frame seen most often while stalled
+        hot = Counter(_describe(next((entry for entry in reversed(stack) if _is_app(entry)), None))
+                      for stack in samples if stack).most_common(1)
+        hot_spot = hot[0][0] if hot else '?'
+        message = (f"Tk thread stalled {seconds * 1000:.0f} ms in {_describe(handler)}, "
+                   f"mostly at {hot_spot} ({len(samples)} samples)")
+        print(f"[stall] {message}")
+        _logger().info(message + '\n' + ''.join(traceback.format_list(first)).rstrip())
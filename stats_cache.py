@@ -0,0 +1,88 @@
+"""
+In-memory cache for the dashboard statistics.
+
+Repeat visits to a dashboard are served from memory. Entries are dropped as
+soon as one of the data sources they were computed from is written to (see
+invalidation.py), and expire after a TTL so writes made from other terminals
+still show up.
+"""
+import os
+import threading
+import time
+
+# Seconds a cached statistic stays valid without a local write invalidating it
+DEFAULT_TTL = float(os.environ.get('FUNPASS_STATS_TTL', 30))
+
+
+class StatsCache:
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}  # key -> (value, sources, stored_at)
+        # Bumped by invalidate(): a load that overlapped an invalidation of its sources is not stored
+        self._generations = {}  # source -> count
+        self._generation_all = 0  # invalidations of every source
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, sources):
+        """Return the cached value for key, calling loader() on a miss.
+
+        sources lists the data sources (invalidation.SALES, ...) the value is
+        computed from; a write to any of them drops the entry.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation(sources)
+        value = loader()
+        with self._lock:
+            # A write during the load may have come after the loader read the data: return the value, but don't keep it
+            if self._generation(sources) == generation:
+                self._entries[key] = (value, frozenset(sources), time.monotonic())
+        return value
+
+    def _generation(self, sources):
+        # Caller holds the lock
+        return self._generation_all, tuple(self._generations.get(source, 0) for source in sources)
+
+    def invalidate(self, *sources):
+        # Drop every entry computed from one of the given sources (all entries if none given)
+        changed = set(sources)
+        with self._lock:
+            if changed:
+                for source in changed:
+                    self._generations[source] = self._generations.get(source, 0) + 1
+            else:
+                self._generation_all += 1
+            stale = [key for key, (_, deps, _) in self._entries.items() if not changed or deps & changed]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation_all += 1
+
+    def stats(self):
+        # Counters for tuning the TTL
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+            }
+
+
+# Shared by both dashboards
+stats_cache = StatsCache()
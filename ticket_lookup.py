@@ -0,0 +1,88 @@
+"""
+Ticket ID autocomplete for the refund request dialog.
+
+install() adds an index on customers (employee_id, ticket_id). An employee's
+tickets whose ID starts with a prefix are then one range of that index
+(ticket_id >= 'F0A' AND ticket_id < 'F0B'), however many tickets the park has
+sold; LIKE 'F0A%' would scan every sale of the employee, because SQLite's
+LIKE is case-insensitive and cannot use a BINARY index. Ticket IDs are upper
+case (services.generate_ticket_id), so the typed prefix is upper-cased.
+
+suggest() returns the first matches with the sale details the dialog fills
+in, plus the status of any refund request already made for the ticket.
+
+Usage: python ticket_lookup.py F0A [--employee E12345] [--db funpass.db] [--repeat 1000]
+"""
+import argparse
+import sqlite3
+import time
+
+MAX_SUGGESTIONS = 8
+
+SUGGEST_SQL = '''
+    SELECT c.ticket_id, c.name, c.email, c.quantity, c.amount, c.booked_date, c.purchased_date, c.pass_type,
+           ca.status
+    FROM customers c
+    LEFT JOIN cancellations ca ON ca.ticket_id = c.ticket_id
+    WHERE {employee_filter} c.ticket_id >= ? AND c.ticket_id < ?
+    ORDER BY c.ticket_id
+    LIMIT ?
+'''
+
+
+def install(conn):
+    # Create the prefix lookup index if it is missing (does not commit)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_employee_ticket ON customers (employee_id, ticket_id)')
+
+
+def prefix_range(prefix):
+    # [low, high) holding exactly the strings that start with prefix
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def suggest(conn, prefix, employee_id=None, limit=MAX_SUGGESTIONS):
+    """Sales whose ticket ID starts with prefix, sold by employee_id (anyone if None).
+
+    Each row is (ticket_id, name, email, quantity, amount, booked_date,
+    purchased_date, pass_type, refund status or None).
+    """
+    prefix = prefix.strip().upper()
+    if not prefix:
+        return []
+    low, high = prefix_range(prefix)
+    if employee_id is None:
+        sql, params = SUGGEST_SQL.format(employee_filter=''), (low, high, limit)
+    else:
+        sql, params = SUGGEST_SQL.format(employee_filter='c.employee_id = ? AND'), (employee_id, low, high, limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up ticket IDs by prefix and time the lookup")
+    parser.add_argument('prefix')
+    parser.add_argument('--employee', help="only this employee's sales")
+    parser.add_argument('--db', default='funpass.db')
+    parser.add_argument('--repeat', type=int, default=1000, help="lookups to time")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        install(conn)
+        conn.commit()
+        rows = suggest(conn, args.prefix, args.employee)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            suggest(conn, args.prefix, args.employee)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        conn.close()
+    for row in rows:
+        print(f"{row[0]}  {row[1]:<24} {row[7]:<20} x{row[3]:<3} {row[4]:>10,.2f}  {row[8] or ''}")
+    timings.sort()
+    if timings:
+        print(f"{len(rows)} matches; p50 {timings[len(timings) // 2]:.3f} ms, "
+              f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.3f} ms over {len(timings)} lookups")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Click-to-render latency for the dashboard screens.
+
+A LatencyMonitor is started by a sidebar click and stops once the rebuilt
+page is idle: the page builder has returned, the page's background query
+(the executor job with key='page') has been delivered and filled in, and
+update_idletasks() has drawn the result. Latencies go into in-memory
+histograms per dashboard and screen (latency_stats).
+
+At exit the histograms are appended as one JSON line per session to
+FUNPASS_LATENCY_FILE (default ui_latency.jsonl; set it empty to skip), and
+summarize() turns one or more such files into p50/p95 per screen.
+
+Usage: python ui_latency.py [ui_latency.jsonl ...]
+"""
+import argparse
+import atexit
+import bisect
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+LATENCY_FILE = os.environ.get('FUNPASS_LATENCY_FILE', 'ui_latency.jsonl')
+# Histogram bucket upper bounds in milliseconds; the last bucket is everything slower
+BUCKETS_MS = [10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+MAX_SAMPLES = 2000  # most recent samples kept per screen for exact percentiles
+POLL_MS = 10
+TIMEOUT_SECONDS = 60  # a page whose query never comes back is not counted
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+        self.samples.append(ms)
+
+    def to_dict(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'min_ms': round(self.min_ms, 1) if self.min_ms is not None else None,
+            'p50_ms': round(percentile(ordered, 0.50), 1) if ordered else None,
+            'p95_ms': round(percentile(ordered, 0.95), 1) if ordered else None,
+            'max_ms': round(self.max_ms, 1) if self.max_ms is not None else None,
+            'buckets_ms': BUCKETS_MS,
+            'counts': self.counts,
+        }
+
+
+class LatencyStats:
+    # Histograms keyed by 'dashboard/screen', shared by every monitor in the process
+    def __init__(self):
+        self.started = datetime.now()
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, ms):
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).add(ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: histogram.to_dict() for key, histogram in sorted(self._histograms.items())}
+
+    def export(self, path=LATENCY_FILE):
+        # Append this session's histograms as one JSON line; returns False if there was nothing to write
+        screens = self.snapshot()
+        if not path or not screens:
+            return False
+        entry = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'ended': datetime.now().isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'screens': screens,
+        }
+        try:
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            print(f"Could not write UI latencies to {path}: {e}")
+            return False
+        return True
+
+
+latency_stats = LatencyStats()
+atexit.register(latency_stats.export)
+
+
+class LatencyMonitor:
+    """Measures click-to-idle time for one dashboard window.
+
+    executor is the dashboard's DBExecutor; a screen counts as rendered once
+    it has no 'page' job left. on_rendered(screen) is called after each
+    measurement, outside the timed part.
+    """
+    def __init__(self, root, executor, dashboard, stats=latency_stats, on_rendered=None):
+        self.root = root
+        self.executor = executor
+        self.dashboard = dashboard
+        self.stats = stats
+        self.on_rendered = on_rendered
+        self._current = None  # (screen, start time) of the click being measured
+
+    def start(self, screen):
+        # Call on the click, before the page is built; a new click abandons the previous measurement
+        self._current = (screen, time.perf_counter())
+        self.root.after(0, self._check, self._current)
+
+    def stop(self):
+        # Abandon the measurement in progress, e.g. when the session ends
+        self._current = None
+
+    def _check(self, current):
+        if current is not self._current:
+            return
+        screen, start = current
+        if self.executor.pending('page') and time.perf_counter() - start < TIMEOUT_SECONDS:
+            self.root.after(POLL_MS, self._check, current)
+            return
+        self._current = None
+        if self.executor.pending('page'):
+            return
+        try:
+            self.root.update_idletasks()
+        except Exception:
+            return  # window closed meanwhile
+        self.stats.add(f"{self.dashboard}/{screen}", (time.perf_counter() - start) * 1000)
+        if self.on_rendered is not None:
+            self.on_rendered(screen)
+
+
+def summarize(paths):
+    # Merge the histograms of every session in paths into count/p50/p95 per screen
+    merged = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                for key, data in json.loads(line)['screens'].items():
+                    entry = merged.setdefault(key, {'counts': [0] * len(data['counts']), 'count': 0, 'max_ms': 0})
+                    entry['counts'] = [a + b for a, b in zip(entry['counts'], data['counts'])]
+                    entry['count'] += data['count']
+                    entry['max_ms'] = max(entry['max_ms'], data['max_ms'] or 0)
+    summary = {}
+    for key, entry in sorted(merged.items()):
+        summary[key] = {'count': entry['count'], 'max_ms': entry['max_ms'],
+                        'p50_ms': _bucket_percentile(entry['counts'], entry['count'], 0.50),
+                        'p95_ms': _bucket_percentile(entry['counts'], entry['count'], 0.95)}
+    return summary
+
+
+def _bucket_percentile(counts, total, fraction):
+    # Upper bound of the bucket holding the percentile (None if it is the open-ended last bucket)
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if total and seen >= total * fraction:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise click-to-render latencies per screen")
+    parser.add_argument('paths', nargs='*', default=[LATENCY_FILE])
+    args = parser.parse_args()
+    for key, entry in summarize(args.paths).items():
+        p50 = f"<= {entry['p50_ms']} ms" if entry['p50_ms'] is not None else f"> {BUCKETS_MS[-1]} ms"
+        p95 = f"<= {entry['p95_ms']} ms" if entry['p95_ms'] is not None else f"> {BUCKETS_MS[-1]} ms"
+        print(f"{key:<28} {entry['count']:>6} clicks   p50 {p50:<12} p95 {p95:<12} max {entry['max_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()